@@ -2,10 +2,14 @@ import logging
 
 from django import forms
 from django.contrib import admin, messages
+from django.db import transaction
 from django.db.models import QuerySet
 from mptt.admin import DraggableMPTTAdmin
 
 from app.app_shop.utils.admin.change_status_delete import soft_deletion_child_records
+from app.app_shop.services.products.autocomplete import ProductAutocompleteService
+from app.app_shop.services.products.products_list.facets import ProductFacetService
+from app.app_shop.services.payment_errors import PaymentErrorCatalog
 from app.app_shop.models.products import (
     CategoryProduct,
     Product,
@@ -14,7 +18,13 @@ from app.app_shop.models.products import (
     ProductReviews,
 )
 
-from .models.cart_and_orders import Cart, Order, PurchasedProduct, PaymentErrors
+from .models.cart_and_orders import (
+    Cart,
+    Order,
+    PurchasedProduct,
+    PaymentErrors,
+    StockReservation,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +37,7 @@ def deleted_all_records(adminmodel, request, queryset):
     """
     soft_deletion_child_records(queryset)  # Мягкое удаление всех дочерних записей
     queryset.update(deleted=True)  # Мягкое удаление родительской записи
+    ProductAutocompleteService.invalidate()  # Удаленные товары и категории не выводятся в подсказках
 
 
 @admin.action(description="Мягкое удаление")
@@ -35,6 +46,7 @@ def deleted_records(adminmodel, request, queryset):
     Мягкое удаление всех записей, включая дочерние
     """
     queryset.update(deleted=True)  # Мягкое удаление родительской записи
+    ProductAutocompleteService.invalidate()  # Удаленные товары и категории не выводятся в подсказках
 
 
 @admin.action(description="Восстановить записи")
@@ -43,6 +55,29 @@ def restore_records(adminmodel, request, queryset):
     Восстановить записи, отключенные ч/з мягкое удаление
     """
     queryset.update(deleted=False)  # Восстановление родительской записи
+    ProductAutocompleteService.invalidate()
+
+
+@admin.action(description="Мягкое удаление")
+def deleted_reviews(adminmodel, request, queryset):
+    """
+    Мягкое удаление отзывов с пересчетом счетчиков отзывов у товаров
+    """
+    with transaction.atomic():
+        product_ids = list(queryset.values_list("product_id", flat=True).distinct())
+        queryset.update(deleted=True)
+        Product.recount_reviews(product_ids)
+
+
+@admin.action(description="Восстановить записи")
+def restore_reviews(adminmodel, request, queryset):
+    """
+    Восстановление отзывов с пересчетом счетчиков отзывов у товаров
+    """
+    with transaction.atomic():
+        product_ids = list(queryset.values_list("product_id", flat=True).distinct())
+        queryset.update(deleted=False)
+        Product.recount_reviews(product_ids)
 
 
 @admin.action(description='Перевести в "Избранные категории"')
@@ -162,6 +197,7 @@ class ProductAdmin(admin.ModelAdmin):
         "discount",
         "count",
         "purchases",
+        "active_reviews_count",
         "limited_edition",
         "created_at",
         "deleted",
@@ -189,7 +225,13 @@ class ProductAdmin(admin.ModelAdmin):
         (
             "Кол-во товара",
             {
-                "fields": ("count", "purchases", "limited_edition"),
+                "fields": (
+                    "count",
+                    "purchases",
+                    "limited_edition",
+                    "reviews_count",
+                    "active_reviews_count",
+                ),
                 "description": "Оставшееся кол-во товара на складе, кол-во покупок, а также принадлежность товара к ограниченному тиражу",
             },
         ),
@@ -216,12 +258,22 @@ class ProductAdmin(admin.ModelAdmin):
 
     def get_readonly_fields(self, request, obj=None):
         """
-        Запрещаем редактировать поле с кол-вом проданных экземпляров
+        Запрещаем редактировать поле с кол-вом проданных экземпляров и счетчики отзывов
         """
         if obj:
-            return ["purchases"]
+            return ["purchases", "reviews_count", "active_reviews_count"]
 
-        return self.readonly_fields
+        return ["reviews_count", "active_reviews_count"]
+
+    def save_related(self, request, form, formsets, change):
+        """
+        Обновляем поисковый вектор и индекс товара, сбрасываем кэш фасетов после сохранения тегов
+        (M2M сохраняются после самого товара)
+        """
+        super().save_related(request, form, formsets, change)
+        Product.update_search_vector([form.instance.id])
+        Product.update_search_index([form.instance.id])
+        ProductFacetService.invalidate()
 
 
 @admin.register(ProductReviews)
@@ -236,9 +288,18 @@ class ProductReviewsAdmin(admin.ModelAdmin):
     search_fields = ("product", "short_review")
     list_editable = ("deleted",)
     actions = (
-        deleted_records,
-        restore_records,
-    )  # Мягкое удаление/восстановление записей
+        deleted_reviews,
+        restore_reviews,
+    )  # Мягкое удаление/восстановление записей с пересчетом счетчиков отзывов
+
+    def delete_queryset(self, request, queryset):
+        """
+        Удаление выбранных отзывов с пересчетом счетчиков отзывов у затронутых товаров
+        (массовое удаление не вызывает ProductReviews.delete)
+        """
+        product_ids = list(queryset.values_list("product_id", flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        Product.recount_reviews(product_ids)
 
     def short_review(self, obj):
         """
@@ -455,15 +516,34 @@ class OrderAdmin(admin.ModelAdmin):
         return self.readonly_fields
 
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """
+    Админ-панель для просмотра резервов товаров по заказам (только чтение)
+    """
+
+    list_display = ("id", "order", "product", "count", "status", "expires_at")
+    list_display_links = ("id",)
+    search_fields = ("order__id", "product__name")
+    list_filter = ("status",)
+    list_select_related = ("order", "product")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(PaymentErrors)
 class PaymentErrorsAdmin(admin.ModelAdmin):
     """
     Админ-панель для добавления и просмотра сообщений об ошибке при оплате заказа
     """
 
-    list_display = ("title", "short_description")
+    list_display = ("title", "code", "short_description")
     list_display_links = ("title",)
-    search_fields = ("title",)
+    search_fields = ("title", "code")
 
     def formfield_for_dbfield(self, db_field, **kwargs):
         """
@@ -483,3 +563,10 @@ class PaymentErrorsAdmin(admin.ModelAdmin):
         return obj.description[0:300]
 
     short_description.short_description = "Описание ошибки"
+
+    def delete_queryset(self, request, queryset):
+        """
+        Удаление выбранных сообщений со сбросом справочника ошибок оплаты
+        """
+        super().delete_queryset(request, queryset)
+        PaymentErrorCatalog.invalidate()
@@ -0,0 +1,16 @@
+from typing import Dict
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
+from app.app_shop.services.shop_cart.summary import CartSummaryService
+
+
+def cart_summary(request: HttpRequest) -> Dict:
+    """
+    Функция добавляет в контекст шаблонов итоги корзины текущего пользователя
+    (итоги загружаются при первом обращении в шаблоне)
+
+    @param request: объект http-запроса
+    @return: словарь с итогами корзины
+    """
+    return {"cart_summary": SimpleLazyObject(lambda: CartSummaryService.get(request))}
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from app.app_shop.models.cart_and_orders import Order
+from app.app_shop.services.orders import RegistrationOrderService
+
+
+class Command(BaseCommand):
+    """
+    Команда для заполнения стоимости заказов, оформленных до сохранения стоимости в заказе
+    """
+
+    help = (
+        "Заполнение стоимости товаров, доставки и суммы к оплате (items_total, delivery_total, grand_total) "
+        "у заказов, где она не сохранена. Стоимость доставки считается по текущим настройкам сайта."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Кол-во заказов, обновляемых одним запросом",
+        )
+
+    def handle(self, *args, **options) -> None:
+        batch_size = options["batch_size"]
+        updated = 0
+
+        while True:
+            # Стоимость товаров считается в том же запросе, что и выборка заказов
+            orders = list(
+                Order.objects.filter(items_total__isnull=True)
+                .annotate(purchased_total=Coalesce(Sum("purchasedproduct__price"), 0))
+                .order_by("id")[:batch_size]
+            )
+
+            if not orders:
+                break
+
+            for order in orders:
+                order.items_total = order.purchased_total
+                order.delivery_total = RegistrationOrderService.delivery_cost(
+                    order=order
+                )
+                order.grand_total = order.items_total + order.delivery_total
+
+            Order.objects.bulk_update(
+                orders, ["items_total", "delivery_total", "grand_total"]
+            )
+            updated += len(orders)
+            self.stdout.write(f"Обновлено заказов: {updated}")
+
+        self.stdout.write(self.style.SUCCESS("Стоимость заказов заполнена"))
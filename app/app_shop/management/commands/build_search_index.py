@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.app_shop.services.products.search_index import ProductSearchIndex
+
+
+class Command(BaseCommand):
+    """
+    Команда для создания (полного пересоздания) инвертированного поискового индекса товаров
+    """
+
+    help = "Создание поискового индекса товаров (settings.PRODUCT_SEARCH_INDEX_PATH)"
+
+    def handle(self, *args, **options) -> None:
+        terms = ProductSearchIndex.build()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Поисковый индекс создан: {ProductSearchIndex.path()}, слов - {terms}"
+            )
+        )
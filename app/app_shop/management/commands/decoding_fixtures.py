@@ -1,5 +1,5 @@
-import json
 import os.path
+import shutil
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
@@ -10,17 +10,36 @@ PATH = os.path.join(settings.BASE_DIR, "fixtures")  # Директория с ф
 
 class Command(BaseCommand):
     """
-    Команда для перекодирования файла с фикстурами для последующего импорта в БД
+    Команда для перекодирования файла с фикстурами для последующего импорта в БД.
+    Файл перекодируется потоком (частями), без загрузки всего файла в память.
     """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            default=os.path.join(PATH, "db.json"),
+            help="Исходный файл с фикстурами",
+        )
+        parser.add_argument(
+            "--target",
+            default=os.path.join(PATH, "test-data.json"),
+            help="Новый файл с фикстурами (UTF-8)",
+        )
+        parser.add_argument(
+            "--encoding",
+            default="windows-1251",
+            help="Кодировка исходного файла",
+        )
+
     def handle(self, *args, **options) -> None:
-        with open(
-            os.path.join(PATH, "db.json"), encoding="windows-1251"
-        ) as f:  # Открываем старый файл с фикстурами
-            data = json.load(f)  # Подгружаем json-данные
-        with open(
-            os.path.join(PATH, "test-data.json"), "w", encoding="utf-8"
-        ) as f:  # Создаем новый файл
-            json.dump(
-                data, f, ensure_ascii=False
-            )  # ensure_ascii=False - отключает экранирование не-ASCII символов!
+        # Открываем старый файл с фикстурами и создаем новый файл
+        source = open(options["source"], encoding=options["encoding"], newline="")
+        target = open(options["target"], "w", encoding="utf-8", newline="")
+
+        with source, target:
+            # Копируем текст частями по 1 Мб: декодирование и кодирование выполняются на лету
+            shutil.copyfileobj(source, target, 1024 * 1024)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Фикстуры перекодированы: {options['target']}")
+        )
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.app_shop.services.products.catalog_io import CatalogExportService
+
+
+class Command(BaseCommand):
+    """
+    Команда для потоковой выгрузки каталога товаров в файл JSON Lines / CSV (в т.ч. сжатый .gz)
+    """
+
+    help = "Выгрузка товаров в файл JSON Lines / CSV (формат файла для команды import_catalog)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл каталога (.gz - сжатый файл)")
+        parser.add_argument(
+            "--format",
+            choices=("jsonl", "csv"),
+            default="jsonl",
+            help="Формат файла",
+        )
+        parser.add_argument(
+            "--encoding",
+            default="utf-8",
+            help="Кодировка файла",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Кол-во товаров, читаемых из БД одним запросом",
+        )
+
+    def handle(self, *args, **options) -> None:
+        try:
+            total = CatalogExportService.dump(
+                path=options["path"],
+                file_format=options["format"],
+                encoding=options["encoding"],
+                batch_size=options["batch_size"],
+                progress=lambda count: self.stdout.write(f"Выгружено товаров: {count}"),
+            )
+
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f"Каталог выгружен: товаров - {total}"))
@@ -0,0 +1,58 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from app.app_shop.services.renditions import ImageRenditionService
+
+
+class Command(BaseCommand):
+    """
+    Команда для создания уменьшенных копий уже загруженных изображений
+    (товары, категории, аватары - модели с атрибутом RENDITIONS)
+    """
+
+    help = "Создание уменьшенных копий изображений, для которых они еще не созданы"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать копии для всех изображений",
+        )
+
+    def handle(self, *args, **options) -> None:
+        created = 0
+
+        for model in apps.get_models():
+            renditions = getattr(model, "RENDITIONS", None)
+
+            if not renditions:
+                continue
+
+            for field_name, kinds in renditions.items():
+                records = (
+                    model.objects.exclude(**{field_name: ""})
+                    .exclude(**{f"{field_name}__isnull": True})
+                    .values_list("pk", field_name, f"{field_name}_renditions")
+                )
+
+                for pk, source, current in records.iterator(chunk_size=500):
+                    if not options["force"] and (current or {}).get("source") == source:
+                        continue
+
+                    try:
+                        ImageRenditionService.generate(
+                            label=model._meta.label,
+                            pk=pk,
+                            field_name=field_name,
+                            kinds=kinds,
+                        )
+                        created += 1
+
+                    except (OSError, ValueError) as exc:
+                        self.stderr.write(
+                            f"Ошибка: {model._meta.label}, id - {pk}: {exc}"
+                        )
+
+            self.stdout.write(f"Обработана модель: {model._meta.label}")
+
+        self.stdout.write(self.style.SUCCESS(f"Созданы копии изображений: {created}"))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.app_shop.services.products.catalog_io import CatalogImportService
+
+
+class Command(BaseCommand):
+    """
+    Команда для потоковой загрузки каталога товаров из файла JSON Lines / CSV (в т.ч. сжатого .gz)
+    """
+
+    help = (
+        "Загрузка товаров из файла JSON Lines / CSV: товары с существующим id обновляются, "
+        "остальные создаются; категории ищутся по slug, недостающие теги создаются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл каталога (.gz - сжатый файл)")
+        parser.add_argument(
+            "--format",
+            choices=("jsonl", "csv"),
+            default="jsonl",
+            help="Формат файла",
+        )
+        parser.add_argument(
+            "--encoding",
+            default="utf-8",
+            help="Кодировка файла (например, windows-1251)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Кол-во записей, сохраняемых одной пачкой",
+        )
+
+    def handle(self, *args, **options) -> None:
+        def progress(stats) -> None:
+            self.stdout.write(
+                f"Обработано записей: {stats['processed']} (создано - {stats['created']}, "
+                f"обновлено - {stats['updated']}, ошибок - {stats['invalid']})"
+            )
+
+        try:
+            stats = CatalogImportService.load(
+                path=options["path"],
+                file_format=options["format"],
+                encoding=options["encoding"],
+                batch_size=options["batch_size"],
+                progress=progress,
+            )
+
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Каталог загружен: создано - {stats['created']}, обновлено - {stats['updated']}"
+            )
+        )
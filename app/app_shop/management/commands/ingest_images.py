@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.app_shop.services.products.image_ingest import ProductImageIngestService
+
+
+class Command(BaseCommand):
+    """
+    Команда для массовой загрузки изображений товаров из папки или архива
+    """
+
+    help = (
+        "Загрузка изображений товаров из папки или архива (zip, tar). "
+        "Товар определяется по первой папке в пути или началу имени файла до '_' (id или slug названия)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Папка или архив с изображениями")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Кол-во процессов для обработки изображений (по умолчанию - по кол-ву ядер)",
+        )
+        parser.add_argument(
+            "--max-size",
+            type=int,
+            default=2000,
+            help="Максимальный размер большей стороны изображения (px)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Кол-во файлов, обрабатываемых и сохраняемых одной пачкой",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только проверить файлы, без сохранения",
+        )
+
+    def handle(self, *args, **options) -> None:
+        try:
+            stats = ProductImageIngestService.ingest(
+                path=options["path"],
+                workers=options["workers"],
+                max_size=options["max_size"],
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+            )
+
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"Новых файлов - {stats['stored']}, уже загружены у товара - {stats['duplicates']}, "
+            f"товар не найден - {stats['unmatched']}, некорректных изображений - {stats['invalid']}"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Создано записей изображений: {stats['created']}")
+        )
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.app_shop.services.checkout_load import CheckoutError, CheckoutLoadService
+
+
+class Command(BaseCommand):
+    """
+    Команда для нагрузочного тестирования оформления и оплаты заказов
+    """
+
+    help = (
+        "Параллельное оформление и оплата заказов виртуальными покупателями через HTTP "
+        "(авторизация, корзина, оформление заказа, оплата, ожидание статуса) с отчетом о пропускной "
+        "способности и перцентилях времени этапов. Товары резервируются под заказы!"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default="http://localhost:8000", help="Адрес магазина"
+        )
+        parser.add_argument(
+            "--users", type=int, default=100, help="Кол-во заказов (покупателей)"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Кол-во одновременно оформляемых заказов",
+        )
+        parser.add_argument(
+            "--create-users",
+            action="store_true",
+            help="Создать недостающие учетные записи покупателей (loadtest<N>@example.com)",
+        )
+        parser.add_argument(
+            "--password", default="loadtest-password", help="Пароль покупателей"
+        )
+        parser.add_argument(
+            "--card",
+            default="4000 0000 0000 0002",
+            help="Номер карты для оплаты",
+        )
+        parser.add_argument(
+            "--product",
+            type=int,
+            action="append",
+            help="id товара (можно указать несколько раз), по умолчанию - товары в наличии",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=120,
+            help="Макс. время ожидания итогового статуса заказа (сек)",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["create_users"]:
+            created = CheckoutLoadService.create_users(
+                count=options["users"], password=options["password"]
+            )
+            self.stdout.write(f"Создано покупателей: {created}")
+
+        def progress(done, result) -> None:
+            if done % 10 == 0 or result["result"] == "error":
+                self.stdout.write(
+                    f"Заказов: {done}/{options['users']}"
+                    + (f" (ошибка: {result['error']})" if "error" in result else "")
+                )
+
+        try:
+            report = CheckoutLoadService.run(
+                base_url=options["url"],
+                users=options["users"],
+                concurrency=options["concurrency"],
+                password=options["password"],
+                card_number=options["card"],
+                product_ids=options["product"],
+                timeout=options["timeout"],
+                progress=progress,
+            )
+
+        except CheckoutError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"\nВремя теста: {report['duration']:.1f} сек, заказов: {report['orders']} "
+            f"(оплачено - {report['paid']}, не оплачено - {report['not_paid']}, "
+            f"ошибок - {report['errors']})"
+        )
+        self.stdout.write(
+            f"Пропускная способность: {report['throughput']:.2f} заказов/сек\n"
+        )
+        self.stdout.write(
+            f"{'Этап':<14}{'кол-во':>8}{'среднее':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'макс':>10}"
+        )
+
+        for name, stage in report["stages"].items():
+            self.stdout.write(
+                f"{name:<14}{stage['count']:>8}{stage['mean']:>10.3f}{stage['p50']:>10.3f}"
+                f"{stage['p90']:>10.3f}{stage['p99']:>10.3f}{stage['max']:>10.3f}"
+            )
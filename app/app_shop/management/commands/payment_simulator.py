@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.app_shop.services.payment_gateways.simulator import PaymentSimulator
+
+
+class Command(BaseCommand):
+    """
+    Команда для запуска HTTP-имитатора платежного сервиса (адаптер SimulatorGateway)
+    """
+
+    help = (
+        "Запуск HTTP-имитатора платежного сервиса с настраиваемой задержкой ответа, "
+        "долей ошибок и отказов для нагрузочного тестирования оплаты"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="0.0.0.0", help="Адрес")
+        parser.add_argument("--port", type=int, default=8100, help="Порт")
+        parser.add_argument(
+            "--latency-median",
+            type=float,
+            default=200,
+            help="Медиана задержки ответа (мс)",
+        )
+        parser.add_argument(
+            "--latency-sigma",
+            type=float,
+            default=0.5,
+            help="Разброс задержки (сигма логнормального распределения)",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0,
+            help="Доля запросов, завершающихся ошибкой 503 (0..1)",
+        )
+        parser.add_argument(
+            "--decline-rate",
+            type=float,
+            default=0.1,
+            help="Доля отклоненных платежей (0..1)",
+        )
+        parser.add_argument(
+            "--processing-time",
+            type=float,
+            default=2,
+            help="Время обработки авторизации платежа (сек)",
+        )
+        parser.add_argument(
+            "--webhook-url",
+            default="",
+            help="Адрес для уведомлений о платежах (например, http://web:8000/payment/webhook/)",
+        )
+        parser.add_argument(
+            "--secret",
+            default=settings.PAYMENT_GATEWAY.get("OPTIONS", {}).get("secret", ""),
+            help="Ключ подписи уведомлений (по умолчанию из settings.PAYMENT_GATEWAY)",
+        )
+
+    def handle(self, *args, **options) -> None:
+        simulator = PaymentSimulator(
+            latency_median=options["latency_median"],
+            latency_sigma=options["latency_sigma"],
+            error_rate=options["error_rate"],
+            decline_rate=options["decline_rate"],
+            processing_time=options["processing_time"],
+            webhook_url=options["webhook_url"],
+            secret=options["secret"],
+        )
+        server = simulator.server(host=options["host"], port=options["port"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Имитатор платежного сервиса запущен: {options['host']}:{options['port']}"
+            )
+        )
+
+        try:
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            server.server_close()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from app.app_shop.models.products import Product
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчета (заполнения) денормализованных счетчиков отзывов у товаров
+    """
+
+    help = "Пересчет счетчиков отзывов (reviews_count, active_reviews_count) у товаров"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Кол-во товаров, обновляемых одним запросом",
+        )
+
+    def handle(self, *args, **options) -> None:
+        batch_size = options["batch_size"]
+        product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+        updated = 0
+
+        # Обновляем товары пачками, чтобы не держать долгие блокировки на всей таблице
+        for start in range(0, len(product_ids), batch_size):
+            updated += Product.recount_reviews(product_ids[start : start + batch_size])
+            self.stdout.write(f"Обновлено товаров: {updated} из {len(product_ids)}")
+
+        self.stdout.write(self.style.SUCCESS("Счетчики отзывов пересчитаны"))
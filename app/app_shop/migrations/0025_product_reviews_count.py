@@ -0,0 +1,48 @@
+# Generated by Django 4.1.3 on 2026-10-18 19:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def recount_reviews(apps, schema_editor):
+    """
+    Заполнение счетчиков отзывов для существующих товаров
+    """
+    Product = apps.get_model("app_shop", "Product")
+    ProductReviews = apps.get_model("app_shop", "ProductReviews")
+
+    reviews = (
+        ProductReviews.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+    )
+    total = reviews.annotate(total=Count("id")).values("total")
+    active = reviews.filter(deleted=False).annotate(total=Count("id")).values("total")
+
+    Product.objects.update(
+        reviews_count=Coalesce(Subquery(total), Value(0)),
+        active_reviews_count=Coalesce(Subquery(active), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0024_alter_productbrowsinghistory_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="active_reviews_count",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, verbose_name="Активных отзывов"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="reviews_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Отзывов"),
+        ),
+        migrations.RunPython(recount_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:24
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Создание GIN-индексов для полнотекстового поиска и поиска по триграммам (только PostgreSQL)
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS products_search_vector_gin "
+        "ON products USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS products_name_trgm_gin "
+        "ON products USING gin (name gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("DROP INDEX IF EXISTS products_search_vector_gin")
+    schema_editor.execute("DROP INDEX IF EXISTS products_name_trgm_gin")
+
+
+def fill_search_vector(apps, schema_editor):
+    """
+    Заполнение поискового вектора для существующих товаров (только PostgreSQL)
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        "UPDATE products SET search_vector = "
+        "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(definition, '')), 'B') || "
+        "setweight(to_tsvector('russian', coalesce(("
+        "SELECT string_agg(t.name, ' ') FROM product_tags t "
+        "JOIN products_tags pt ON pt.producttags_id = t.id "
+        "WHERE pt.product_id = products.id AND NOT t.deleted"
+        "), '')), 'C')"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0025_product_reviews_count"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0026_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="delivery_total",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Стоимость доставки (руб.)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="grand_total",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Сумма к оплате (руб.)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="items_total",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Стоимость товаров (руб.)"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:16
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_primary_images(apps, schema_editor):
+    """
+    Заполнение основного изображения для существующих товаров
+    """
+    Product = apps.get_model("app_shop", "Product")
+    ProductImages = apps.get_model("app_shop", "ProductImages")
+
+    first_image = (
+        ProductImages.objects.filter(product=OuterRef("pk"))
+        .order_by("id")
+        .values("id")[:1]
+    )
+
+    Product.objects.update(primary_image=Subquery(first_image))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0027_order_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="primary_image",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="app_shop.productimages",
+                verbose_name="Основное изображение",
+            ),
+        ),
+        migrations.RunPython(fill_primary_images, migrations.RunPython.noop),
+    ]
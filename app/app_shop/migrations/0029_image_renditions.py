@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:19
+
+from django.db import migrations
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0028_product_primary_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="categoryproduct",
+            name="image_renditions",
+            field=jsonfield.fields.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="productimages",
+            name="image_renditions",
+            field=jsonfield.fields.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:23
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Объединение повторяющихся записей корзины (один товар у пользователя): кол-во суммируется
+    в первой записи, остальные записи удаляются
+    """
+    Cart = apps.get_model("app_shop", "Cart")
+
+    duplicates = (
+        Cart.objects.filter(user__isnull=False)
+        .values("user_id", "product_id")
+        .annotate(records=Count("id"), first_id=Min("id"), total=Sum("count"))
+        .filter(records__gt=1)
+    )
+
+    for duplicate in duplicates.iterator():
+        records = Cart.objects.filter(
+            user_id=duplicate["user_id"], product_id=duplicate["product_id"]
+        )
+        records.filter(id=duplicate["first_id"]).update(count=duplicate["total"])
+        records.exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0029_image_renditions"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cart",
+            constraint=models.UniqueConstraint(
+                fields=("user", "product"), name="unique_cart_user_product"
+            ),
+        ),
+    ]
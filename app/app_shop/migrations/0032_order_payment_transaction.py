@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0031_stock_reservation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="payment_transaction",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=100,
+                null=True,
+                verbose_name="Платеж в платежном сервисе",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0032_order_payment_transaction"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymenterrors",
+            name="code",
+            field=models.CharField(
+                blank=True,
+                max_length=50,
+                null=True,
+                unique=True,
+                verbose_name="Код ошибки платежного сервиса",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.3 on 2026-10-18 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_shop", "0033_payment_error_code"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="payment_updated_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                null=True,
+                verbose_name="Последнее действие по оплате",
+            ),
+        ),
+    ]
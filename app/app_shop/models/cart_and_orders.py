@@ -1,8 +1,9 @@
 import logging
 
-from typing import Dict
+from typing import Tuple
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Sum
 
 from app.app_shop.models.products import Product
 
@@ -27,6 +28,12 @@ class Cart(models.Model):
         db_table = "products_cart"
         verbose_name = "Корзина"
         verbose_name_plural = "Корзина"
+        constraints = [
+            # Одна запись на товар в корзине пользователя (кол-во меняется атомарным UPDATE / upsert)
+            models.UniqueConstraint(
+                fields=["user", "product"], name="unique_cart_user_product"
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Корзина покупателя"
@@ -49,12 +56,40 @@ class PaymentErrors(models.Model):
 
     title = models.CharField(max_length=150, verbose_name="Сообщение ошибки")
     description = models.CharField(max_length=500, verbose_name="Описание ошибки")
+    # Код ошибки платежного сервиса (GatewayResponse.error), сообщения без кода выводятся при прочих ошибках
+    code = models.CharField(
+        max_length=50,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Код ошибки платежного сервиса",
+    )
 
     class Meta:
         db_table = "payment_errors"
         verbose_name = "Ошибка оплаты"
         verbose_name_plural = "Ошибки оплаты"
 
+    def save(self, *args, **kwargs):
+        """
+        Сохранение сообщения со сбросом справочника ошибок оплаты
+        """
+        # Импорт внутри метода, т.к. справочник ошибок оплаты сам импортирует модели заказов
+        from app.app_shop.services.payment_errors import PaymentErrorCatalog
+
+        self.code = self.code or None  # Пустой код не участвует в проверке уникальности
+        super().save(*args, **kwargs)
+        PaymentErrorCatalog.invalidate()
+
+    def delete(self, *args, **kwargs):
+        # Импорт внутри метода, т.к. справочник ошибок оплаты сам импортирует модели заказов
+        from app.app_shop.services.payment_errors import PaymentErrorCatalog
+
+        result = super().delete(*args, **kwargs)
+        PaymentErrorCatalog.invalidate()
+
+        return result
+
     def __str__(self) -> str:
         return self.title
 
@@ -103,16 +138,86 @@ class Order(models.Model):
         null=True,
         verbose_name="Сообщение об ошибке",
     )
+    # id платежа в платежном сервисе (settings.PAYMENT_GATEWAY), по нему запрашивается статус оплаты
+    payment_transaction = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="Платеж в платежном сервисе",
+    )
+    # Время последнего действия по оплате (начало оплаты, создание платежа, проверка зависшей оплаты):
+    # заказы в статусе "Подтверждение оплаты" без действий дольше settings.PAYMENT_STALE_TIMEOUT проверяются заново
+    payment_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="Последнее действие по оплате",
+    )
+
+    # Стоимость заказа, рассчитывается один раз при оформлении заказа (RegistrationOrderService.create_order).
+    # Для заказов, оформленных до появления полей, заполняется командой backfill_order_totals.
+    items_total = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="Стоимость товаров (руб.)"
+    )
+    delivery_total = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="Стоимость доставки (руб.)"
+    )
+    grand_total = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="Сумма к оплате (руб.)"
+    )
 
     @property
-    def order_cost(self) -> Dict:
+    def order_cost(self) -> int:
+        """
+        Стоимость товаров заказа (с учетом кол-ва каждого товара и цены со скидкой на момент покупки).
+        Если стоимость не сохранена в заказе - подсчет одним агрегирующим запросом.
+        """
+        if self.items_total is not None:
+            return self.items_total
+
+        logger.warning(f"Стоимость заказа №{self.id} не сохранена, подсчет по товарам")
+
+        return self.calculate_items_total()
+
+    @classmethod
+    def change_status(
+        cls, order_id: int, status: int, current: Tuple[int, ...], **fields
+    ) -> bool:
+        """
+        Смена статуса заказа одним условным запросом: статус меняется, только если текущий статус входит
+        в current, поэтому повторная обработка того же события (повтор задачи) ничего не меняет.
+        Новый статус публикуется в канал уведомлений заказа (страница ожидания оплаты).
+
+        @param order_id: id заказа
+        @param status: новый статус
+        @param current: статусы, из которых возможен переход
+        @param fields: другие изменяемые поля заказа
+        @return: True - статус изменен / False - заказ не найден или уже в другом статусе
         """
-        Расчет стоимости заказа с учетом кол-ва каждого товара и текущей цены с учетом скидки
+        # Импорт внутри метода, т.к. канал уведомлений сам импортирует модели заказов
+        from app.app_shop.services.order_events import OrderStatusChannel
+
+        changed = bool(
+            cls.objects.filter(id=order_id, status__in=current).update(
+                status=status, **fields
+            )
+        )
+
+        if changed:
+            OrderStatusChannel.publish(order_id=order_id, status=status)
+
+        return changed
+
+    def calculate_items_total(self) -> int:
+        """
+        Подсчет стоимости товаров заказа по сохраненным позициям (один агрегирующий запрос)
         """
-        products = PurchasedProduct.objects.filter(order__id=self.id)
-        amount = sum(record.price for record in products)
+        amount = PurchasedProduct.objects.filter(order_id=self.id).aggregate(
+            total=Sum("price")
+        )["total"]
 
-        return amount
+        return amount or 0
 
     class Meta:
         verbose_name = "Заказ"
@@ -153,3 +258,44 @@ class PurchasedProduct(models.Model):
         Стоимость одной позиции товара с кол-ва (с округлением до целого)
         """
         return int(self.price * self.count)
+
+
+class StockReservation(models.Model):
+    """
+    Модель для хранения резерва товара под заказ: кол-во списывается со склада при оформлении заказа
+    и возвращается, если заказ не оплачен до окончания срока резерва (StockReservationService)
+    """
+
+    STATUS_CHOICES = (
+        (1, "Зарезервирован"),
+        (2, "Возвращен на склад"),
+        (3, "Выкуплен"),
+    )
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        verbose_name="Заказ",
+    )
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, verbose_name="Товар")
+    count = models.PositiveIntegerField(verbose_name="Кол-во")
+    status = models.IntegerField(
+        choices=STATUS_CHOICES, default=1, verbose_name="Статус"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан")
+    expires_at = models.DateTimeField(verbose_name="Действует до")
+
+    class Meta:
+        db_table = "stock_reservations"
+        verbose_name = "Резерв товара"
+        verbose_name_plural = "Резервы товаров"
+        indexes = [
+            # Поиск просроченных резервов (StockReservationService.release_expired)
+            models.Index(
+                fields=["status", "expires_at"], name="reservation_status_expires"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Резерв товара по заказу №{self.order_id}"
@@ -1,14 +1,23 @@
 import logging
 
 from django.contrib.auth.models import User
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.files.storage import default_storage
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.urls import reverse
+from django_cleanup import cleanup
 from pytils.translit import slugify
 from mptt.models import MPTTModel, TreeForeignKey
 from jsonfield import JSONField
 from django.core.cache import cache
 
+from app.app_shop.services.renditions import ImageRenditionService
 from app.app_shop.utils.models.saving_files import (
     saving_the_category_icon,
     saving_the_category_image,
@@ -24,6 +33,9 @@ STATUS_CHOICES = [
     (False, "Активно"),
 ]
 
+# Конфигурация полнотекстового поиска PostgreSQL (стемминг для русского языка)
+SEARCH_CONFIG = "russian"
+
 
 class CategoryProduct(MPTTModel):
     """
@@ -40,6 +52,9 @@ class CategoryProduct(MPTTModel):
     image = models.ImageField(
         upload_to=saving_the_category_image, verbose_name="Изображение"
     )
+    # Уменьшенные копии изображения (создаются фоновой задачей, services.renditions)
+    image_renditions = JSONField(default=dict, blank=True, editable=False)
+    RENDITIONS = {"image": ("card",)}  # Поле изображения - назначения копий
 
     selected = models.BooleanField(default=False, verbose_name="Избранная категория")
     deleted = models.BooleanField(
@@ -72,11 +87,20 @@ class CategoryProduct(MPTTModel):
 
     def save(self, *args, **kwargs):
         """
-        Сохранение поля slug по названию категории
+        Сохранение поля slug по названию категории.
+        Сброс кэша подсказок поиска, создание уменьшенных копий изображения.
         """
+        # Импорт внутри метода, т.к. сервис подсказок сам импортирует модели товаров
+        from app.app_shop.services.products.autocomplete import (
+            ProductAutocompleteService,
+        )
+
         self.slug = slugify(self.title)
         super(CategoryProduct, self).save(*args, **kwargs)
 
+        ProductAutocompleteService.invalidate()
+        ImageRenditionService.schedule(self)
+
     def __str__(self) -> str:
         return self.title
 
@@ -99,13 +123,24 @@ class ProductTags(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Сохранение поля slug по названию тега
+        Сохранение поля slug по названию тега.
+        Обновление поискового индекса товаров с текущим тегом, сброс кэша фасетов каталога (фильтр по тегу).
         """
+        # Импорт внутри метода, т.к. сервис фасетов сам импортирует модели товаров
+        from app.app_shop.services.products.products_list.facets import (
+            ProductFacetService,
+        )
+
         if not self.slug:
             self.slug = slugify(self.name)
 
         super(ProductTags, self).save(*args, **kwargs)
 
+        product_ids = list(self.product_set.values_list("id", flat=True))
+        Product.update_search_vector(product_ids)
+        Product.update_search_index(product_ids)
+        ProductFacetService.invalidate()
+
     def __str__(self):
         return self.name
 
@@ -140,6 +175,26 @@ class Product(models.Model):
     )  # Мягкое удаление
     purchases = models.PositiveIntegerField(default=0, verbose_name="Покупок")
 
+    # Денормализованные счетчики отзывов (обновляются в ProductReviews.save / delete и командой recount_reviews)
+    reviews_count = models.PositiveIntegerField(default=0, verbose_name="Отзывов")
+    active_reviews_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Активных отзывов"
+    )
+
+    # Поисковый вектор по названию, описанию и тегам (обновляется в save, индекс GIN - только в PostgreSQL)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Основное изображение товара для карточек (первое изображение, обновляется в save / delete изображений)
+    primary_image = models.ForeignKey(
+        "ProductImages",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+        verbose_name="Основное изображение",
+    )
+
     class Meta:
         db_table = "products"
         verbose_name = "Товар"
@@ -148,7 +203,7 @@ class Product(models.Model):
 
     @property
     def image(self):
-        return self.productimages_set.first()
+        return self.primary_image
 
     @property
     def discounted_price(self) -> int:
@@ -160,18 +215,148 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         """
         Автоматическое обновление поля limited_edition в зависимости от кол-ва товара.
+        Обновление поискового вектора и индекса товара, сброс кэша подсказок поиска и фасетов каталога.
         Очистка кэша с данными о товаре при обновлении товара.
         """
+        # Импорт внутри метода, т.к. сервисы подсказок и фасетов сами импортируют модели товаров
+        from app.app_shop.services.products.autocomplete import (
+            ProductAutocompleteService,
+        )
+        from app.app_shop.services.products.products_list.facets import (
+            ProductFacetService,
+        )
+
+        self.update_limited_edition()
+        super(Product, self).save(*args, **kwargs)
+        logger.info(f"Товар сохранен: id - {self.id}")
+
+        # Сохраненный объект мог содержать устаревшую ссылку на основное изображение
+        Product.update_primary_images([self.id])
+        Product.update_search_vector([self.id])
+        Product.update_search_index([self.id])
+        ProductAutocompleteService.invalidate()
+        ProductFacetService.invalidate()
+
+        if cache.delete(f"product_{self.id}"):
+            logger.info("Кэш товара очищен")
+
+    def update_limited_edition(self) -> None:
+        """
+        Обновление поля limited_edition в зависимости от кол-ва товара (без сохранения)
+        """
         if 0 <= self.count <= 100:
             self.limited_edition = True
         else:
             self.limited_edition = False
 
-        super(Product, self).save(*args, **kwargs)
-        logger.info(f"Товар сохранен: id - {self.id}")
+    @classmethod
+    def update_search_index(cls, product_ids) -> None:
+        """
+        Постановка обновления записей инвертированного поискового индекса (services.products.search_index)
+        в фоновую задачу после фиксации транзакции, чтобы в индекс не попадали данные отмененных изменений
 
-        if cache.delete(f"product_{self.id}"):
-            logger.info("Кэш товара очищен")
+        @param product_ids: список с id товаров
+        """
+        # Импорт внутри метода, т.к. модуль индекса сам импортирует модели товаров
+        from app.app_shop.services.products.search_index import ProductSearchIndex
+
+        product_ids = list(product_ids)
+        transaction.on_commit(lambda: ProductSearchIndex.schedule(product_ids))
+
+    @classmethod
+    def update_search_vector(cls, product_ids=None) -> int:
+        """
+        Обновление поискового вектора товаров одним UPDATE-запросом
+        (название - вес A, описание - вес B, активные теги - вес C).
+        Выполняется только для PostgreSQL, для остальных СУБД поиск работает без вектора.
+
+        @param product_ids: список с id товаров (None - обновление всех товаров)
+        @return: кол-во обновленных товаров
+        """
+        if connection.vendor != "postgresql":
+            return 0
+
+        tags = (
+            ProductTags.objects.filter(product=OuterRef("pk"), deleted=False)
+            .order_by()
+            .values("product")
+            .annotate(names=StringAgg("name", delimiter=" "))
+            .values("names")
+        )
+
+        products = cls.objects.all()
+
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+
+        updated = products.update(
+            search_vector=SearchVector("name", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("definition", weight="B", config=SEARCH_CONFIG)
+            + SearchVector(
+                Coalesce(Subquery(tags), Value("")), weight="C", config=SEARCH_CONFIG
+            )
+        )
+        logger.debug(f"Обновлен поисковый вектор: товаров - {updated}")
+
+        return updated
+
+    @classmethod
+    def update_primary_images(cls, product_ids=None) -> int:
+        """
+        Обновление основного изображения товаров одним UPDATE-запросом (изображение с наименьшим id)
+
+        @param product_ids: список с id товаров (None - обновление всех товаров)
+        @return: кол-во обновленных товаров
+        """
+        first_image = (
+            ProductImages.objects.filter(product=OuterRef("pk"))
+            .order_by("id")
+            .values("id")[:1]
+        )
+
+        products = cls.objects.all()
+
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+
+        updated = products.update(primary_image=Subquery(first_image))
+        logger.debug(f"Обновлено основное изображение: товаров - {updated}")
+
+        return updated
+
+    @classmethod
+    def recount_reviews(cls, product_ids=None) -> int:
+        """
+        Пересчет счетчиков отзывов одним UPDATE-запросом (используется при массовых изменениях отзывов)
+
+        @param product_ids: список с id товаров (None - пересчет для всех товаров)
+        @return: кол-во обновленных товаров
+        """
+        reviews = (
+            ProductReviews.objects.filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+        )
+        total = reviews.annotate(total=Count("id")).values("total")
+        active = (
+            reviews.filter(deleted=False).annotate(total=Count("id")).values("total")
+        )
+
+        products = cls.objects.all()
+
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+
+        updated = products.update(
+            reviews_count=Coalesce(Subquery(total), Value(0)),
+            active_reviews_count=Coalesce(Subquery(active), Value(0)),
+        )
+        logger.info(f"Пересчитаны счетчики отзывов: товаров - {updated}")
+
+        if product_ids is not None:
+            cache.delete_many([f"product_{product_id}" for product_id in product_ids])
+
+        return updated
 
     def __str__(self) -> str:
         return str(self.name)
@@ -194,6 +379,8 @@ class ProductBrowsingHistory(models.Model):
         ordering = ["-viewing_time"]
 
 
+# Файлы удаляются моделью (release_files): одинаковые изображения из массовой загрузки - общие файлы нескольких записей
+@cleanup.ignore
 class ProductImages(models.Model):
     """
     Модель для хранения изображений к товарам
@@ -206,6 +393,11 @@ class ProductImages(models.Model):
     product = models.ForeignKey(
         "Product", on_delete=models.CASCADE, verbose_name="Товар", related_name="images"
     )
+    # Уменьшенные копии изображения (создаются фоновой задачей, services.renditions)
+    image_renditions = JSONField(default=dict, blank=True, editable=False)
+    RENDITIONS = {
+        "image": ("card", "cart", "gallery")
+    }  # Поле изображения - назначения копий
 
     class Meta:
         db_table = "product_images"
@@ -215,6 +407,77 @@ class ProductImages(models.Model):
     def __str__(self) -> str:
         return str(self.title)
 
+    def save(self, *args, **kwargs):
+        """
+        Сохранение изображения с обновлением основного изображения товара и созданием уменьшенных копий
+        """
+        with transaction.atomic():
+            previous_product, previous_image = None, None
+
+            if not self._state.adding:
+                previous_product, previous_image = (
+                    ProductImages.objects.filter(pk=self.pk)
+                    .values_list("product_id", "image")
+                    .first()
+                ) or (None, None)
+
+            super(ProductImages, self).save(*args, **kwargs)
+            self.update_products({previous_product, self.product_id} - {None})
+            ImageRenditionService.schedule(self)
+
+            # Копии прежнего изображения удаляются задачей создания новых копий
+            if previous_image and previous_image != self.image.name:
+                self.release_files(name=previous_image)
+
+    def delete(self, *args, **kwargs):
+        """
+        Удаление изображения с выбором нового основного изображения товара
+        """
+        with transaction.atomic():
+            result = super(ProductImages, self).delete(*args, **kwargs)
+            self.update_products({self.product_id})
+
+        return result
+
+    @classmethod
+    def update_products(cls, product_ids) -> None:
+        """
+        Обновление основного изображения и сброс кэша переданных товаров
+        """
+        Product.update_primary_images(product_ids)
+        cache.delete_many([f"product_{product_id}" for product_id in product_ids])
+
+    @classmethod
+    def release_files(cls, name: str, renditions=None) -> None:
+        """
+        Удаление файла изображения и его копий после фиксации транзакции,
+        если файл не используется другими записями
+
+        @param name: имя файла в хранилище
+        @param renditions: словарь с копиями изображения
+        """
+
+        def delete() -> None:
+            if not name or cls.objects.filter(image=name).exists():
+                return
+
+            for file_name in {name, *ImageRenditionService.names(renditions or {})}:
+                default_storage.delete(file_name)
+
+            logger.info(f"Удален файл изображения товара: {name}")
+
+        transaction.on_commit(delete)
+
+
+@receiver(post_delete, sender=ProductImages)
+def release_product_image_files(sender, instance, **kwargs) -> None:
+    """
+    Удаление файлов изображения после удаления записи (в т.ч. массового и каскадного)
+    """
+    ProductImages.release_files(
+        name=instance.image.name, renditions=instance.image_renditions
+    )
+
 
 class ProductReviews(models.Model):
     """
@@ -239,5 +502,60 @@ class ProductReviews(models.Model):
         verbose_name_plural = "Отзывы о товаре"
         ordering = ["created_at"]
 
+    def save(self, *args, **kwargs):
+        """
+        Сохранение отзыва с обновлением счетчиков отзывов товара в той же транзакции
+        """
+        with transaction.atomic():
+            previous = None
+
+            if not self._state.adding:
+                previous = (
+                    ProductReviews.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values("product_id", "deleted")
+                    .first()
+                )
+
+            super(ProductReviews, self).save(*args, **kwargs)
+
+            if previous and previous["product_id"] != self.product_id:
+                # Отзыв перенесен к другому товару - пересчитываем оба товара
+                Product.recount_reviews([previous["product_id"], self.product_id])
+
+            elif previous is None:
+                self.change_counters(total=1, active=0 if self.deleted else 1)
+
+            elif previous["deleted"] != self.deleted:
+                self.change_counters(total=0, active=-1 if self.deleted else 1)
+
+    def delete(self, *args, **kwargs):
+        """
+        Удаление отзыва с обновлением счетчиков отзывов товара в той же транзакции
+        """
+        with transaction.atomic():
+            deleted = ProductReviews.objects.filter(pk=self.pk, deleted=False).exists()
+            result = super(ProductReviews, self).delete(*args, **kwargs)
+            self.change_counters(total=-1, active=-1 if deleted else 0)
+
+        return result
+
+    def change_counters(self, total: int, active: int) -> None:
+        """
+        Изменение счетчиков отзывов товара атомарным UPDATE (без чтения записи товара)
+
+        @param total: изменение общего кол-ва отзывов
+        @param active: изменение кол-ва активных отзывов
+        @return: None
+        """
+        if not total and not active:
+            return
+
+        Product.objects.filter(pk=self.product_id).update(
+            reviews_count=F("reviews_count") + total,
+            active_reviews_count=F("active_reviews_count") + active,
+        )
+        cache.delete(f"product_{self.product_id}")
+
     def __str__(self) -> str:
         return self.product.name
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Type, Union
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class CachedRow(ABC):
+    """
+    Базовый класс компактной записи для кэша: только нужные поля (__slots__), без ссылок на модели и QuerySet,
+    поэтому запись безопасно сериализуется для общего кэша и не выполняет запросов при чтении полей.
+    Наследники задают __slots__ и метод from_object.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    @abstractmethod
+    def from_object(cls, obj) -> "CachedRow":
+        """
+        Метод для создания записи по объекту модели (или другим исходным данным)
+        """
+        raise NotImplementedError
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class CategoryRow(CachedRow):
+    """
+    Категория товаров для вывода на главной странице
+    """
+
+    __slots__ = ("id", "title", "slug", "image_url", "image_renditions", "min_price")
+
+    @classmethod
+    def from_object(cls, obj) -> "CategoryRow":
+        return cls(
+            id=obj.id,
+            title=obj.title,
+            slug=obj.slug,
+            image_url=obj.image.url if obj.image else "",
+            image_renditions=obj.image_renditions,
+            min_price=getattr(obj, "min_price", None),
+        )
+
+
+class CommentRow(CachedRow):
+    """
+    Комментарий к товару с данными автора
+    """
+
+    __slots__ = (
+        "id",
+        "created_at",
+        "review",
+        "full_name",
+        "avatar_url",
+        "avatar_renditions",
+    )
+
+    @classmethod
+    def from_object(cls, obj) -> "CommentRow":
+        profile = obj.buyer.profile
+
+        return cls(
+            id=obj.id,
+            created_at=obj.created_at,
+            review=obj.review,
+            full_name=profile.full_name,
+            avatar_url=profile.avatar.url if profile.avatar else "",
+            avatar_renditions=profile.avatar_renditions,
+        )
+
+
+class CachedQueryService:
+    """
+    Сервис для кэширования результатов запросов.
+    Запрос передается функцией (loader) и выполняется только при промахе кэша; результат сохраняется
+    списком (объектов моделей или компактных записей CachedRow), а не QuerySet, который при чтении из кэша
+    мог бы повторно обращаться к БД. Для каждой группы ключей (начало ключа до "_") считаются попадания и промахи;
+    статистика процесса записывается в лог каждые _LOG_INTERVAL обращений.
+    """
+
+    _MISSING = object()
+    _LOG_INTERVAL = 1000  # Кол-во обращений к кэшу между записями статистики в лог
+    _metrics = defaultdict(lambda: {"hits": 0, "misses": 0})
+    _lookups = 0  # Кол-во обращений к кэшу в текущем процессе
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_or_load(
+        cls,
+        key: str,
+        loader: Callable[[], Iterable],
+        timeout: int,
+        row: Type[CachedRow] = None,
+        many: bool = True,
+    ):
+        """
+        Метод возвращает список записей из кэша, при промахе выполняет запрос и сохраняет результат
+
+        @param key: ключ кэша
+        @param loader: функция, возвращающая QuerySet или другой итерируемый объект с записями
+        @param timeout: время кэширования (сек)
+        @param row: класс компактной записи (None - сохраняются сами объекты моделей)
+        @param many: False - функция возвращает один объект, который сохраняется без преобразования
+        @return: список записей / объект
+        """
+        value = cache.get(key, cls._MISSING)
+
+        if value is not cls._MISSING:
+            cls.count(key=key, hit=True)
+            return value
+
+        cls.count(key=key, hit=False)
+        logger.debug(f"Промах кэша, выполнение запроса: {key}")
+
+        value = loader()
+
+        if many:
+            value = (
+                [row.from_object(record) for record in value] if row else list(value)
+            )
+
+        cache.set(key, value, timeout)
+
+        return value
+
+    @classmethod
+    def count(cls, key: str, hit: bool) -> None:
+        """
+        Метод для учета попадания / промаха кэша по группе ключа
+        """
+        namespace = key.split("_", 1)[0]
+
+        with cls._lock:
+            cls._metrics[namespace]["hits" if hit else "misses"] += 1
+            cls._lookups += 1
+            report = cls._lookups % cls._LOG_INTERVAL == 0
+
+        if report:
+            cls.log_metrics()
+
+    @classmethod
+    def log_metrics(cls) -> None:
+        """
+        Метод записывает в лог статистику кэша текущего процесса по группам ключей
+        """
+        for namespace, counters in sorted(cls.metrics().items()):
+            logger.info(
+                f"Статистика кэша (процесс {os.getpid()}): {namespace} - попаданий {counters['hits']}, "
+                f"промахов {counters['misses']}, доля попаданий {counters['hit_ratio']}"
+            )
+
+    @classmethod
+    def metrics(cls) -> Dict[str, Dict[str, Union[int, float]]]:
+        """
+        Метод возвращает статистику кэша текущего процесса по группам ключей
+
+        @return: словарь: группа - кол-во попаданий, промахов и доля попаданий
+        """
+        with cls._lock:
+            result = {}
+
+            for namespace, counters in cls._metrics.items():
+                total = counters["hits"] + counters["misses"]
+                result[namespace] = {
+                    **counters,
+                    "hit_ratio": round(counters["hits"] / total, 3) if total else 0.0,
+                }
+
+            return result
+
+    @classmethod
+    def reset_metrics(cls) -> None:
+        with cls._lock:
+            cls._metrics.clear()
+            cls._lookups = 0
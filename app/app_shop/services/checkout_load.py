@@ -0,0 +1,378 @@
+import logging
+import math
+import random
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import Cookie, CookieJar, eff_request_host
+from typing import Callable, Dict, List, Union
+from urllib.error import URLError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import Resolver404, resolve, reverse
+from django.utils.crypto import get_random_string
+
+from app.app_user.models import Profile
+from app.app_user.utils.save_new_user import save_username
+from app.app_shop.models.cart_and_orders import Order
+from app.app_shop.models.products import Product
+
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutError(Exception):
+    """
+    Ошибка этапа оформления заказа виртуальным покупателем
+    """
+
+
+class BuyerSession:
+    """
+    HTTP-сессия виртуального покупателя (свои cookie: сессия, CSRF, корзина)
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+
+        # Токен CSRF задается покупателем: страницы с формами кэшируются (cache_page) без установки cookie
+        self.cookies.set_cookie(
+            Cookie(
+                version=0,
+                name=settings.CSRF_COOKIE_NAME,
+                value=get_random_string(32),
+                port=None,
+                port_specified=False,
+                domain=eff_request_host(Request(self.base_url))[1],
+                domain_specified=False,
+                domain_initial_dot=False,
+                path="/",
+                path_specified=True,
+                secure=False,
+                expires=None,
+                discard=True,
+                comment=None,
+                comment_url=None,
+                rest={},
+            )
+        )
+
+    def request(self, path: str, data: Union[bytes, None] = None) -> str:
+        """
+        Метод для выполнения запроса (с переходом по редиректам)
+
+        @param path: путь страницы
+        @param data: данные формы (POST-запрос)
+        @return: путь последней страницы
+        """
+        url = self.base_url + path
+        request = Request(url, data=data, headers={"Referer": url})
+
+        with self.opener.open(request) as response:
+            response.read()
+
+            return urlsplit(response.geturl()).path
+
+    def post(self, path: str, fields: Dict) -> str:
+        """
+        Метод для отправки формы с токеном CSRF из cookie (токен меняется при авторизации)
+        """
+        token = next(
+            (
+                cookie.value
+                for cookie in self.cookies
+                if cookie.name == settings.CSRF_COOKIE_NAME
+            ),
+            "",
+        )
+
+        return self.request(
+            path, data=urlencode(fields | {"csrfmiddlewaretoken": token}).encode()
+        )
+
+
+class CheckoutLoadService:
+    """
+    Сервис для нагрузочного тестирования оформления и оплаты заказов.
+    Виртуальные покупатели (отдельный поток и cookie на каждого) параллельно проходят весь путь через HTTP:
+    авторизация, добавление товара в корзину, оформление заказа (OrderRegistrationView), ввод номера карты
+    (PaymentView) и ожидание итогового статуса заказа (задачи Celery и платежный сервис settings.PAYMENT_GATEWAY).
+    Для каждого этапа и всего пути считаются перцентили времени выполнения, для всего теста - пропускная способность.
+    Товары резервируются под заказы, поэтому тест расходует остатки товаров на складе.
+    """
+
+    STAGES = ("login", "cart", "order", "payment", "confirmation", "total")
+    PERCENTILES = (50, 90, 99)
+
+    @classmethod
+    def create_users(cls, count: int, password: str, prefix: str = "loadtest") -> int:
+        """
+        Метод для создания учетных записей виртуальных покупателей (существующие записи не изменяются)
+
+        @param count: кол-во покупателей
+        @param password: пароль
+        @param prefix: начало email покупателей
+        @return: кол-во созданных покупателей
+        """
+        usernames = [save_username(email) for email in cls.emails(count, prefix)]
+        existing = set(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", flat=True
+            )
+        )
+        created = 0
+
+        for username, email in zip(usernames, cls.emails(count, prefix)):
+            if username in existing:
+                continue
+
+            user = User.objects.create_user(
+                username=username, email=email, password=password
+            )
+            Profile.objects.create(user=user, full_name=f"Покупатель {username}")
+            created += 1
+
+        logger.info(f"Созданы учетные записи для нагрузочного теста: {created}")
+
+        return created
+
+    @classmethod
+    def emails(cls, count: int, prefix: str = "loadtest") -> List[str]:
+        return [f"{prefix}{number}@example.com" for number in range(count)]
+
+    @classmethod
+    def run(
+        cls,
+        base_url: str,
+        users: int,
+        concurrency: int,
+        password: str,
+        card_number: str,
+        product_ids: Union[List[int], None] = None,
+        prefix: str = "loadtest",
+        timeout: float = 120,
+        progress: Union[Callable[[int, Dict], None], None] = None,
+    ) -> Dict:
+        """
+        Метод для запуска нагрузочного теста
+
+        @param base_url: адрес магазина (например, http://localhost:8000)
+        @param users: кол-во виртуальных покупателей (по одному заказу на покупателя)
+        @param concurrency: кол-во одновременно оформляемых заказов
+        @param password: пароль покупателей
+        @param card_number: номер карты для оплаты
+        @param product_ids: id товаров (товар заказа выбирается случайно) / None - товары в наличии
+        @param prefix: начало email покупателей
+        @param timeout: макс. время ожидания итогового статуса заказа (сек)
+        @param progress: функция, вызываемая после каждого заказа с кол-вом завершенных заказов и результатом
+        @return: отчет: кол-во заказов по результатам, пропускная способность, перцентили этапов (сек)
+        """
+        if not product_ids:
+            product_ids = list(
+                Product.objects.filter(deleted=False, count__gt=0)
+                .order_by("-count")
+                .values_list("id", flat=True)[:20]
+            )
+
+        if not product_ids:
+            raise CheckoutError("Нет товаров в наличии")
+
+        logger.info(
+            f"Нагрузочный тест: покупателей - {users}, одновременно - {concurrency}, {base_url}"
+        )
+
+        results = []
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(
+                    cls.checkout,
+                    base_url=base_url,
+                    email=email,
+                    password=password,
+                    card_number=card_number,
+                    product_id=random.choice(product_ids),
+                    timeout=timeout,
+                )
+                for email in cls.emails(users, prefix)
+            ]
+
+            for future in futures:
+                results.append(future.result())
+
+                if progress:
+                    progress(len(results), results[-1])
+
+        return cls.report(results=results, duration=time.monotonic() - started)
+
+    @classmethod
+    def checkout(
+        cls,
+        base_url: str,
+        email: str,
+        password: str,
+        card_number: str,
+        product_id: int,
+        timeout: float,
+    ) -> Dict:
+        """
+        Метод для оформления и оплаты одного заказа виртуальным покупателем
+
+        @return: результат: "result" ("paid" / "not_paid" / "error"), "error", время этапов (сек)
+        """
+        session = BuyerSession(base_url)
+        timings, started = {}, time.monotonic()
+
+        def stage(name: str, func: Callable):
+            start = time.monotonic()
+            value = func()
+            timings[name] = time.monotonic() - start
+
+            return value
+
+        try:
+            stage("login", lambda: cls.login(session, email=email, password=password))
+            stage(
+                "cart",
+                lambda: session.request(
+                    reverse("shop:add_product")
+                    + "?"
+                    + urlencode({"product_id": product_id, "count": 1})
+                ),
+            )
+            order_id = stage("order", lambda: cls.order(session, email=email))
+            stage(
+                "payment",
+                lambda: session.post(
+                    reverse("shop:online_payment", kwargs={"order_id": order_id}),
+                    {"numero1": card_number},
+                ),
+            )
+            status = stage(
+                "confirmation", lambda: cls.wait(order_id=order_id, timeout=timeout)
+            )
+
+        except (CheckoutError, URLError, OSError) as exc:
+            logger.warning(f"Заказ покупателя {email} не оформлен: {exc}")
+            return {"result": "error", "error": str(exc), **timings}
+
+        finally:
+            # Соединение потока с БД (ожидание статуса заказа)
+            connection.close()
+
+        timings["total"] = time.monotonic() - started
+
+        return {"result": "paid" if status == 4 else "not_paid", **timings}
+
+    @classmethod
+    def login(cls, session: BuyerSession, email: str, password: str) -> None:
+        """
+        Метод для авторизации покупателя
+        """
+        path = reverse("user:login")
+
+        if session.post(path, {"email": email, "password": password}) == path:
+            raise CheckoutError(f"Ошибка авторизации: {email}")
+
+    @classmethod
+    def order(cls, session: BuyerSession, email: str) -> int:
+        """
+        Метод для оформления заказа
+
+        @return: id заказа (из адреса страницы оплаты)
+        """
+        path = session.post(
+            reverse("shop:order_registration"),
+            {
+                "full_name": "Нагрузочный тест",
+                "phone_number": "9000000000",
+                "email": email,
+                "delivery": "ordinary",
+                "city": "Москва",
+                "address": "ул. Тестовая, д. 1",
+                "pay": "online",
+            },
+        )
+
+        try:
+            match = resolve(path)
+
+        except Resolver404:
+            match = None
+
+        if match is None or match.url_name != "online_payment":
+            raise CheckoutError("Заказ не оформлен (нет перехода на страницу оплаты)")
+
+        return int(match.kwargs["order_id"])
+
+    @classmethod
+    def wait(cls, order_id: int, timeout: float) -> int:
+        """
+        Метод для ожидания итогового статуса заказа ("Оплачен" / "Не оплачен")
+
+        @return: статус заказа
+        """
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            status = Order.objects.values_list("status", flat=True).get(id=order_id)
+
+            if status in (2, 4):
+                return status
+
+            time.sleep(0.2)
+
+        raise CheckoutError(
+            f"Заказ №{order_id}: нет итогового статуса за {timeout} сек"
+        )
+
+    @classmethod
+    def report(cls, results: List[Dict], duration: float) -> Dict:
+        """
+        Метод для подсчета итогов теста
+
+        @param results: результаты заказов
+        @param duration: время теста (сек)
+        @return: отчет
+        """
+        report = {
+            "duration": duration,
+            "orders": len(results),
+            "paid": sum(result["result"] == "paid" for result in results),
+            "not_paid": sum(result["result"] == "not_paid" for result in results),
+            "errors": sum(result["result"] == "error" for result in results),
+            "stages": {},
+        }
+        completed = report["paid"] + report["not_paid"]
+        report["throughput"] = completed / duration if duration else 0
+
+        for name in cls.STAGES:
+            values = sorted(result[name] for result in results if name in result)
+
+            if values:
+                report["stages"][name] = {
+                    "count": len(values),
+                    "mean": sum(values) / len(values),
+                    "max": values[-1],
+                    **{
+                        f"p{percent}": cls.percentile(values, percent)
+                        for percent in cls.PERCENTILES
+                    },
+                }
+
+        return report
+
+    @classmethod
+    def percentile(cls, values: List[float], percent: float) -> float:
+        """
+        Метод возвращает перцентиль отсортированного списка значений (по ближайшему рангу)
+        """
+        rank = math.ceil(len(values) * percent / 100)
+
+        return values[min(max(rank, 1), len(values)) - 1]
@@ -1,11 +1,12 @@
 import random
 import logging
 
-from typing import Dict
-from django.db.models import Min, QuerySet
+from typing import Dict, List
+from django.db.models import Min
 from django.http import HttpRequest
-from django.core.cache import cache
 
+from app.app_shop.services.caching import CachedQueryService, CategoryRow
+from app.app_shop.services.products.images import ProductImageService
 from app.app_shop.services.shop_cart.logic import CartProductsListService
 from app.app_shop.models.products import Product, CategoryProduct
 
@@ -34,6 +35,11 @@ class ProductsForMainService:
         context["limited_products"] = ProductsForMainService.limited_edition()
         context["popular_products"] = ProductsForMainService.popular_products()
 
+        # Изображения карточек, которых нет в закэшированных списках, загружаются одним запросом
+        ProductImageService.attach(
+            [*context["limited_products"], *context["popular_products"]]
+        )
+
         # id товаров в корзине текущего пользователя
         # для корректного отображения кнопки добавления/удаления товара из корзины в карточке товара
         context["products_id"] = CartProductsListService.id_products(request=request)
@@ -41,59 +47,77 @@ class ProductsForMainService:
         return context
 
     @classmethod
-    def selected_categories(cls) -> QuerySet:
+    def selected_categories(cls) -> List[CategoryRow]:
         """
         Метод для возврата 3-ех избранных категорий товаров, указанных в конфигурации сайта
 
-        @return: QuerySet с избранными категориями
+        @return: список с избранными категориями
         """
 
-        categories = cache.get_or_set(
-            "selected_categories",
-            CategoryProduct.objects.only("title", "slug", "image")
+        categories = CachedQueryService.get_or_load(
+            key="selected_categories",
+            loader=lambda: CategoryProduct.objects.only(
+                "title", "slug", "image", "image_renditions"
+            )
             .filter(selected=True)
             .annotate(min_price=Min("product__price"))[:3],
-            cls._CACHING_TIME,
+            timeout=cls._CACHING_TIME,
+            row=CategoryRow,
         )
 
         return categories
 
     @classmethod
-    def popular_products(cls) -> QuerySet:
+    def popular_products(cls) -> List[Product]:
         """
         Метод возвращает ТОП 8 популярных продуктов (ТОП по продажам).
         Сначала отбирается 30 наиболее популярных товаров, из которых случайным образом возвращается 8
 
-        @return: QuerySet с товарами
+        @return: список с товарами
         """
 
-        most_popular_products = cache.get_or_set(
-            "popular_products",
-            list(
-                Product.objects.select_related("category")
-                .only("id", "name", "category__title", "price", "discount")
-                .order_by("-purchases")[:30]
-            ),
-            cls._CACHING_TIME,
+        most_popular_products = CachedQueryService.get_or_load(
+            key="popular_products",
+            loader=lambda: Product.objects.select_related("category", "primary_image")
+            .only(
+                "id",
+                "name",
+                "category__title",
+                "price",
+                "discount",
+                "primary_image__title",
+                "primary_image__image",
+                "primary_image__image_renditions",
+            )
+            .order_by("-purchases")[:30],
+            timeout=cls._CACHING_TIME,
         )
 
-        random.shuffle(most_popular_products)
-
-        return most_popular_products[:8]
+        # Выборка без изменения закэшированного списка
+        return random.sample(most_popular_products, min(8, len(most_popular_products)))
 
     @classmethod
-    def limited_edition(cls) -> QuerySet:
+    def limited_edition(cls) -> List[Product]:
         """
         Метод возвращает товары, помеченные 'ограниченным тиражом'
 
-        @return: QuerySet с товарами
+        @return: список с товарами
         """
-        products = cache.get_or_set(
-            "limited_edition",
-            Product.objects.select_related("category")
-            .only("id", "name", "category__title", "price", "discount")
+        products = CachedQueryService.get_or_load(
+            key="limited_edition",
+            loader=lambda: Product.objects.select_related("category", "primary_image")
+            .only(
+                "id",
+                "name",
+                "category__title",
+                "price",
+                "discount",
+                "primary_image__title",
+                "primary_image__image",
+                "primary_image__image_renditions",
+            )
             .filter(limited_edition=True),
-            cls._CACHING_TIME,
+            timeout=cls._CACHING_TIME,
         )
 
         return products
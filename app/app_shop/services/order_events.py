@@ -0,0 +1,284 @@
+import asyncio
+import json
+import logging
+import time
+
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+from typing import Callable, Dict, Union
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, transaction
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+from redis import Redis, RedisError
+from redis.asyncio import Redis as AsyncRedis
+
+from app.app_shop.models.cart_and_orders import Order
+
+
+logger = logging.getLogger(__name__)
+
+
+def database_sync_to_async(func: Callable) -> Callable:
+    """
+    Функция возвращает асинхронную обертку над синхронной функцией, обращающейся к БД.
+    Вне цикла запроса Django (сигналы request_started / request_finished) соединения с БД не закрываются,
+    поэтому устаревшие и разорванные соединения закрываются до и после вызова (как в django-channels)
+
+    @param func: синхронная функция
+    @return: асинхронная функция
+    """
+
+    def call(*args, **kwargs):
+        close_old_connections()
+
+        try:
+            return func(*args, **kwargs)
+
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call)
+
+
+class OrderStatusChannel:
+    """
+    Канал уведомлений о смене статуса заказа: при каждой смене статуса (Order.change_status) сообщение
+    публикуется в канал Redis "order_status:<id заказа>", страница ожидания оплаты получает его через
+    Server-Sent Events (OrderEventsApplication) и переходит к заказу один раз - после итогового статуса.
+    """
+
+    # Итоговые статусы оплаты ("Не оплачен", "Оплачен", "Доставляется"), после которых поток событий закрывается
+    FINAL_STATUSES = (2, 4, 5)
+
+    _client = None
+
+    @classmethod
+    def client(cls) -> Redis:
+        """
+        Метод возвращает клиент Redis для публикации (один пул соединений на процесс)
+        """
+        if cls._client is None:
+            cls._client = Redis.from_url(settings.ORDER_EVENTS_REDIS_URL)
+
+        return cls._client
+
+    @classmethod
+    def channel(cls, order_id: int) -> str:
+        return f"order_status:{order_id}"
+
+    @classmethod
+    def publish(cls, order_id: int, status: int) -> None:
+        """
+        Метод для публикации нового статуса заказа после фиксации транзакции
+        (ошибка Redis не влияет на смену статуса - страница ожидания получит статус при переподключении)
+
+        @param order_id: id заказа
+        @param status: новый статус
+        @return: None
+        """
+
+        def send() -> None:
+            try:
+                cls.client().publish(
+                    cls.channel(order_id),
+                    json.dumps({"order_id": order_id, "status": status}),
+                )
+
+            except RedisError as exc:
+                logger.warning(f"Статус заказа №{order_id} не опубликован: {exc}")
+
+        transaction.on_commit(send)
+
+    @classmethod
+    def status(cls, order_id: int, user_id: Union[int, None]) -> Union[int, None]:
+        """
+        Метод возвращает текущий статус заказа пользователя
+
+        @param order_id: id заказа
+        @param user_id: id пользователя
+        @return: статус / None - заказ не найден или принадлежит другому пользователю
+        """
+        if user_id is None:
+            return None
+
+        return (
+            Order.objects.filter(id=order_id, user_id=user_id)
+            .values_list("status", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def event(cls, order_id: int, status: int) -> bytes:
+        """
+        Метод возвращает сообщение Server-Sent Events со статусом заказа
+        """
+        data = json.dumps(
+            {
+                "order_id": order_id,
+                "status": status,
+                "status_display": dict(Order.STATUS_CHOICES).get(status, ""),
+                "final": status in cls.FINAL_STATUSES,
+            },
+            ensure_ascii=False,
+        )
+
+        return f"event: status\ndata: {data}\n\n".encode()
+
+
+class OrderEventsApplication:
+    """
+    ASGI-приложение для потока событий о статусе заказа (Server-Sent Events, адрес "shop:order_events").
+    Запросы к потоку событий обрабатываются без Django-представления: соединение удерживается
+    до итогового статуса заказа (но не дольше settings.ORDER_EVENTS_TIMEOUT сек) и не занимает поток,
+    сообщения приходят из канала Redis (OrderStatusChannel). Остальные запросы передаются приложению Django.
+    При запуске через WSGI тот же адрес обслуживает OrderEventsView (текущий статус и повторное подключение).
+    """
+
+    _KEEPALIVE = (
+        15  # Интервал служебных сообщений, чтобы прокси не закрывал соединение (сек)
+    )
+
+    _client = None  # Цикл событий и клиент Redis
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope: Dict, receive, send) -> None:
+        if scope["type"] == "http":
+            try:
+                match = resolve(scope["path"])
+
+            except Resolver404:
+                match = None
+
+            if match is not None and match.view_name == "shop:order_events":
+                return await self.stream(
+                    scope, receive, send, order_id=match.kwargs["order_id"]
+                )
+
+        await self.application(scope, receive, send)
+
+    async def stream(self, scope: Dict, receive, send, order_id: int) -> None:
+        """
+        Метод для отправки событий о статусе заказа до итогового статуса или отключения клиента
+        """
+        user_id = await database_sync_to_async(self.user_id)(scope)
+        status = await database_sync_to_async(OrderStatusChannel.status)(
+            order_id, user_id
+        )
+
+        if status is None:
+            await send({"type": "http.response.start", "status": 404, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),  # Без буферизации ответа в nginx
+                ],
+            }
+        )
+
+        # Интервал повторного подключения браузера после закрытия потока
+        await self.send_event(send, b"retry: 2000\n\n")
+
+        pubsub = self.client().pubsub()
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+
+        try:
+            # Подписка до чтения статуса: смена статуса между чтением и подпиской не теряется
+            await pubsub.subscribe(OrderStatusChannel.channel(order_id))
+            subscribed = True
+
+        except RedisError as exc:
+            # Без подписки отправляется только текущий статус, браузер переподключится
+            logger.warning(f"Подписка на статус заказа №{order_id} не выполнена: {exc}")
+            subscribed = False
+
+        try:
+            status = await database_sync_to_async(OrderStatusChannel.status)(
+                order_id, user_id
+            )
+            await self.send_event(send, OrderStatusChannel.event(order_id, status))
+
+            deadline = time.monotonic() + settings.ORDER_EVENTS_TIMEOUT
+
+            while (
+                subscribed
+                and status not in OrderStatusChannel.FINAL_STATUSES
+                and not disconnect.done()
+                and time.monotonic() < deadline
+            ):
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=self._KEEPALIVE
+                )
+
+                if message is None:
+                    await self.send_event(send, b": keepalive\n\n")
+                    continue
+
+                status = json.loads(message["data"])["status"]
+                await self.send_event(send, OrderStatusChannel.event(order_id, status))
+
+        except RedisError as exc:
+            logger.warning(f"Поток событий заказа №{order_id} прерван: {exc}")
+
+        finally:
+            disconnected = disconnect.done()
+            disconnect.cancel()
+            # Соединение подписки возвращается в пул клиента
+            await pubsub.aclose()
+
+        if not disconnected:
+            await send({"type": "http.response.body", "body": b""})
+
+    @classmethod
+    def client(cls) -> AsyncRedis:
+        """
+        Метод возвращает асинхронный клиент Redis для подписок (один пул соединений на процесс).
+        Соединения привязаны к циклу событий, поэтому клиент создается заново только при смене цикла
+        (в ASGI-сервере цикл один на процесс)
+        """
+        loop = asyncio.get_running_loop()
+
+        if cls._client is None or cls._client[0] is not loop:
+            cls._client = (loop, AsyncRedis.from_url(settings.ORDER_EVENTS_REDIS_URL))
+
+        return cls._client[1]
+
+    @classmethod
+    async def send_event(cls, send, body: bytes) -> None:
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    @classmethod
+    async def wait_disconnect(cls, receive) -> None:
+        """
+        Метод завершается при отключении клиента
+        """
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @classmethod
+    def user_id(cls, scope: Dict) -> Union[int, None]:
+        """
+        Метод возвращает id авторизованного пользователя по cookie сессии запроса
+
+        @param scope: параметры ASGI-запроса
+        @return: id пользователя / None
+        """
+        headers = dict(scope.get("headers") or [])
+        cookies = SimpleCookie(headers.get(b"cookie", b"").decode("latin-1"))
+        session_key = cookies.get(settings.SESSION_COOKIE_NAME)
+        session = import_string(f"{settings.SESSION_ENGINE}.SessionStore")(
+            session_key.value if session_key else None
+        )
+
+        return get_user(SimpleNamespace(session=session)).id
@@ -1,12 +1,13 @@
 import logging
 
 from typing import List, Dict
-from django.core.cache import cache
 from django.db import transaction
 from django.http import HttpRequest
 
 from app.config.utils.configuration import get_config
+from app.app_shop.services.caching import CachedQueryService
 from app.app_shop.services.shop_cart.authenticated import ProductsCartUserService
+from app.app_shop.services.stock import StockReservationService
 from app.app_shop.models.cart_and_orders import PurchasedProduct, Cart, Order
 from app.app_shop.forms import MakingOrderForm
 
@@ -59,8 +60,15 @@ class RegistrationOrderService:
             status=1,  # Оформлен
         )
 
-        # Сохранение товаров заказа
-        products_cart = ProductsCartUserService.all(user=request.user)
+        # Сохранение товаров заказа (корзина из Redis предварительно записывается в БД)
+        ProductsCartUserService.flush(user=request.user)
+        products_cart = ProductsCartUserService.all(user=request.user, durable=True)
+
+        # Списание товаров со склада (при нехватке товара заказ не создается - OutOfStockError)
+        StockReservationService.reserve(
+            order=order,
+            items={record.product_id: record.count for record in products_cart},
+        )
         RegistrationOrderService.purchase_history(
             products_cart=products_cart, order=order
         )
@@ -68,12 +76,30 @@ class RegistrationOrderService:
         # Очистка корзины
         ProductsCartUserService.clear_cart(user=request.user)
 
-        # Стоимость оплаты = стоимость товаров + стоимость доставки
-        amount = order.order_cost + RegistrationOrderService.delivery_cost(order=order)
-        logger.debug(f"Стоимость заказа с учетом доставки: {amount} руб")
+        # Стоимость оплаты = стоимость товаров + стоимость доставки (сохраняется в заказе)
+        RegistrationOrderService.save_totals(
+            order=order,
+            items_total=sum(record.position_cost for record in products_cart),
+        )
+        logger.debug(f"Стоимость заказа с учетом доставки: {order.grand_total} руб")
 
         return order
 
+    @classmethod
+    def save_totals(cls, order: Order, items_total: int) -> None:
+        """
+        Метод для расчета и сохранения в заказе стоимости товаров, доставки и суммы к оплате
+
+        @param order: объект заказа
+        @param items_total: стоимость товаров заказа
+        @return: None
+        """
+        order.items_total = items_total
+        order.delivery_total = RegistrationOrderService.delivery_cost(order=order)
+        order.grand_total = order.items_total + order.delivery_total
+
+        order.save(update_fields=["items_total", "delivery_total", "grand_total"])
+
     @classmethod
     def purchase_history(cls, products_cart: List[Cart], order: Order) -> None:
         """
@@ -110,10 +136,11 @@ class RegistrationOrderService:
         logger.debug("Расчет стоимости доставки")
 
         config = get_config()
+        order_cost = order.order_cost
 
         # Обычная доставка
         if order.delivery == 1:
-            if order.order_cost > config.min_order_cost:
+            if order_cost > config.min_order_cost:
                 delivery_cost = 0
             else:
                 delivery_cost = config.shipping_cost
@@ -124,7 +151,7 @@ class RegistrationOrderService:
 
         # Экспресс доставка
         else:
-            if order.order_cost > config.min_order_cost:
+            if order_cost > config.min_order_cost:
                 delivery_cost = config.extra_shipping_cost
             else:
                 delivery_cost = config.shipping_cost + config.extra_shipping_cost
@@ -162,9 +189,11 @@ class RegistrationOrderService:
 
         config = get_config()
 
-        products = cache.get_or_set(
-            f"order_{order.id}",
-            PurchasedProduct.objects.select_related("product")
+        products = CachedQueryService.get_or_load(
+            key=f"order_{order.id}",
+            loader=lambda: PurchasedProduct.objects.select_related(
+                "product__primary_image"
+            )
             .only(
                 "id",
                 "count",
@@ -173,9 +202,12 @@ class RegistrationOrderService:
                 "product__name",
                 "product__price",
                 "product__definition",
+                "product__primary_image__title",
+                "product__primary_image__image",
+                "product__primary_image__image_renditions",
             )
             .filter(order=order),
-            60 * config.caching_time,
+            timeout=60 * config.caching_time,
         )
 
         context["products"] = products
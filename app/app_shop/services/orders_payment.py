@@ -2,12 +2,13 @@ import logging
 import random
 import time
 
-from typing import Tuple
+from typing import Mapping, Tuple, Union
 from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 
 from app.app_shop.models.cart_and_orders import Order, PaymentErrors
-from app.app_shop.tasks import payment
+from app.app_shop.services.payment_gateways import get_gateway
+from app.app_shop.tasks import confirm_payment, payment
 
 
 logger = logging.getLogger(__name__)
@@ -39,6 +40,38 @@ class PaymentService:
 
         return res
 
+    @classmethod
+    def webhook(cls, body: bytes, headers: Mapping[str, str]) -> Union[int, None]:
+        """
+        Метод для обработки уведомления платежного сервиса: проверка уведомления адаптером
+        и запуск задачи подтверждения оплаты заказа
+
+        @param body: тело запроса
+        @param headers: заголовки запроса
+        @return: id заказа / None, если заказ с платежом не найден
+        @raise WebhookError: некорректное уведомление
+        """
+        response = get_gateway().webhook(body=body, headers=headers)
+        logger.debug(
+            f"Уведомление о платеже {response.transaction_id}: {response.status}"
+        )
+
+        order_id = (
+            Order.objects.filter(payment_transaction=response.transaction_id, status=3)
+            .values_list("id", flat=True)
+            .first()
+        )
+
+        if order_id is None:
+            logger.warning(
+                f"Заказ с платежом {response.transaction_id} не ожидает оплаты"
+            )
+            return None
+
+        confirm_payment.delay(order_id=order_id)
+
+        return order_id
+
     @classmethod
     def check_order(cls, order_id: int) -> Tuple[Order, bool]:
         """
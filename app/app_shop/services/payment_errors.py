@@ -0,0 +1,104 @@
+import logging
+import random
+import threading
+import time
+
+from typing import NamedTuple, Tuple, Union
+from django.core.cache import cache
+
+from app.app_shop.models.cart_and_orders import PaymentErrors
+
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentErrorEntry(NamedTuple):
+    """
+    Сообщение об ошибке оплаты в памяти процесса
+    """
+
+    id: int
+    code: Union[str, None]
+    title: str
+
+
+class PaymentErrorCatalog:
+    """
+    Справочник сообщений об ошибках оплаты (PaymentErrors) в памяти процесса.
+    Записи загружаются из БД один раз на версию справочника (неизменяемый кортеж), версия хранится в кэше
+    и меняется при изменении сообщений, поэтому выбор сообщения при неуспешной оплате не обращается к БД
+    (в т.ч. при массовых отказах во время недоступности платежного сервиса).
+    Сообщение выбирается по коду ошибки платежного сервиса (поле code), сообщения без кода выбираются случайно.
+    """
+
+    _VERSION_KEY = "payment_errors_version"
+
+    _entries = None  # Записи текущего процесса: (версия, записи)
+    _lock = threading.Lock()
+
+    @classmethod
+    def pick(cls, code: Union[str, None] = None) -> Union[PaymentErrorEntry, None]:
+        """
+        Метод возвращает сообщение об ошибке для кода ошибки платежного сервиса
+
+        @param code: код ошибки / None
+        @return: сообщение с этим кодом, иначе случайное сообщение без кода (если их нет - любое) / None - справочник пуст
+        """
+        entries = cls.entries()
+
+        if code:
+            for entry in entries:
+                if entry.code == code:
+                    return entry
+
+        generic = [entry for entry in entries if not entry.code] or entries
+
+        return random.choice(generic) if generic else None
+
+    @classmethod
+    def entries(cls) -> Tuple[PaymentErrorEntry, ...]:
+        """
+        Метод возвращает записи справочника для текущей версии (из памяти процесса или из БД)
+        """
+        version = cls.version()
+
+        with cls._lock:
+            if cls._entries is not None and cls._entries[0] == version:
+                return cls._entries[1]
+
+            logger.debug("Загрузка справочника ошибок оплаты")
+
+            entries = tuple(
+                PaymentErrorEntry(*row)
+                for row in PaymentErrors.objects.order_by("id").values_list(
+                    "id", "code", "title"
+                )
+            )
+            cls._entries = (version, entries)
+
+            return entries
+
+    @classmethod
+    def version(cls) -> str:
+        """
+        Метод возвращает текущую версию справочника
+        """
+        version = cache.get(cls._VERSION_KEY)
+
+        if version is None:
+            version = cls.invalidate()
+
+        return version
+
+    @classmethod
+    def invalidate(cls) -> str:
+        """
+        Метод для смены версии справочника (процессы перечитают записи при следующем обращении)
+
+        @return: новая версия
+        """
+        version = str(time.time_ns())
+        cache.set(cls._VERSION_KEY, version, None)
+        logger.debug("Справочник ошибок оплаты сброшен")
+
+        return version
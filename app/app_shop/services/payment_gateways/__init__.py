@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from app.app_shop.services.payment_gateways.base import (
+    GatewayError,
+    GatewayResponse,
+    PaymentGateway,
+    WebhookError,
+)
+
+
+def get_gateway() -> PaymentGateway:
+    """
+    Функция возвращает адаптер платежного сервиса из settings.PAYMENT_GATEWAY
+
+    @return: объект адаптера
+    """
+    config = settings.PAYMENT_GATEWAY
+
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
@@ -0,0 +1,86 @@
+from abc import ABC, abstractmethod
+from typing import Mapping, NamedTuple, Union
+
+
+class GatewayError(Exception):
+    """
+    Платежный сервис недоступен или вернул некорректный ответ (операцию можно повторить)
+    """
+
+
+class WebhookError(Exception):
+    """
+    Некорректное уведомление платежного сервиса (неверная подпись или данные)
+    """
+
+
+class GatewayResponse(NamedTuple):
+    """
+    Ответ платежного сервиса
+    """
+
+    # "pending" - обрабатывается, "authorized" - средства заблокированы, "captured" - списаны, "declined" - отказ,
+    # "voided" - авторизация отменена (блокировка средств снята)
+    status: str
+    transaction_id: str
+    error: Union[str, None] = None  # Код ошибки при отказе
+
+
+class PaymentGateway(ABC):
+    """
+    Базовый класс адаптера платежного сервиса.
+    Оплата выполняется в два шага: authorize (блокировка средств, результат может быть получен позже -
+    статус "pending") и capture (списание заблокированных средств), void отменяет авторизацию без списания.
+    Результат авторизации запрашивается методом status или приходит уведомлением (webhook).
+    Адаптер задается в settings.PAYMENT_GATEWAY: {"BACKEND": путь к классу, "OPTIONS": параметры конструктора}.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    @abstractmethod
+    def authorize(
+        self, order_id: int, amount: int, card_number: int
+    ) -> GatewayResponse:
+        """
+        Метод для авторизации платежа
+
+        @param order_id: id заказа
+        @param amount: сумма к оплате (руб)
+        @param card_number: номер карты
+        @return: ответ платежного сервиса
+        @raise GatewayError: платежный сервис недоступен
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def capture(self, transaction_id: str) -> GatewayResponse:
+        """
+        Метод для списания авторизованного платежа
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def status(self, transaction_id: str) -> GatewayResponse:
+        """
+        Метод для получения текущего статуса платежа
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def void(self, transaction_id: str) -> GatewayResponse:
+        """
+        Метод для отмены авторизованного платежа (снятие блокировки средств без списания)
+        """
+        raise NotImplementedError
+
+    def webhook(self, body: bytes, headers: Mapping[str, str]) -> GatewayResponse:
+        """
+        Метод для проверки и разбора уведомления платежного сервиса
+
+        @param body: тело запроса
+        @param headers: заголовки запроса
+        @return: статус платежа из уведомления
+        @raise WebhookError: некорректное уведомление
+        """
+        raise WebhookError("Платежный сервис не отправляет уведомления")
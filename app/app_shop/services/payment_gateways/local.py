@@ -0,0 +1,45 @@
+from app.app_shop.services.payment_gateways.base import (
+    GatewayResponse,
+    PaymentGateway,
+)
+
+
+class ParityGateway(PaymentGateway):
+    """
+    Локальная имитация платежного сервиса без сетевых запросов: платеж одобряется для четного номера карты,
+    который не заканчивается на 0. Результат записывается в id платежа, поэтому адаптеру не нужно хранить состояние.
+    """
+
+    def authorize(
+        self, order_id: int, amount: int, card_number: int
+    ) -> GatewayResponse:
+        approved = card_number % 2 == 0 and card_number % 10 != 0
+
+        return GatewayResponse(
+            status="pending",
+            transaction_id=f"parity-{order_id}-{'ok' if approved else 'fail'}",
+        )
+
+    def capture(self, transaction_id: str) -> GatewayResponse:
+        response = self.status(transaction_id)
+
+        if response.status == "authorized":
+            return response._replace(status="captured")
+
+        return response
+
+    def void(self, transaction_id: str) -> GatewayResponse:
+        response = self.status(transaction_id)
+
+        if response.status == "authorized":
+            return response._replace(status="voided")
+
+        return response
+
+    def status(self, transaction_id: str) -> GatewayResponse:
+        if transaction_id.endswith("-ok"):
+            return GatewayResponse(status="authorized", transaction_id=transaction_id)
+
+        return GatewayResponse(
+            status="declined", transaction_id=transaction_id, error="card_declined"
+        )
@@ -0,0 +1,327 @@
+import hashlib
+import hmac
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Mapping, Tuple, Union
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from app.app_shop.services.payment_gateways.base import (
+    GatewayError,
+    GatewayResponse,
+    PaymentGateway,
+    WebhookError,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def sign(body: bytes, secret: str) -> str:
+    """
+    Функция возвращает подпись тела уведомления (HMAC-SHA256)
+    """
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class SimulatorGateway(PaymentGateway):
+    """
+    Адаптер HTTP-имитатора платежного сервиса (команда payment_simulator).
+    Параметры: url - адрес имитатора, secret - ключ подписи уведомлений, timeout - таймаут запроса (сек)
+    """
+
+    def __init__(self, url: str, secret: str = "", timeout: float = 5, **options):
+        super().__init__(url=url, secret=secret, timeout=timeout, **options)
+        self.url = url.rstrip("/")
+        self.secret = secret
+        self.timeout = timeout
+
+    def authorize(
+        self, order_id: int, amount: int, card_number: int
+    ) -> GatewayResponse:
+        return self.request(
+            "POST",
+            "/authorize",
+            {"order_id": order_id, "amount": amount, "card_number": card_number},
+        )
+
+    def capture(self, transaction_id: str) -> GatewayResponse:
+        return self.request("POST", f"/transactions/{transaction_id}/capture")
+
+    def void(self, transaction_id: str) -> GatewayResponse:
+        return self.request("POST", f"/transactions/{transaction_id}/void")
+
+    def status(self, transaction_id: str) -> GatewayResponse:
+        return self.request("GET", f"/transactions/{transaction_id}")
+
+    def webhook(self, body: bytes, headers: Mapping[str, str]) -> GatewayResponse:
+        signature = headers.get("X-Signature", "")
+
+        if not self.secret or not hmac.compare_digest(
+            signature, sign(body, self.secret)
+        ):
+            raise WebhookError("Неверная подпись уведомления")
+
+        try:
+            return self.parse(json.loads(body))
+
+        except (KeyError, TypeError, ValueError):
+            raise WebhookError("Некорректные данные уведомления")
+
+    def request(
+        self, method: str, path: str, payload: Union[Dict, None] = None
+    ) -> GatewayResponse:
+        """
+        Метод для выполнения запроса к имитатору
+
+        @param method: HTTP-метод
+        @param path: путь
+        @param payload: данные запроса (JSON)
+        @return: ответ платежного сервиса
+        @raise GatewayError: сетевая ошибка, ошибка сервиса или некорректный ответ
+        """
+        request = Request(
+            self.url + path,
+            data=json.dumps(payload).encode() if payload is not None else None,
+            headers={"Content-Type": "application/json"},
+            method=method,
+        )
+
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return self.parse(json.loads(response.read()))
+
+        except HTTPError as exc:
+            raise GatewayError(f"Платежный сервис вернул ошибку: {exc.code}")
+
+        except (URLError, OSError) as exc:
+            raise GatewayError(f"Платежный сервис недоступен: {exc}")
+
+        except (KeyError, TypeError, ValueError):
+            raise GatewayError("Некорректный ответ платежного сервиса")
+
+    @classmethod
+    def parse(cls, data: Dict) -> GatewayResponse:
+        return GatewayResponse(
+            status=data["status"], transaction_id=data["id"], error=data.get("error")
+        )
+
+
+class PaymentSimulator:
+    """
+    HTTP-имитатор платежного сервиса для нагрузочного тестирования (без обращения к реальному процессингу).
+    Задержка ответа - логнормальное распределение (медиана и разброс), часть запросов завершается ошибкой 503,
+    часть платежей отклоняется. Авторизация обрабатывается processing_time сек (статус "pending"),
+    после чего на webhook_url отправляется подписанное уведомление (если адрес задан).
+
+    Запросы:
+    POST /authorize - авторизация платежа ({"order_id", "amount", "card_number"});
+    GET /transactions/<id> - статус платежа;
+    POST /transactions/<id>/capture - списание авторизованного платежа;
+    POST /transactions/<id>/void - отмена авторизованного платежа.
+    """
+
+    _TRANSACTION_PATH = re.compile(r"^/transactions/([0-9a-f]+)(/capture|/void)?$")
+
+    def __init__(
+        self,
+        latency_median: float = 200,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0,
+        decline_rate: float = 0.1,
+        processing_time: float = 2,
+        webhook_url: str = "",
+        secret: str = "",
+    ):
+        """
+        @param latency_median: медиана задержки ответа (мс)
+        @param latency_sigma: разброс задержки (сигма логнормального распределения, 0 - постоянная задержка)
+        @param error_rate: доля запросов, завершающихся ошибкой 503
+        @param decline_rate: доля отклоненных платежей
+        @param processing_time: время обработки авторизации (сек)
+        @param webhook_url: адрес для уведомлений о результате авторизации
+        @param secret: ключ подписи уведомлений
+        """
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.decline_rate = decline_rate
+        self.processing_time = processing_time
+        self.webhook_url = webhook_url
+        self.secret = secret
+        self.transactions = {}
+        self.lock = threading.Lock()
+
+    def delay(self) -> None:
+        """
+        Метод имитирует задержку ответа платежного сервиса
+        """
+        if self.latency_median > 0:
+            time.sleep(
+                random.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+                / 1000
+            )
+
+    def handle(
+        self, method: str, path: str, payload: Dict
+    ) -> Tuple[int, Union[Dict, None]]:
+        """
+        Метод для обработки запроса к имитатору
+
+        @param method: HTTP-метод
+        @param path: путь
+        @param payload: данные запроса
+        @return: HTTP-статус ответа и данные ответа
+        """
+        self.delay()
+
+        if random.random() < self.error_rate:
+            return 503, {"error": "unavailable"}
+
+        if method == "POST" and path == "/authorize":
+            return 200, self.authorize(payload)
+
+        match = self._TRANSACTION_PATH.match(path)
+
+        if match is None:
+            return 404, {"error": "not_found"}
+
+        with self.lock:
+            transaction = self.transactions.get(match.group(1))
+
+        if transaction is None:
+            return 404, {"error": "not_found"}
+
+        if method == "POST" and match.group(2) == "/capture":
+            return 200, self.capture(transaction)
+
+        if method == "POST" and match.group(2) == "/void":
+            return 200, self.void(transaction)
+
+        if method == "GET" and not match.group(2):
+            return 200, self.state(transaction)
+
+        return 405, {"error": "method_not_allowed"}
+
+    def authorize(self, payload: Dict) -> Dict:
+        transaction = {
+            "id": uuid.uuid4().hex,
+            "order_id": payload.get("order_id"),
+            "amount": payload.get("amount"),
+            "ready_at": time.monotonic() + self.processing_time,
+            "approved": random.random() >= self.decline_rate,
+            "captured": False,
+            "voided": False,
+        }
+
+        with self.lock:
+            self.transactions[transaction["id"]] = transaction
+
+        if self.webhook_url:
+            timer = threading.Timer(
+                self.processing_time, self.notify, args=[transaction]
+            )
+            timer.daemon = True
+            timer.start()
+
+        return self.state(transaction)
+
+    def capture(self, transaction: Dict) -> Dict:
+        with self.lock:
+            if self.state(transaction)["status"] == "authorized":
+                transaction["captured"] = True
+
+        return self.state(transaction)
+
+    def void(self, transaction: Dict) -> Dict:
+        with self.lock:
+            if self.state(transaction)["status"] == "authorized":
+                transaction["voided"] = True
+
+        return self.state(transaction)
+
+    def state(self, transaction: Dict) -> Dict:
+        """
+        Метод возвращает текущий статус платежа
+        """
+        if time.monotonic() < transaction["ready_at"]:
+            status = "pending"
+
+        elif not transaction["approved"]:
+            return {"id": transaction["id"], "status": "declined", "error": "declined"}
+
+        elif transaction["voided"]:
+            status = "voided"
+
+        else:
+            status = "captured" if transaction["captured"] else "authorized"
+
+        return {"id": transaction["id"], "status": status}
+
+    def notify(self, transaction: Dict) -> None:
+        """
+        Метод для отправки подписанного уведомления о результате авторизации
+        """
+        body = json.dumps(self.state(transaction)).encode()
+        request = Request(
+            self.webhook_url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Signature": sign(body, self.secret),
+            },
+            method="POST",
+        )
+
+        try:
+            urlopen(request, timeout=10).close()
+
+        except (URLError, OSError) as exc:
+            logger.warning(
+                f"Уведомление о платеже {transaction['id']} не отправлено: {exc}"
+            )
+
+    def server(self, host: str, port: int) -> ThreadingHTTPServer:
+        """
+        Метод возвращает HTTP-сервер имитатора (каждый запрос обрабатывается в отдельном потоке)
+        """
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.respond(*simulator.handle("GET", self.path, {}))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+
+                except ValueError:
+                    return self.respond(400, {"error": "bad_request"})
+
+                self.respond(*simulator.handle("POST", self.path, payload))
+
+            def respond(self, status: int, data: Dict) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        httpd.daemon_threads = True
+
+        return httpd
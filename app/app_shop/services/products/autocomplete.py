@@ -0,0 +1,309 @@
+import hashlib
+import logging
+import threading
+import time
+
+from bisect import bisect_left
+from typing import Dict, List, Tuple, Union
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from kombu.exceptions import OperationalError
+
+from app.app_shop.models.products import CategoryProduct, Product
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProductAutocompleteService:
+    """
+    Сервис подсказок для поисковой строки (поиск по мере ввода).
+    Подсказки выбираются из отсортированной таблицы префиксов (начала всех слов названий товаров и категорий),
+    разбитой на части по первым символам ключа. Части хранятся в кэше, процесс загружает в память только
+    те части, по которым были запросы. Результаты для каждого префикса кэшируются.
+    При изменении товаров и категорий новая таблица строится фоновой задачей, до ее готовности
+    выводятся подсказки по предыдущей таблице. Запросы при вводе текста не обращаются к таблице товаров.
+    """
+
+    _VERSION_KEY = "autocomplete_version"  # Версия готовой таблицы префиксов
+    _PENDING_KEY = (
+        "autocomplete_pending"  # Признак изменения каталога после построения таблицы
+    )
+    _BUILD_KEY = "autocomplete_build"  # Блокировка постановки построения первой таблицы
+    _TIMEOUT = 24 * 60 * 60  # Время хранения таблицы и результатов в кэше (сек)
+    _REBUILD_DELAY = (
+        10  # Задержка перестроения (сек): изменения за это время - одно перестроение
+    )
+    _MIN_LENGTH = 2  # Минимальная длина префикса для поиска подсказок
+    _MAX_LENGTH = 50  # Префикс обрезается до этой длины
+    _SHARD_LENGTH = (
+        2  # Кол-во первых символов ключа, по которым таблица делится на части
+    )
+    _LIMIT = 10  # Максимальное кол-во подсказок
+
+    _shards = None  # Части таблицы префиксов текущего процесса: (версия, {часть: (ключи, записи)})
+    _lock = threading.Lock()
+
+    @classmethod
+    def suggest(cls, query: str, limit: int = _LIMIT) -> List[Dict]:
+        """
+        Метод возвращает подсказки для введенного текста: сначала категории, затем товары
+        в порядке убывания кол-ва покупок
+
+        @param query: введенный текст
+        @param limit: максимальное кол-во подсказок
+        @return: список словарей с типом, названием и URL подсказки
+        """
+        prefix = cls.normalize(query)[: cls._MAX_LENGTH]
+
+        if len(prefix) < cls._MIN_LENGTH:
+            return []
+
+        limit = max(1, min(limit, cls._LIMIT))
+        version = cls.version()
+
+        if version is None:
+            return []
+
+        key = "autocomplete_{}_{}_{}".format(
+            version, limit, hashlib.md5(prefix.encode()).hexdigest()
+        )
+
+        suggestions = cache.get(key)
+
+        if suggestions is None:
+            logger.debug(f"Подбор подсказок по префиксу: {prefix}")
+            suggestions = cls.lookup(prefix=prefix, limit=limit, version=version)
+
+            if suggestions is None:
+                return []
+
+            cache.set(key, suggestions, cls._TIMEOUT)
+
+        return suggestions
+
+    @classmethod
+    def lookup(cls, prefix: str, limit: int, version: str) -> Union[List[Dict], None]:
+        """
+        Метод для поиска подсказок по префиксу в части таблицы префиксов (бинарный поиск)
+
+        @param prefix: нормализованный префикс
+        @param limit: максимальное кол-во подсказок
+        @param version: версия таблицы
+        @return: список подсказок / None, если часть таблицы отсутствует в кэше
+        """
+        shard = cls.shard(version=version, name=prefix[: cls._SHARD_LENGTH])
+
+        if shard is None:
+            return None
+
+        keys, entries = shard
+
+        position = bisect_left(keys, prefix)
+        found = set()
+
+        while position < len(keys) and keys[position].startswith(prefix):
+            found.add(entries[position])
+            position += 1
+
+        # Сортировка: категории, затем товары по убыванию покупок, затем по названию
+        ranked = sorted(found, key=lambda entry: (-entry[0], -entry[1], entry[2]))
+
+        return [
+            {"type": kind, "title": title, "url": url}
+            for _, _, title, kind, url in ranked[:limit]
+        ]
+
+    @classmethod
+    def shard(
+        cls, version: str, name: str
+    ) -> Union[Tuple[List[str], List[tuple]], None]:
+        """
+        Метод возвращает часть таблицы префиксов (из памяти процесса или из кэша).
+        Если часть вытеснена из кэша - ставится задача перестроения таблицы.
+
+        @param version: версия таблицы
+        @param name: первые символы ключей части
+        @return: отсортированный список ключей и список записей с тем же порядком / None
+        """
+        with cls._lock:
+            if cls._shards is None or cls._shards[0] != version:
+                cls._shards = (version, {})
+
+            shards = cls._shards[1]
+
+            if name in shards:
+                return shards[name]
+
+        names = cache.get(f"autocomplete_shards_{version}")
+        shard = ([], [])
+
+        if names is not None and name in names:
+            shard = cache.get(cls.shard_key(version=version, name=name))
+
+        if names is None or shard is None:
+            logger.warning("Таблица префиксов подсказок отсутствует в кэше")
+
+            # Задача ставится один раз до перестроения, а не при каждом запросе
+            if cache.add(cls._PENDING_KEY, 1, None):
+                cls.invalidate()
+
+            return None
+
+        with cls._lock:
+            shards[name] = shard
+
+        return shard
+
+    @classmethod
+    def shard_key(cls, version: str, name: str) -> str:
+        return "autocomplete_shard_{}_{}".format(
+            version, hashlib.md5(name.encode()).hexdigest()
+        )
+
+    @classmethod
+    def rebuild(cls) -> str:
+        """
+        Метод для построения новой таблицы префиксов, записи ее частей в кэш и публикации новой версии
+        (до публикации запросы используют предыдущую таблицу)
+
+        @return: новая версия
+        """
+        version = str(time.time_ns())
+        shards = {}
+
+        for key, entry in zip(*cls.build()):
+            keys, entries = shards.setdefault(key[: cls._SHARD_LENGTH], ([], []))
+            keys.append(key)
+            entries.append(entry)
+
+        cache.set_many(
+            {
+                cls.shard_key(version=version, name=name): shard
+                for name, shard in shards.items()
+            },
+            cls._TIMEOUT,
+        )
+        cache.set(f"autocomplete_shards_{version}", set(shards), cls._TIMEOUT)
+        cache.set(cls._VERSION_KEY, version, None)
+        logger.info(f"Таблица префиксов подсказок обновлена: частей - {len(shards)}")
+
+        return version
+
+    @classmethod
+    def rebuild_pending(cls) -> bool:
+        """
+        Метод для перестроения таблицы, если каталог изменился после построения текущей таблицы
+        (из нескольких задач, поставленных за время задержки, таблицу строит только первая)
+
+        @return: True - таблица перестроена, иначе False
+        """
+        if not cache.delete(cls._PENDING_KEY):
+            return False
+
+        cls.rebuild()
+
+        return True
+
+    @classmethod
+    def build(cls) -> Tuple[List[str], List[tuple]]:
+        """
+        Метод для построения таблицы префиксов по активным товарам и категориям.
+        Ключ - текст названия, начиная с каждого слова (чтобы находить товар по любому слову),
+        запись - (признак категории, кол-во покупок, название, тип, URL).
+
+        @return: отсортированный список ключей и список записей с тем же порядком
+        """
+        logger.info("Построение таблицы префиксов для подсказок поиска")
+
+        rows = []
+
+        for slug, title in CategoryProduct.objects.filter(deleted=False).values_list(
+            "slug", "title"
+        ):
+            url = reverse(
+                "shop:products_list", kwargs={"group": "category", "name": slug}
+            )
+            rows.extend(cls.rows(title, (1, 0, title, "category", url)))
+
+        for product_id, name, purchases in (
+            Product.objects.filter(deleted=False)
+            .values_list("id", "name", "purchases")
+            .iterator(chunk_size=1000)
+        ):
+            url = reverse("shop:product_detail", kwargs={"pk": product_id})
+            rows.extend(cls.rows(name, (0, purchases, name, "product", url)))
+
+        rows.sort(key=lambda row: row[0])
+
+        return [key for key, _ in rows], [entry for _, entry in rows]
+
+    @classmethod
+    def rows(cls, title: str, entry: tuple) -> List[tuple]:
+        """
+        Метод возвращает строки таблицы префиксов для одного названия (по строке на каждое слово)
+
+        @param title: название
+        @param entry: запись подсказки
+        @return: список пар (ключ, запись)
+        """
+        words = cls.normalize(title).split()
+
+        return [
+            (" ".join(words[index:])[: cls._MAX_LENGTH], entry)
+            for index in range(len(words))
+        ]
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """
+        Метод приводит текст к нижнему регистру, заменяет "ё" на "е" и схлопывает пробелы
+        """
+        return " ".join((text or "").lower().replace("ё", "е").split())
+
+    @classmethod
+    def version(cls) -> Union[str, None]:
+        """
+        Метод возвращает версию готовой таблицы префиксов для ключей кэша подсказок.
+        Если таблица еще не построена (пустой кэш) - построение ставится в фоновую задачу (один процесс
+        не чаще раза в 5 мин), до ее выполнения подсказки не выводятся (None).
+        """
+        version = cache.get(cls._VERSION_KEY)
+
+        if version is None and cache.add(cls._BUILD_KEY, 1, 5 * 60):
+            cache.set(cls._PENDING_KEY, 1, None)
+            logger.info("Таблица подсказок поиска не построена, запуск построения")
+            cls.schedule(countdown=0)
+
+            # Задача могла выполниться в процессе (CELERY_TASK_ALWAYS_EAGER)
+            version = cache.get(cls._VERSION_KEY)
+
+        return version
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """
+        Метод для постановки задачи перестроения таблицы префиксов после фиксации транзакции
+        (до перестроения выводятся подсказки по текущей таблице)
+        """
+        cache.set(cls._PENDING_KEY, 1, None)
+        logger.debug("Поставлено перестроение таблицы подсказок поиска")
+
+        transaction.on_commit(lambda: cls.schedule(countdown=cls._REBUILD_DELAY))
+
+    @classmethod
+    def schedule(cls, countdown: int) -> None:
+        """
+        Метод для запуска задачи перестроения таблицы префиксов (ошибка брокера не прерывает запрос)
+
+        @param countdown: задержка запуска (сек)
+        """
+        # Импорт внутри метода, т.к. модуль задач сам импортирует сервисы товаров
+        from app.app_shop.tasks import rebuild_autocomplete_index
+
+        try:
+            rebuild_autocomplete_index.apply_async(countdown=countdown)
+
+        except OperationalError as exc:
+            logger.error(f"Задача перестроения подсказок не запущена: {exc}")
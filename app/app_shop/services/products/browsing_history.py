@@ -24,7 +24,7 @@ class ProductBrowsingHistoryService:
         """
         logger.debug("Вывод истории просмотров товаров")
         records = ProductBrowsingHistory.objects.select_related(
-            "product", "product__category"
+            "product", "product__category", "product__primary_image"
         ).filter(user=request.user)
 
         return records
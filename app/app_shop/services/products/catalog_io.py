@@ -0,0 +1,446 @@
+import csv
+import gzip
+import json
+import logging
+
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Union
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from pytils.translit import slugify
+
+from app.app_shop.models.products import CategoryProduct, Product, ProductTags
+from app.app_shop.services.products.autocomplete import ProductAutocompleteService
+from app.app_shop.services.products.products_list.facets import ProductFacetService
+from app.app_shop.services.products.search_index import ProductSearchIndex
+
+
+logger = logging.getLogger(__name__)
+
+
+# Поля товара в файле каталога (теги в CSV разделяются "|", характеристики - JSON-строка)
+FIELDS = (
+    "id",
+    "name",
+    "definition",
+    "category",
+    "tags",
+    "price",
+    "discount",
+    "count",
+    "characteristics",
+    "deleted",
+)
+
+
+def open_catalog_file(path: str, mode: str, encoding: str) -> IO:
+    """
+    Функция открывает файл каталога в текстовом режиме с перекодированием при чтении / записи
+    (файлы с расширением .gz сжимаются / распаковываются на лету)
+
+    @param path: путь к файлу
+    @param mode: "r" / "w"
+    @param encoding: кодировка файла
+    @return: файловый объект
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding=encoding, newline="")
+
+    return open(path, mode, encoding=encoding, newline="")
+
+
+class CatalogImportService:
+    """
+    Сервис для потоковой загрузки каталога товаров из файла JSON Lines (одна запись на строку) или CSV.
+    Файл читается построчно с перекодированием на лету, поэтому расход памяти не зависит от размера файла:
+    в памяти находятся только словари категорий и тегов (slug - id) и текущая пачка записей.
+    Товары с существующим id обновляются (bulk_update), остальные создаются (bulk_create) с id из файла,
+    поэтому повторная загрузка того же файла не создает дубликатов (записи без id создаются с новым id);
+    теги товаров пачки заменяются записями промежуточной таблицы (bulk_create).
+    Категории ищутся по slug, несуществующие теги создаются.
+    """
+
+    _UPDATE_FIELDS = (
+        "name",
+        "definition",
+        "category",
+        "price",
+        "discount",
+        "count",
+        "characteristics",
+        "deleted",
+        "limited_edition",
+    )
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        file_format: str = "jsonl",
+        encoding: str = "utf-8",
+        batch_size: int = 1000,
+        progress: Union[Callable[[Dict], None], None] = None,
+    ) -> Dict[str, int]:
+        """
+        Метод для загрузки каталога товаров из файла
+
+        @param path: путь к файлу (.gz - сжатый файл)
+        @param file_format: формат файла: "jsonl" / "csv"
+        @param encoding: кодировка файла (например, "windows-1251")
+        @param batch_size: кол-во записей, сохраняемых одной пачкой
+        @param progress: функция, вызываемая после каждой пачки со счетчиками
+        @return: счетчики: processed, created, updated, invalid
+        """
+        logger.info(f"Загрузка каталога товаров: {path}")
+
+        categories = dict(CategoryProduct.objects.values_list("slug", "id"))
+        tags = dict(ProductTags.objects.values_list("slug", "id"))
+        stats = dict.fromkeys(("processed", "created", "updated", "invalid"), 0)
+        changed_ids = []
+
+        with open_catalog_file(path, "r", encoding) as file:
+            batch = []
+
+            for record in cls.records(file=file, file_format=file_format):
+                batch.append(record)
+
+                if len(batch) >= batch_size:
+                    changed_ids += cls.save_batch(batch, categories, tags, stats)
+                    batch = []
+
+                    if progress:
+                        progress(stats)
+
+            if batch:
+                changed_ids += cls.save_batch(batch, categories, tags, stats)
+
+                if progress:
+                    progress(stats)
+
+        cls.finish(product_ids=changed_ids)
+        logger.info(f"Загрузка каталога завершена: {stats}")
+
+        return stats
+
+    @classmethod
+    def records(cls, file: IO, file_format: str) -> Iterator[Dict]:
+        """
+        Метод возвращает записи файла по одной (пустые строки пропускаются)
+        """
+        if file_format == "csv":
+            for number, row in enumerate(csv.DictReader(file), start=1):
+                row["tags"] = [tag for tag in (row.get("tags") or "").split("|") if tag]
+
+                try:
+                    row["characteristics"] = json.loads(
+                        row.get("characteristics") or "{}"
+                    )
+
+                except ValueError:
+                    logger.warning(
+                        f"Некорректные характеристики (JSON) в записи: {number}"
+                    )
+                    yield {}
+                    continue
+
+                yield row
+
+        elif file_format == "jsonl":
+            for number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+
+                try:
+                    yield json.loads(line)
+
+                except ValueError:
+                    logger.warning(f"Некорректная строка JSON: {number}")
+                    yield {}
+
+        else:
+            raise ValueError(f"Неизвестный формат файла: {file_format}")
+
+    @classmethod
+    def save_batch(
+        cls,
+        batch: List[Dict],
+        categories: Dict[str, int],
+        tags: Dict[str, int],
+        stats: Dict[str, int],
+    ) -> List[int]:
+        """
+        Метод для сохранения пачки записей: создание и обновление товаров, замена тегов
+
+        @param batch: список записей
+        @param categories: словарь: slug категории - id
+        @param tags: словарь: slug тега - id (дополняется созданными тегами)
+        @param stats: счетчики (изменяются)
+        @return: список id созданных и обновленных товаров
+        """
+        stats["processed"] += len(batch)
+        products, product_tags = [], []
+
+        for record in batch:
+            product = cls.build(record=record, categories=categories)
+
+            if product is None:
+                stats["invalid"] += 1
+                continue
+
+            products.append(product)
+            # Теги, из названия которых нельзя получить slug, пропускаются
+            product_tags.append(
+                [name for name in record.get("tags") or [] if cls.tag_slug(name)]
+            )
+
+        if not products:
+            return []
+
+        existing = set(
+            Product.objects.filter(
+                id__in=[product.id for product in products if product.id]
+            ).values_list("id", flat=True)
+        )
+
+        with transaction.atomic():
+            cls.create_tags(
+                names=[name for names in product_tags for name in names], tags=tags
+            )
+
+            to_create = [product for product in products if product.id not in existing]
+
+            # Сначала товары с id из файла, затем счетчик id сдвигается за них и создаются товары без id
+            with_id = [product for product in to_create if product.id is not None]
+            Product.objects.bulk_create(with_id)
+
+            if with_id:
+                cls.reset_sequence()
+
+            Product.objects.bulk_create(
+                [product for product in to_create if product.id is None]
+            )
+            Product.objects.bulk_update(
+                [product for product in products if product.id in existing],
+                fields=cls._UPDATE_FIELDS,
+            )
+
+            product_ids = [product.id for product in products]
+            through = Product.tags.through
+            through.objects.filter(product_id__in=product_ids).delete()
+            through.objects.bulk_create(
+                [
+                    through(product_id=product.id, producttags_id=tag_id)
+                    for product, names in zip(products, product_tags)
+                    for tag_id in {tags[cls.tag_slug(name)] for name in names}
+                ],
+                ignore_conflicts=True,
+            )
+
+        cache.delete_many([f"product_{product_id}" for product_id in existing])
+        stats["created"] += len(to_create)
+        stats["updated"] += len(products) - len(to_create)
+
+        return product_ids
+
+    @classmethod
+    def build(cls, record: Dict, categories: Dict[str, int]) -> Union[Product, None]:
+        """
+        Метод для создания объекта товара по записи файла (без сохранения) с проверкой значений
+
+        @param record: запись файла
+        @param categories: словарь: slug категории - id
+        @return: объект товара / None, если запись некорректна
+        """
+        try:
+            category_id = categories[record["category"]]
+            product = Product(
+                id=int(record["id"]) if record.get("id") else None,
+                name=str(record["name"]).strip()[:250],
+                definition=str(record.get("definition") or "")[:1000],
+                category_id=category_id,
+                price=float(record["price"]),
+                discount=int(record.get("discount") or 0),
+                count=int(record.get("count") or 0),
+                characteristics=record.get("characteristics") or {},
+                deleted=str(record.get("deleted", False)).lower() in ("true", "1"),
+            )
+
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning(f"Некорректная запись товара ({exc!r}): {record}")
+            return None
+
+        if not product.name or product.price < 0 or not 0 <= product.discount <= 90:
+            logger.warning(f"Некорректные значения товара: {record}")
+            return None
+
+        if product.count < 0:
+            logger.warning(f"Некорректное кол-во товара: {record}")
+            return None
+
+        product.update_limited_edition()
+
+        return product
+
+    @classmethod
+    def reset_sequence(cls) -> None:
+        """
+        Метод сдвигает счетчик id товаров за максимальный id после вставки товаров с явными id
+        (PostgreSQL; для SQLite запросы не нужны)
+        """
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Product]):
+                cursor.execute(sql)
+
+    @classmethod
+    def create_tags(cls, names: Iterable[str], tags: Dict[str, int]) -> None:
+        """
+        Метод для создания тегов, которых нет в БД (словарь тегов дополняется созданными тегами)
+        """
+        new_tags = {}
+
+        for name in names:
+            slug = cls.tag_slug(name)
+
+            if slug not in tags and slug not in new_tags:
+                new_tags[slug] = ProductTags(name=name, slug=slug)
+
+        if not new_tags:
+            return
+
+        ProductTags.objects.bulk_create(new_tags.values())
+        tags.update(
+            ProductTags.objects.filter(slug__in=new_tags).values_list("slug", "id")
+        )
+        logger.info(f"Созданы теги: {len(new_tags)}")
+
+    @classmethod
+    def tag_slug(cls, name) -> str:
+        return slugify(str(name))
+
+    @classmethod
+    def finish(cls, product_ids: List[int]) -> None:
+        """
+        Метод для обновления поисковых данных после загрузки (bulk-операции не вызывают save())
+        """
+        if not product_ids:
+            return
+
+        for start in range(0, len(product_ids), 1000):
+            Product.update_search_vector(product_ids[start : start + 1000])
+
+        if ProductSearchIndex.exists():
+            ProductSearchIndex.build()
+
+        ProductAutocompleteService.invalidate()
+        ProductFacetService.invalidate()
+
+
+class CatalogExportService:
+    """
+    Сервис для потоковой выгрузки каталога товаров в файл JSON Lines или CSV
+    (товары читаются из БД частями, теги - одним запросом на часть)
+    """
+
+    # Поля товара в порядке выборки из БД (теги добавляются отдельно)
+    _COLUMNS = [field for field in FIELDS if field != "tags"]
+
+    @classmethod
+    def dump(
+        cls,
+        path: str,
+        file_format: str = "jsonl",
+        encoding: str = "utf-8",
+        batch_size: int = 1000,
+        progress: Union[Callable[[int], None], None] = None,
+    ) -> int:
+        """
+        Метод для выгрузки каталога товаров в файл
+
+        @param path: путь к файлу (.gz - сжатый файл)
+        @param file_format: формат файла: "jsonl" / "csv"
+        @param encoding: кодировка файла
+        @param batch_size: кол-во товаров, читаемых из БД одним запросом
+        @param progress: функция, вызываемая после каждой части с кол-вом выгруженных товаров
+        @return: кол-во выгруженных товаров
+        """
+        if file_format not in ("jsonl", "csv"):
+            raise ValueError(f"Неизвестный формат файла: {file_format}")
+
+        logger.info(f"Выгрузка каталога товаров: {path}")
+        total = 0
+
+        with open_catalog_file(path, "w", encoding) as file:
+            writer = None
+
+            if file_format == "csv":
+                writer = csv.DictWriter(file, fieldnames=FIELDS)
+                writer.writeheader()
+
+            for records in cls.batches(batch_size=batch_size):
+                for record in records:
+                    if writer:
+                        writer.writerow(
+                            record
+                            | {
+                                "tags": "|".join(record["tags"]),
+                                "characteristics": json.dumps(
+                                    record["characteristics"], ensure_ascii=False
+                                ),
+                            }
+                        )
+                    else:
+                        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+                total += len(records)
+
+                if progress:
+                    progress(total)
+
+        logger.info(f"Выгрузка каталога завершена: товаров - {total}")
+
+        return total
+
+    @classmethod
+    def batches(cls, batch_size: int) -> Iterator[List[Dict]]:
+        """
+        Метод возвращает записи товаров частями (выборка по ключу id без OFFSET)
+        """
+        last_id = 0
+
+        while True:
+            products = list(
+                Product.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list(
+                    "id",
+                    "name",
+                    "definition",
+                    "category__slug",
+                    "price",
+                    "discount",
+                    "count",
+                    "characteristics",
+                    "deleted",
+                )[:batch_size]
+            )
+
+            if not products:
+                return
+
+            tags = {}
+
+            for product_id, slug in Product.tags.through.objects.filter(
+                product_id__in=[product[0] for product in products]
+            ).values_list("product_id", "producttags__slug"):
+                tags.setdefault(product_id, []).append(slug)
+
+            records = []
+
+            for product in products:
+                record = dict(zip(cls._COLUMNS, product))
+                record["tags"] = sorted(tags.get(record["id"], []))
+                records.append(record)
+
+            yield records
+
+            last_id = products[-1][0]
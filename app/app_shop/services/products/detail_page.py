@@ -4,7 +4,6 @@ from typing import List, Dict
 from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import QuerySet
 from django.http import HttpRequest
 
 # from config.admin import config
@@ -12,6 +11,7 @@ from app.config.utils.configuration import get_config
 from app.app_user.models import Buyer, Profile
 from app.app_shop.models.products import Product, ProductReviews
 from app.app_shop.forms import CommentProductForm
+from app.app_shop.services.caching import CachedQueryService, CommentRow
 
 
 logger = logging.getLogger(__name__)
@@ -23,7 +23,9 @@ class ProductCommentsService:
     """
 
     @classmethod
-    def all_comments(cls, product: Product = None, product_id: int = None) -> QuerySet:
+    def all_comments(
+        cls, product: Product = None, product_id: int = None
+    ) -> List[CommentRow]:
         """
         Метод для вывода всех (активных) комментариев к товару
 
@@ -34,31 +36,22 @@ class ProductCommentsService:
         logger.debug("Вывод комментариев к товару")
 
         config = get_config()
-
-        if product_id:
-            comments = cache.get_or_set(
-                f"comments_product_{product_id}",
-                ProductReviews.objects.select_related(
-                    "buyer__profile", "buyer__profile__user"
-                )
-                .only(
-                    "created_at",
-                    "review",
-                    "buyer__profile__full_name",
-                    "buyer__profile__avatar",
-                    "buyer__profile__user__id",
-                )
-                .filter(product__id=product_id, deleted=False),
-                60 * config.caching_time,
-            )
-        else:
-            comments = cache.get_or_set(
-                f"comments_product_{product.id}",
-                ProductReviews.objects.select_related("buyer").filter(
-                    product=product, deleted=False
-                ),
-                60 * config.caching_time,
+        product_id = product_id or product.id
+
+        comments = CachedQueryService.get_or_load(
+            key=f"comments_product_{product_id}",
+            loader=lambda: ProductReviews.objects.select_related("buyer__profile")
+            .only(
+                "created_at",
+                "review",
+                "buyer__profile__full_name",
+                "buyer__profile__avatar",
+                "buyer__profile__avatar_renditions",
             )
+            .filter(product__id=product_id, deleted=False),
+            timeout=60 * config.caching_time,
+            row=CommentRow,
+        )
 
         logger.debug(f"Кол-во комментариев: {len(comments)}")
 
@@ -133,8 +126,8 @@ class ProductCommentsService:
         for comment in comments:
             comments_obj.append(
                 {
-                    "avatar": comment.buyer.profile.avatar.url,
-                    "name": comment.buyer.profile.full_name,
+                    "avatar": comment.avatar_url,
+                    "name": comment.full_name,
                     "created_at": comment.created_at,
                     "review": comment.review,
                 }
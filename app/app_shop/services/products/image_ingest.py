@@ -0,0 +1,297 @@
+import hashlib
+import logging
+import os
+import posixpath
+import tarfile
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterator, List, Tuple, Union
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+from pytils.translit import slugify
+
+from app.app_shop.models.products import Product, ProductImages
+from app.app_shop.services.renditions import ImageRenditionService
+from app.app_shop.utils.models.saving_files import PRODUCTS_PATH
+
+
+logger = logging.getLogger(__name__)
+
+
+# Поддерживаемые форматы изображений: формат Pillow - расширение файла
+FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+ORIENTATION_TAG = 0x0112  # Тег EXIF с ориентацией снимка
+
+
+def prepare_image(data: bytes, max_size: int) -> Tuple:
+    """
+    Функция для проверки и уменьшения изображения (выполняется в отдельном процессе)
+
+    @param data: содержимое файла
+    @param max_size: максимальный размер большей стороны изображения (px)
+    @return: (хэш исходного файла, содержимое для сохранения, расширение, None) /
+        (None, None, None, сообщение об ошибке)
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.verify()
+
+        image = Image.open(BytesIO(data))
+
+        if image.format not in FORMATS:
+            return None, None, None, f"неподдерживаемый формат {image.format}"
+
+        image_format = image.format
+        digest = hashlib.sha256(data).hexdigest()
+        rotated = image.getexif().get(ORIENTATION_TAG, 1) != 1
+
+        # Файл сохраняется без изменений, если его не нужно поворачивать и уменьшать
+        if not rotated and max(image.size) <= max_size:
+            return digest, data, FORMATS[image_format], None
+
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        if image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, quality=90, optimize=True)
+
+        return digest, buffer.getvalue(), FORMATS[image_format], None
+
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+        return None, None, None, str(exc) or type(exc).__name__
+
+
+class ProductImageIngestService:
+    """
+    Сервис для массовой загрузки изображений товаров из папки или архива (zip, tar).
+    Товар определяется по первой папке в пути файла ("15/front.jpg", "smartfon-apple/front.jpg")
+    или по началу имени файла до "_" ("15_front.jpg"): id товара или название товара латиницей (slug).
+    Изображения проверяются и уменьшаются в пуле процессов; одинаковые файлы (по хэшу содержимого)
+    сохраняются один раз в общей папке и используются всеми товарами, записи создаются пачками (bulk_create).
+    Общий файл и его копии удаляются вместе с последней записью, которая его использует (ProductImages.release_files).
+    """
+
+    _SHARED_PATH = posixpath.join(PRODUCTS_PATH.replace(os.sep, "/"), "shared")
+
+    @classmethod
+    def ingest(
+        cls,
+        path: str,
+        workers: Union[int, None] = None,
+        max_size: int = 2000,
+        batch_size: int = 500,
+        dry_run: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Метод для загрузки изображений товаров
+
+        @param path: путь к папке или архиву с изображениями
+        @param workers: кол-во процессов для обработки изображений (None - по кол-ву ядер)
+        @param max_size: максимальный размер большей стороны изображения (px)
+        @param batch_size: кол-во файлов, обрабатываемых и сохраняемых одной пачкой
+        @param dry_run: только проверка файлов, без сохранения
+        @return: счетчики: created, duplicates (файл уже был у товара), stored (новые файлы),
+            unmatched (товар не найден), invalid (некорректные изображения)
+        """
+        logger.info(f"Загрузка изображений товаров: {path}")
+
+        products = cls.products()
+        stats = dict.fromkeys(
+            ("created", "duplicates", "stored", "unmatched", "invalid"), 0
+        )
+        # Хэш файла - имя в хранилище (одинаковые файлы сохраняются один раз)
+        stored = {}
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for batch in cls.batches(path=path, batch_size=batch_size):
+                files = []
+
+                for name, data in batch:
+                    product_id = products.get(cls.product_key(name))
+
+                    if product_id is None:
+                        logger.warning(f"Товар для изображения не найден: {name}")
+                        stats["unmatched"] += 1
+                    else:
+                        files.append((name, product_id, data))
+
+                results = executor.map(
+                    prepare_image,
+                    [data for _, _, data in files],
+                    [max_size] * len(files),
+                )
+                rows = []
+
+                for (name, product_id, _), result in zip(files, results):
+                    digest, content, extension, error = result
+
+                    if error:
+                        logger.warning(f"Некорректное изображение {name}: {error}")
+                        stats["invalid"] += 1
+                        continue
+
+                    if not dry_run and digest not in stored:
+                        stored[digest], is_new = cls.store(digest, content, extension)
+                        stats["stored"] += is_new
+
+                    rows.append((name, product_id, stored.get(digest, digest)))
+
+                if dry_run:
+                    stats["created"] += len(rows)
+                    continue
+
+                created = cls.save_batch(rows)
+                stats["created"] += created
+                stats["duplicates"] += len(rows) - created
+
+        logger.info(f"Загрузка изображений завершена: {stats}")
+
+        return stats
+
+    @classmethod
+    def products(cls) -> Dict[str, int]:
+        """
+        Метод возвращает словарь для поиска товара: id и название латиницей - id товара
+        """
+        products = {}
+
+        for product_id, name in Product.objects.values_list("id", "name").iterator(
+            chunk_size=2000
+        ):
+            products[str(product_id)] = product_id
+            products.setdefault(slugify(name), product_id)
+
+        return products
+
+    @classmethod
+    def product_key(cls, name: str) -> str:
+        """
+        Метод возвращает ключ товара по пути файла (первая папка или начало имени файла до "_")
+        """
+        parts = name.split("/")
+
+        if len(parts) > 1:
+            return parts[0]
+
+        return posixpath.splitext(parts[0])[0].split("_", 1)[0]
+
+    @classmethod
+    def batches(cls, path: str, batch_size: int) -> Iterator[List[Tuple[str, bytes]]]:
+        """
+        Метод возвращает файлы из папки или архива пачками (в памяти находится только текущая пачка)
+        """
+        batch = []
+
+        for name, data in cls.files(path):
+            batch.append((name, data))
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    @classmethod
+    def files(cls, path: str) -> Iterator[Tuple[str, bytes]]:
+        """
+        Метод возвращает файлы из папки или архива: путь относительно корня (через "/") и содержимое
+        """
+        if os.path.isdir(path):
+            for root, dirs, filenames in os.walk(path):
+                dirs.sort()
+
+                for filename in sorted(filenames):
+                    full_path = os.path.join(root, filename)
+                    name = os.path.relpath(full_path, path).replace(os.sep, "/")
+
+                    if not cls.skipped(name):
+                        with open(full_path, "rb") as file:
+                            yield name, file.read()
+
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.infolist():
+                    if not member.is_dir() and not cls.skipped(member.filename):
+                        yield member.filename, archive.read(member)
+
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path, "r:*") as archive:
+                for member in archive:
+                    if member.isfile() and not cls.skipped(member.name):
+                        yield member.name, archive.extractfile(member).read()
+
+        else:
+            raise ValueError(f"Путь не является папкой или архивом: {path}")
+
+    @classmethod
+    def skipped(cls, name: str) -> bool:
+        """
+        Метод проверяет, нужно ли пропустить служебный файл (скрытые файлы, __MACOSX)
+        """
+        return any(part.startswith((".", "__MACOSX")) for part in name.split("/"))
+
+    @classmethod
+    def store(cls, digest: str, content: bytes, extension: str) -> Tuple[str, bool]:
+        """
+        Метод для сохранения файла в общей папке под именем по хэшу содержимого
+
+        @return: имя файла в хранилище, True - файл сохранен впервые
+        """
+        name = posixpath.join(cls._SHARED_PATH, digest[:2], f"{digest}.{extension}")
+
+        if default_storage.exists(name):
+            return name, False
+
+        return default_storage.save(name, ContentFile(content)), True
+
+    @classmethod
+    def save_batch(cls, rows: List[Tuple[str, int, str]]) -> int:
+        """
+        Метод для создания записей изображений одним запросом (без повторов для товара)
+
+        @param rows: список (исходный путь файла, id товара, имя файла в хранилище)
+        @return: кол-во созданных записей
+        """
+        if not rows:
+            return 0
+
+        product_ids = {product_id for _, product_id, _ in rows}
+        existing = set(
+            ProductImages.objects.filter(
+                product_id__in=product_ids,
+                image__in={image for _, _, image in rows},
+            ).values_list("product_id", "image")
+        )
+        images = []
+
+        for name, product_id, image in rows:
+            if (product_id, image) in existing:
+                continue
+
+            existing.add((product_id, image))
+            title = posixpath.splitext(posixpath.basename(name))[0]
+            images.append(
+                ProductImages(title=title[:250], image=image, product_id=product_id)
+            )
+
+        with transaction.atomic():
+            images = ProductImages.objects.bulk_create(images)
+
+            # bulk_create не вызывает save(): обновляем основные изображения и ставим задачи на копии
+            Product.update_primary_images(product_ids)
+
+            for image in images:
+                ImageRenditionService.schedule(image)
+
+        cache.delete_many([f"product_{product_id}" for product_id in product_ids])
+
+        return len(images)
@@ -0,0 +1,53 @@
+import logging
+
+from typing import Iterable
+
+from app.app_shop.models.products import Product, ProductImages
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProductImageService:
+    """
+    Сервис для вывода основных изображений в карточках товаров.
+    Изображения для всех товаров страницы загружаются одним запросом, а не запросом на каждую карточку.
+    """
+
+    @classmethod
+    def attach(cls, products: Iterable) -> list:
+        """
+        Метод загружает основные изображения товаров, для которых они еще не загружены
+        (например, выборка без select_related("primary_image") или список из кэша),
+        и сохраняет их в product.primary_image
+
+        @param products: список товаров / записей со ссылкой на товар (поле product)
+        @return: список переданных записей
+        """
+        records = list(products)
+        field = Product._meta.get_field("primary_image")
+        missing = {}
+
+        for record in records:
+            product = getattr(record, "product", record)
+
+            if product is not None and not field.is_cached(product):
+                missing.setdefault(product.id, []).append(product)
+
+        if not missing:
+            return records
+
+        logger.debug(f"Загрузка изображений для товаров: {len(missing)}")
+
+        images = {
+            image.product_id: image
+            for image in ProductImages.objects.filter(
+                id__in=Product.objects.filter(id__in=missing).values("primary_image")
+            )
+        }
+
+        for product_id, products_list in missing.items():
+            for product in products_list:
+                product.primary_image = images.get(product_id)
+
+        return records
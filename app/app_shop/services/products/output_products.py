@@ -67,14 +67,10 @@ class ProductsListService:
         sub_categories = category.get_descendants(
             include_self=True
         )  # Дочерние категории
-        products = (
-            Product.objects.select_related("category")
-            .prefetch_related("images")
-            .filter(category__in=sub_categories, deleted=False)
+        products = Product.objects.select_related("category", "primary_image").filter(
+            category__in=sub_categories, deleted=False
         )
 
-        logger.debug(f"Найдено товаров: {products.count()}")
-
         return products
 
     @classmethod
@@ -87,9 +83,7 @@ class ProductsListService:
         """
         logger.debug(f"Возврат товаров по тегу: {tag_name}")
 
-        products = Product.objects.prefetch_related("tags", "images").filter(
+        products = Product.objects.select_related("category", "primary_image").filter(
             tags__slug=tag_name, deleted=False
         )
-        logger.debug(f"Найдено товаров: {products.count()}")
-
         return products
@@ -0,0 +1,113 @@
+import logging
+import time
+
+from typing import Dict, List, Union
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet
+
+from app.config.utils.configuration import get_config
+from app.app_shop.services.products.products_list.pagination import (
+    KeysetPaginationService,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProductFacetService:
+    """
+    Сервис для подсчета фасетов каталога (кол-во товаров в наличии и с бесплатной доставкой),
+    которые выводятся в блоке фильтров, для текущей выборки товаров одним агрегирующим запросом.
+    Фасеты кэшируются по набору параметров фильтрации, поэтому следующие страницы выборки не повторяют агрегацию.
+    Ключ кэша содержит версию, которая меняется при изменении товаров, тегов и остатков (invalidate).
+    """
+
+    _VERSION_KEY = "catalog_facets_version"
+
+    @classmethod
+    def output(
+        cls, products: Union[QuerySet, List], filters: Union[Dict, None] = None
+    ) -> Dict:
+        """
+        Метод возвращает фасеты для переданной выборки товаров
+
+        @param products: QuerySet с отфильтрованными товарами (до сортировки и пагинации)
+        @param filters: параметры фильтрации выборки (ключ кэша) / None - без кэширования
+        @return: словарь с фасетами
+        """
+        if not isinstance(products, QuerySet):
+            logger.warning("Выборка товаров пуста, фасеты не считаются")
+            return cls.empty()
+
+        if filters is None:
+            return cls.calculate(products=products)
+
+        config = get_config()
+        key = KeysetPaginationService.filters_key(filters)
+
+        return cache.get_or_set(
+            f"catalog_facets_{cls.version()}_{key}",
+            lambda: cls.calculate(products=products),
+            60 * config.caching_time,
+        )
+
+    @classmethod
+    def calculate(cls, products: QuerySet) -> Dict:
+        """
+        Метод для подсчета фасетов выборки товаров одним агрегирующим запросом
+
+        @param products: QuerySet с товарами
+        @return: словарь с общим кол-вом товаров, кол-вом в наличии и с бесплатной доставкой
+        """
+        logger.debug("Подсчет фасетов каталога")
+        config = get_config()
+
+        # Сбрасываем сортировку и подгрузку связанных записей - для агрегации они не нужны
+        products = products.order_by().select_related(None).prefetch_related(None)
+
+        facets = products.aggregate(
+            total=Count("id", distinct=True),
+            in_stock=Count("id", filter=Q(count__gt=0), distinct=True),
+            free_shipping=Count(
+                "id", filter=Q(price__gt=config.min_order_cost), distinct=True
+            ),
+        )
+
+        logger.debug(f"Фасеты: {facets}")
+
+        return facets
+
+    @classmethod
+    def version(cls) -> str:
+        """
+        Метод возвращает текущую версию фасетов
+        """
+        version = cache.get(cls._VERSION_KEY)
+
+        if version is None:
+            version = str(time.time_ns())
+            cache.set(cls._VERSION_KEY, version, None)
+
+        return version
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """
+        Метод для смены версии фасетов после фиксации транзакции (фасеты пересчитываются при следующем запросе)
+        """
+
+        def reset() -> None:
+            cache.set(cls._VERSION_KEY, str(time.time_ns()), None)
+            logger.debug("Кэш фасетов каталога сброшен")
+
+        transaction.on_commit(reset)
+
+    @classmethod
+    def empty(cls) -> Dict:
+        """
+        Метод возвращает пустые фасеты (для пустой выборки)
+
+        @return: словарь с фасетами
+        """
+        return {"total": 0, "in_stock": 0, "free_shipping": 0}
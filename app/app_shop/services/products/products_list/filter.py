@@ -1,7 +1,7 @@
 import logging
 
-from typing import Dict
-from django.db.models import QuerySet
+from typing import Dict, Union
+from django.db.models import Q, QuerySet
 
 # from config.admin import config
 from app.config.utils.configuration import get_config
@@ -11,7 +11,9 @@ logger = logging.getLogger(__name__)
 
 class ProductFilterService:
     """
-    Сервис по выводу отфильтрованных товаров
+    Сервис по выводу отфильтрованных товаров.
+    Все параметры фильтрации собираются в одно условие (Q-объект) и применяются к QuerySet одним вызовом filter(),
+    без промежуточных запросов к БД.
     """
 
     @classmethod
@@ -25,107 +27,125 @@ class ProductFilterService:
         """
 
         if filters:
-            min_price = filters.get("min_price", False)
-            max_price = filters.get("max_price", False)
-            title = filters.get("title", False)
-            in_stock = filters.get("in_stock", False)
-            free_shipping = filters.get("free_shipping", False)
+            conditions = cls.conditions(filters=filters)
 
-            if not min_price is False and min_price != "":
-                products = cls.by_min_price(products=products, min_price=min_price)
+            if conditions:
+                products = products.filter(conditions)
+        else:
+            logger.warning("Параметры фильтрации не заданы")
 
-            if not max_price is False and max_price != "":
-                products = cls.by_max_price(products=products, max_price=max_price)
+        return products
 
-            if not title is False and title != "":
-                products = cls.by_title(products=products, title=title)
+    @classmethod
+    def conditions(cls, filters: Dict) -> Q:
+        """
+        Метод собирает все переданные параметры фильтрации в одно условие
 
-            if not in_stock is False:
-                products = cls.by_in_stock(products=products)
+        @param filters: словарь с параметрами фильтрации
+        @return: Q-объект с условиями фильтрации (пустой, если фильтры не заданы)
+        """
+        min_price = cls.clean_price(filters.get("min_price", False))
+        max_price = cls.clean_price(filters.get("max_price", False))
+        title = filters.get("title", False)
+        in_stock = filters.get("in_stock", False)
+        free_shipping = filters.get("free_shipping", False)
 
-            if not free_shipping is False:
-                products = cls.by_free_shipping(products=products)
-        else:
-            logger.warning("Параметры фильтрации не заданы")
+        conditions = Q()
 
-        return products
+        if min_price is not False:
+            conditions &= cls.by_min_price(min_price=min_price)
+
+        if max_price is not False:
+            conditions &= cls.by_max_price(max_price=max_price)
+
+        if not title is False and title != "":
+            conditions &= cls.by_title(title=title)
+
+        if not in_stock is False:
+            conditions &= cls.by_in_stock()
+
+        if not free_shipping is False:
+            conditions &= cls.by_free_shipping()
+
+        logger.debug(f"Условия фильтрации: {conditions}")
+
+        return conditions
 
     @classmethod
-    def by_min_price(cls, products: QuerySet, min_price: str) -> QuerySet:
+    def clean_price(cls, price: Union[str, bool]) -> Union[float, bool]:
         """
-        Метод для фильтрации товаров по минимальной цене
+        Метод для проверки и преобразования переданного значения цены в число
+
+        @param price: значение цены из URL
+        @return: число / False, если значение не задано или не является числом
+        """
+        if price is False or price == "":
+            return False
+
+        try:
+            return float(str(price).replace(",", ".").replace(" ", ""))
+
+        except ValueError:
+            logger.warning(f"Некорректное значение цены: {price}")
+            return False
+
+    @classmethod
+    def by_min_price(cls, min_price: float) -> Q:
+        """
+        Метод возвращает условие для фильтрации товаров по минимальной цене
 
-        @param products: QuerySet с товарами для фильтрации
         @param min_price: минимальное значение цены
-        @return: QuerySet с отфильтрованными товарами
+        @return: Q-объект с условием
         """
         logger.debug(f"Фильтрация по минимальной цене: {min_price}")
 
-        filtered_products = products.filter(price__gte=min_price)
-        logger.debug(f"Найдено товаров: {len(filtered_products)}")
-
-        return filtered_products
+        return Q(price__gte=min_price)
 
     @classmethod
-    def by_max_price(cls, products: QuerySet, max_price: str) -> QuerySet:
+    def by_max_price(cls, max_price: float) -> Q:
         """
-        Метод для фильтрации товаров по максимальной цене
+        Метод возвращает условие для фильтрации товаров по максимальной цене
 
-        @param products: QuerySet с товарами для фильтрации
         @param max_price: максимальное значение цены
-        @return: QuerySet с отфильтрованными товарами
+        @return: Q-объект с условием
         """
         logger.debug(f"Фильтрация по максимальной цене {max_price}")
 
-        filtered_products = products.filter(price__lte=max_price)
-        logger.debug(f"Найдено товаров: {len(filtered_products)}")
-
-        return filtered_products
+        return Q(price__lte=max_price)
 
     @classmethod
-    def by_title(cls, products: QuerySet, title: str) -> QuerySet:
+    def by_title(cls, title: str) -> Q:
         """
-        Метод для фильтрации товаров по названию
+        Метод возвращает условие для фильтрации товаров по названию
 
-        @param products: QuerySet с товарами для фильтрации
         @param title: название товара для фильтрации
-        @return: QuerySet с отфильтрованными товарами
+        @return: Q-объект с условием
         """
         logger.debug(f"Фильтрация по названию: {title}")
 
-        filtered_products = products.filter(name__icontains=f"{title}")
-        logger.debug(f"Найдено товаров: {len(filtered_products)}")
-
-        return filtered_products
+        return Q(name__icontains=f"{title}")
 
     @classmethod
-    def by_in_stock(cls, products: QuerySet) -> QuerySet:
+    def by_in_stock(cls) -> Q:
         """
-        Метод для фильтрации товаров по наличию товара
+        Метод возвращает условие для фильтрации товаров по наличию товара
 
-        @param products: QuerySet с товарами для фильтрации
-        @return: QuerySet с отфильтрованными товарами
+        @return: Q-объект с условием
         """
         logger.debug("Фильтрация по наличию")
 
-        filtered_products = products.filter(count__gt=0)
-        logger.debug(f"Найдено товаров: {len(filtered_products)}")
-
-        return filtered_products
+        return Q(count__gt=0)
 
     @classmethod
-    def by_free_shipping(cls, products: QuerySet) -> QuerySet:
+    def by_free_shipping(cls) -> Q:
         """
-        Метод для фильтрации товаров по возможности бесплатной доставки (цена товара > установленного минимума)
+        Метод возвращает условие для фильтрации товаров по возможности бесплатной доставки
+        (цена товара > установленного минимума)
 
-        @param products: QuerySet с товарами для фильтрации
-        @return: QuerySet с отфильтрованными товарами
+        @return: Q-объект с условием
         """
         logger.debug("Фильтрация по бесплатной доставке")
 
         config = get_config()
 
-        filtered_products = products.filter(price__gt=config.min_order_cost)
-        logger.debug(f"Найдено товаров: {len(filtered_products)}")
-
-        return filtered_products
+        return Q(price__gt=config.min_order_cost)
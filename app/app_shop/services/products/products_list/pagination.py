@@ -0,0 +1,267 @@
+import hashlib
+import logging
+
+from typing import Dict, List, Tuple, Union
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.db.models import Q, QuerySet
+
+from app.config.utils.configuration import get_config
+from app.app_shop.models.products import Product
+from app.app_shop.services.products.products_list.sorting import ProductSortService
+
+
+logger = logging.getLogger(__name__)
+
+
+class KeysetPage:
+    """
+    Страница товаров при постраничном выводе по ключу (без OFFSET и точного подсчета кол-ва записей)
+    """
+
+    cursor_mode = True
+
+    def __init__(
+        self,
+        object_list: List[Product],
+        next_cursor: Union[str, None],
+        previous_cursor: Union[str, None],
+        count: int,
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count  # Приблизительное (кэшированное) кол-во товаров в выборке
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+class KeysetPaginationService:
+    """
+    Сервис для постраничного вывода товаров по ключу (sort key, id).
+    Следующая страница выбирается условием WHERE по последней записи предыдущей страницы вместо OFFSET,
+    поэтому стоимость запроса не зависит от номера страницы. Позиция передается в URL непрозрачным
+    подписанным токеном (cursor).
+    """
+
+    _SALT = "app_shop.catalog.cursor"
+    _NEXT = "n"
+    _PREVIOUS = "p"
+
+    @classmethod
+    def paginate(
+        cls,
+        products: Union[QuerySet, List],
+        filters: Dict,
+        cursor: str,
+        per_page: int,
+        key: Tuple[str, bool] = None,
+    ) -> KeysetPage:
+        """
+        Метод возвращает страницу товаров, начиная с позиции из переданного токена
+
+        @param products: QuerySet с отфильтрованными и отсортированными товарами
+        @param filters: словарь с параметрами фильтрации и сортировки
+        @param cursor: токен с позицией страницы (пустая строка / None - первая страница)
+        @param per_page: кол-во товаров на странице
+        @param key: поле и направление сортировки (по умолчанию - из параметров сортировки)
+        @return: объект страницы
+        """
+        if not isinstance(products, QuerySet):
+            logger.warning("Выборка товаров пуста")
+            return KeysetPage(
+                object_list=[], next_cursor=None, previous_cursor=None, count=0
+            )
+
+        sort = filters.get("sort", "")
+        field, descending = key or ProductSortService.sort_key(filters=filters)
+        position = cls.decode(cursor=cursor, sort=sort, field=field)
+        count = cls.approximate_count(products=products, filters=filters)
+
+        if position is None:
+            logger.debug("Вывод первой страницы")
+            records = list(products[: per_page + 1])
+            has_more = len(records) > per_page
+            records = records[:per_page]
+
+            return KeysetPage(
+                object_list=records,
+                next_cursor=cls.cursor(records[-1], field, sort, cls._NEXT)
+                if has_more
+                else None,
+                previous_cursor=None,
+                count=count,
+            )
+
+        value, last_id, direction = position
+        backwards = direction == cls._PREVIOUS
+        logger.debug(
+            f"Вывод страницы по ключу: {field}={value}, id={last_id}, назад - {backwards}"
+        )
+
+        condition = cls.seek_condition(
+            field=field,
+            value=value,
+            last_id=last_id,
+            descending=descending != backwards,
+        )
+        products = products.filter(condition)
+
+        if backwards:
+            products = products.reverse()
+
+        records = list(products[: per_page + 1])
+        has_more = len(records) > per_page
+        records = records[:per_page]
+
+        if backwards:
+            records.reverse()
+
+        if not records:
+            return KeysetPage(
+                object_list=[], next_cursor=None, previous_cursor=None, count=count
+            )
+
+        next_cursor = cls.cursor(records[-1], field, sort, cls._NEXT)
+        previous_cursor = cls.cursor(records[0], field, sort, cls._PREVIOUS)
+
+        return KeysetPage(
+            object_list=records,
+            next_cursor=next_cursor if has_more or backwards else None,
+            previous_cursor=previous_cursor if has_more or not backwards else None,
+            count=count,
+        )
+
+    @classmethod
+    def seek_condition(cls, field: str, value, last_id: int, descending: bool) -> Q:
+        """
+        Метод возвращает условие для выборки записей после позиции (value, id) в порядке сортировки
+
+        @param field: поле сортировки
+        @param value: значение поля сортировки последней записи
+        @param last_id: id последней записи
+        @param descending: True - сортировка по убыванию
+        @return: Q-объект с условием
+        """
+        lookup = "lt" if descending else "gt"
+
+        if field == "id":
+            return Q(**{f"id__{lookup}": last_id})
+
+        return Q(**{f"{field}__{lookup}": value}) | Q(
+            **{field: value, f"id__{lookup}": last_id}
+        )
+
+    @classmethod
+    def cursor(cls, product: Product, field: str, sort: str, direction: str) -> str:
+        """
+        Метод для создания токена с позицией записи
+
+        @param product: объект товара (граничная запись страницы)
+        @param field: поле сортировки
+        @param sort: параметр сортировки из URL
+        @param direction: направление перехода (следующая / предыдущая страница)
+        @return: подписанный токен
+        """
+        if field in cls.model_fields():
+            value = Product._meta.get_field(field).value_to_string(product)
+        else:
+            value = getattr(product, field)  # Аннотация (н-р, релевантность при поиске)
+
+        return signing.dumps(
+            [sort, value, product.id, direction], salt=cls._SALT, compress=True
+        )
+
+    @classmethod
+    def decode(cls, cursor: str, sort: str, field: str) -> Union[tuple, None]:
+        """
+        Метод для проверки и расшифровки токена с позицией
+
+        @param cursor: токен из URL
+        @param sort: текущий параметр сортировки
+        @param field: поле сортировки
+        @return: значение поля сортировки, id записи, направление / None, если токен не задан или не валиден
+        """
+        if not cursor:
+            return None
+
+        try:
+            cursor_sort, value, last_id, direction = signing.loads(
+                cursor, salt=cls._SALT
+            )
+
+        except (signing.BadSignature, ValueError, TypeError):
+            logger.warning("Некорректный токен страницы, вывод первой страницы")
+            return None
+
+        if cursor_sort != sort:
+            logger.warning("Токен создан для другой сортировки, вывод первой страницы")
+            return None
+
+        try:
+            if field in cls.model_fields():
+                value = Product._meta.get_field(field).to_python(value)
+            else:
+                value = float(value)
+
+        except (ValidationError, ValueError, TypeError):
+            logger.warning("Некорректное значение в токене, вывод первой страницы")
+            return None
+
+        return value, int(last_id), direction
+
+    @classmethod
+    def model_fields(cls) -> set:
+        """
+        Метод возвращает названия полей модели товара
+
+        @return: множество с названиями полей
+        """
+        return {field.name for field in Product._meta.concrete_fields}
+
+    @classmethod
+    def approximate_count(cls, products: QuerySet, filters: Dict) -> int:
+        """
+        Метод возвращает кол-во товаров в выборке из кэша (подсчет выполняется один раз на время кэширования)
+
+        @param products: QuerySet с товарами
+        @param filters: словарь с параметрами фильтрации (ключ кэша)
+        @return: кол-во товаров
+        """
+        config = get_config()
+
+        return cache.get_or_set(
+            f"catalog_count_{cls.filters_key(filters)}",
+            products.order_by().count,
+            60 * config.caching_time,
+        )
+
+    @classmethod
+    def filters_key(cls, filters: Dict) -> str:
+        """
+        Метод возвращает ключ набора параметров фильтрации для кэша (без сортировки и номера / ключа страницы)
+
+        @param filters: словарь с параметрами фильтрации
+        @return: md5-хэш параметров
+        """
+        params = sorted(
+            (key, str(value))
+            for key, value in filters.items()
+            if key not in ("sort", "cursor", "page")
+        )
+
+        return hashlib.md5(str(params).encode()).hexdigest()
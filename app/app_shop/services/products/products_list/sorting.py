@@ -1,7 +1,7 @@
 import logging
-from typing import Dict
+from typing import Dict, Tuple
 
-from django.db.models import QuerySet, Count
+from django.db.models import QuerySet
 
 
 logger = logging.getLogger(__name__)
@@ -12,6 +12,19 @@ class ProductSortService:
     Сервис по сортировке товаров по популярности, цене, отзывам и новизне
     """
 
+    # Поле сортировки и направление (True - по убыванию) для каждого варианта сортировки.
+    # Порядок дополняется полем id в том же направлении (используется при постраничном выводе по ключу)
+    _SORT_KEYS = {
+        "by_price_down": ("price", True),
+        "by_price_up": ("price", False),
+        "by_popularity_down": ("purchases", True),
+        "by_popularity_up": ("purchases", False),
+        "by_reviews_down": ("active_reviews_count", False),
+        "by_reviews_up": ("active_reviews_count", True),
+        "by_novelty_down": ("created_at", True),
+        "by_novelty_up": ("created_at", False),
+    }
+
     @classmethod
     def output(cls, products: QuerySet, filters: Dict) -> QuerySet:
         """
@@ -47,11 +60,35 @@ class ProductSortService:
 
             elif sort == "by_novelty_up":
                 products = cls.by_novelty_up(products=products)
+
+            else:
+                logger.warning(f"Неизвестный параметр сортировки: {sort}")
         else:
             logger.warning("Параметр сортировки не задан")
 
         return products
 
+    @classmethod
+    def is_valid(cls, filters: Dict) -> bool:
+        """
+        Метод проверяет, задан ли в параметрах известный вариант сортировки
+
+        @param filters: словарь с параметрами сортировки
+        @return: True - сортировка задана и поддерживается
+        """
+        return filters.get("sort", False) in cls._SORT_KEYS
+
+    @classmethod
+    def sort_key(cls, filters: Dict) -> Tuple[str, bool]:
+        """
+        Метод возвращает поле и направление сортировки по переданным параметрам
+        (по умолчанию - по id по возрастанию, как в Meta.ordering модели товара)
+
+        @param filters: словарь с параметрами сортировки
+        @return: название поля, True - сортировка по убыванию
+        """
+        return cls._SORT_KEYS.get(filters.get("sort", False), ("id", False))
+
     @classmethod
     def by_popularity_up(cls, products: QuerySet) -> QuerySet:
         """
@@ -62,7 +99,7 @@ class ProductSortService:
         """
         logger.debug("Сортировка по популярности (кол-ву продаж): по возрастанию")
 
-        sorted_products = products.order_by("purchases")
+        sorted_products = products.order_by("purchases", "id")
         return sorted_products
 
     @classmethod
@@ -75,7 +112,7 @@ class ProductSortService:
         """
         logger.debug("Сортировка по популярности (кол-ву продаж): по убыванию")
 
-        sorted_products = products.order_by("-purchases")
+        sorted_products = products.order_by("-purchases", "-id")
         return sorted_products
 
     @classmethod
@@ -88,7 +125,7 @@ class ProductSortService:
         """
         logger.debug("Сортировка по цене: по возрастанию")
 
-        sorted_products = products.order_by("price")
+        sorted_products = products.order_by("price", "id")
         return sorted_products
 
     @classmethod
@@ -101,7 +138,7 @@ class ProductSortService:
         """
         logger.debug("Сортировка по цене: по убыванию")
 
-        sorted_products = products.order_by("-price")
+        sorted_products = products.order_by("-price", "-id")
         return sorted_products
 
     @classmethod
@@ -114,9 +151,8 @@ class ProductSortService:
         """
         logger.debug("Сортировка по отзывам: по возрастанию")
 
-        sorted_products = products.annotate(
-            count_comments=Count("productreviews")
-        ).order_by("-count_comments")
+        # Сортировка по денормализованному счетчику активных отзывов (без GROUP BY по таблице отзывов)
+        sorted_products = products.order_by("-active_reviews_count", "-id")
         return sorted_products
 
     @classmethod
@@ -129,9 +165,7 @@ class ProductSortService:
         """
         logger.debug("Сортировка по отзывам: по убыванию")
 
-        sorted_products = products.annotate(
-            count_comments=Count("productreviews")
-        ).order_by("count_comments")
+        sorted_products = products.order_by("active_reviews_count", "id")
         return sorted_products
 
     @classmethod
@@ -144,7 +178,7 @@ class ProductSortService:
         """
         logger.debug("Сортировка по новизне: по возрастанию")
 
-        sorted_products = products.order_by("created_at")
+        sorted_products = products.order_by("created_at", "id")
         return sorted_products
 
     @classmethod
@@ -157,5 +191,5 @@ class ProductSortService:
         """
         logger.debug("Сортировка по новизне: по убыванию")
 
-        sorted_products = products.order_by("-created_at")
+        sorted_products = products.order_by("-created_at", "-id")
         return sorted_products
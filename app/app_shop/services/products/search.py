@@ -1,41 +1,197 @@
 import logging
 
-from django.db.models import Q, QuerySet
+from typing import Dict, Tuple
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import F, FloatField, Q, QuerySet, Value
 from django.http import HttpRequest
 
-from app.app_shop.models.products import Product
+from app.app_shop.models.products import Product, SEARCH_CONFIG
+from app.app_shop.services.products.products_list.sorting import ProductSortService
+from app.app_shop.services.products.search_index import ProductSearchIndex
 
 
 logger = logging.getLogger(__name__)
 
 
+class SimpleSearchBackend:
+    """
+    Поиск товаров по вхождению фразы в название (без индекса, для СУБД без полнотекстового поиска)
+    """
+
+    ranked = False  # Результаты не ранжируются по релевантности
+
+    def search(self, products: QuerySet, query: str) -> QuerySet:
+        """
+        Метод возвращает товары, в названии которых есть поисковая фраза
+
+        @param products: QuerySet с товарами для поиска
+        @param query: поисковая фраза
+        @return: QuerySet с найденными товарами
+        """
+        # Вариант с заглавной буквы нужен для SQLite, где icontains не учитывает регистр только для ASCII
+        return products.filter(
+            Q(name__icontains=query) | Q(name__icontains=query.capitalize())
+        )
+
+
+class PostgresSearchBackend:
+    """
+    Полнотекстовый поиск PostgreSQL по поисковому вектору товара (название, описание, теги)
+    с ранжированием по релевантности и поиском по триграммам названия при опечатках
+    """
+
+    ranked = True  # Результаты ранжируются по релевантности (аннотация rank)
+
+    # Минимальное сходство названия с фразой при поиске по триграммам
+    _TRIGRAM_THRESHOLD = 0.3
+
+    def search(self, products: QuerySet, query: str) -> QuerySet:
+        """
+        Метод возвращает товары, найденные по поисковой фразе, отсортированные по релевантности.
+        Если полнотекстовый поиск ничего не нашел - поиск по сходству триграмм названия.
+
+        @param products: QuerySet с товарами для поиска
+        @param query: поисковая фраза
+        @return: QuerySet с найденными товарами (с аннотацией rank)
+        """
+        if not query.strip():
+            return products.annotate(
+                rank=Value(0.0, output_field=FloatField())
+            ).order_by("-rank", "-id")
+
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+
+        found = (
+            products.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-id")
+        )
+
+        if found.exists():
+            return found
+
+        logger.debug("Полнотекстовый поиск не дал результатов, поиск по триграммам")
+
+        # Оператор %> сравнивает сходство с порогом pg_trgm.word_similarity_threshold (параметр сеанса)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)",
+                [str(self._TRIGRAM_THRESHOLD)],
+            )
+
+        # Сначала отбор оператором (использует GIN-индекс products_name_trgm_gin), затем расчет сходства
+        return (
+            products.filter(name__trigram_word_similar=query)
+            .annotate(rank=TrigramWordSimilarity(query, "name"))
+            .order_by("-rank", "-id")
+        )
+
+
+class IndexSearchBackend:
+    """
+    Поиск товаров по инвертированному индексу в файле (services.products.search_index) без обращения к СУБД
+    для разбора текста. Если индекс еще не создан - простой поиск по названию.
+    Найденные id передаются в запрос списком (IN), поэтому для широких запросов выборка ограничивается
+    settings.PRODUCT_SEARCH_MAX_RESULTS новейшими товарами (лимит параметров SQLite, размер запроса).
+    """
+
+    ranked = False  # Результаты не ранжируются по релевантности
+
+    def search(self, products: QuerySet, query: str) -> QuerySet:
+        """
+        Метод возвращает товары, содержащие все слова поисковой фразы
+
+        @param products: QuerySet с товарами для поиска
+        @param query: поисковая фраза
+        @return: QuerySet с найденными товарами
+        """
+        if not query.strip():
+            return products
+
+        ids = ProductSearchIndex.search(query=query)
+
+        if ids is None:
+            logger.warning("Поисковый индекс не создан, используется простой поиск")
+            return SimpleSearchBackend().search(products=products, query=query)
+
+        if len(ids) > settings.PRODUCT_SEARCH_MAX_RESULTS:
+            logger.info(
+                f"Найдено товаров по индексу: {len(ids)}, "
+                f"выводится {settings.PRODUCT_SEARCH_MAX_RESULTS}"
+            )
+            ids = sorted(ids, reverse=True)[: settings.PRODUCT_SEARCH_MAX_RESULTS]
+
+        return products.filter(id__in=ids)
+
+
 class ProductsListSearchService:
     """
-    Сервис для поиска товаров по названию
+    Сервис для поиска товаров по названию, описанию и тегам.
+    Поиск выполняется подключаемым модулем (backend), указанным в settings.PRODUCT_SEARCH_BACKEND.
     """
 
+    _BACKENDS = {
+        "simple": SimpleSearchBackend,
+        "postgres": PostgresSearchBackend,
+        "index": IndexSearchBackend,
+    }
+    _backend = None
+
     @classmethod
     def search(cls, request: HttpRequest) -> QuerySet:
         """
-        Поиск товаров по переданной в URL фразе: частичное / полное совпадение с названием товара,
-        совпадение в начале / в конце наименования товара
+        Поиск товаров по переданной в URL фразе
 
         @param request: http-запрос с URL вида /search/?query=смартфон
         @return: QuerySet с товарами
         """
 
-        query = request.GET["query"]
+        query = request.GET.get("query", "")
         logger.debug(f"Поиск товаров по фразе: {query}")
 
-        products = Product.objects.filter(
-            Q(name__icontains=query)
-            | Q(name__contains=query)
-            | Q(name__startswith=query)
-            | Q(name__endswith=query)
-            | Q(name__icontains=query.capitalize())
-            | Q(name__contains=query.capitalize())
-            | Q(name__startswith=query.capitalize())
-            | Q(name__endswith=query.capitalize())
-        )
+        products = Product.objects.filter(deleted=False)
+
+        return cls.backend().search(products=products, query=query)
+
+    @classmethod
+    def sort_key(cls, filters: Dict) -> Tuple[str, bool]:
+        """
+        Метод возвращает поле и направление сортировки результатов поиска
+        (при отсутствии или неизвестном параметре сортировки - по релевантности, если модуль поиска ее
+        поддерживает: ключ постраничного вывода должен совпадать с порядком выборки "-rank", "-id")
+
+        @param filters: словарь с параметрами сортировки
+        @return: название поля, True - сортировка по убыванию
+        """
+        if ProductSortService.is_valid(filters=filters) or not cls.backend().ranked:
+            return ProductSortService.sort_key(filters=filters)
+
+        return "rank", True
+
+    @classmethod
+    def backend(cls):
+        """
+        Метод возвращает объект модуля поиска из настроек.
+        Полнотекстовый поиск PostgreSQL заменяется простым поиском, если используется другая СУБД.
+
+        @return: объект модуля поиска
+        """
+        if cls._backend is None:
+            name = getattr(settings, "PRODUCT_SEARCH_BACKEND", "postgres")
+
+            if name == "postgres" and connection.vendor != "postgresql":
+                logger.warning(
+                    "Полнотекстовый поиск доступен только для PostgreSQL, используется простой поиск"
+                )
+                name = "simple"
+
+            cls._backend = cls._BACKENDS[name]()
+            logger.info(f"Модуль поиска товаров: {name}")
 
-        return products
+        return cls._backend
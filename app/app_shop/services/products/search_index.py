@@ -0,0 +1,519 @@
+import fcntl
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+
+from array import array
+from typing import Dict, Iterable, List, Set, Union
+from django.conf import settings
+from kombu.exceptions import OperationalError
+
+from app.app_shop.models.products import Product
+
+
+logger = logging.getLogger(__name__)
+
+
+class SearchTextNormalizer:
+    """
+    Нормализация текста для поискового индекса: приведение к нижнему регистру, замена "ё" на "е",
+    разбиение на слова и отбрасывание типичных окончаний русских слов (упрощенный стемминг)
+    """
+
+    _WORD = re.compile(r"\w+", re.UNICODE)
+    _CYRILLIC = re.compile(r"^[а-я]+$")
+    _MIN_STEM = 3  # Минимальная длина основы слова после отбрасывания окончания
+
+    # Окончания прилагательных, существительных и глаголов (сначала более длинные)
+    _ENDINGS = tuple(
+        sorted(
+            (
+                "иями", "ями", "ами", "иях", "ях", "ах", "ого", "его", "ому", "ему",
+                "ыми", "ими", "ией", "ую", "юю", "ий", "ый", "ой", "ая", "яя", "ое", "ее",
+                "ые", "ие", "ых", "их", "ом", "ем", "ам", "ям", "ов", "ев", "ей", "ию",
+                "ья", "ье", "ьи", "ть", "ет", "ют", "ут", "ит", "ат", "ят",
+                "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+            ),
+            key=len,
+            reverse=True,
+        )
+    )  # fmt: skip
+
+    @classmethod
+    def tokens(cls, text: str) -> List[str]:
+        """
+        Метод возвращает список нормализованных слов текста
+
+        @param text: исходный текст
+        @return: список основ слов (в порядке следования в тексте, с повторами)
+        """
+        text = (text or "").lower().replace("ё", "е")
+
+        return [cls.stem(word) for word in cls._WORD.findall(text)]
+
+    @classmethod
+    def stem(cls, word: str) -> str:
+        """
+        Метод отбрасывает окончание русского слова (слова на латинице и числа не изменяются)
+
+        @param word: слово в нижнем регистре
+        @return: основа слова
+        """
+        if not cls._CYRILLIC.match(word):
+            return word
+
+        for ending in cls._ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= cls._MIN_STEM:
+                return word[: -len(ending)]
+
+        return word
+
+
+class _IndexReader:
+    """
+    Чтение поискового индекса из файла, отображенного в память (mmap).
+    Формат файла: заголовок, таблица слов (отсортирована по байтам слова), строки слов, списки id товаров.
+    Страницы файла разделяются между всеми процессами сервера через page cache ОС.
+    """
+
+    HEADER = struct.Struct(
+        "<4sIIQ"
+    )  # Сигнатура, версия, кол-во слов, смещение списков id
+    RECORD = struct.Struct(
+        "<IIII"
+    )  # Смещение и длина слова, смещение и длина списка id
+    MAGIC = b"MGSI"
+    VERSION = 1
+    ID_TYPE = "Q"  # Тип элементов списков id товаров (array, 8 байт)
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.stat = os.fstat(file.fileno())
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size, self.postings_offset = self.HEADER.unpack_from(
+            self.buffer, 0
+        )
+
+        if magic != self.MAGIC or version != self.VERSION:
+            self.buffer.close()
+            raise ValueError("Неизвестный формат файла поискового индекса")
+
+        self.ids = memoryview(self.buffer)[self.postings_offset :].cast(self.ID_TYPE)
+
+    def close(self) -> None:
+        self.ids.release()
+        self.buffer.close()
+
+    def record(self, index: int) -> tuple:
+        return self.RECORD.unpack_from(
+            self.buffer, self.HEADER.size + index * self.RECORD.size
+        )
+
+    def term(self, index: int) -> bytes:
+        offset, length, _, _ = self.record(index)
+        return self.buffer[offset : offset + length]
+
+    def postings(self, index: int) -> List[int]:
+        _, _, offset, length = self.record(index)
+        return self.ids[offset : offset + length].tolist()
+
+    def lower_bound(self, term: bytes) -> int:
+        """
+        Бинарный поиск позиции первого слова в таблице, которое >= переданного
+        """
+        low, high = 0, self.size
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self.term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def exact(self, term: str) -> Set[int]:
+        key = term.encode()
+        position = self.lower_bound(key)
+
+        if position < self.size and self.term(position) == key:
+            return set(self.postings(position))
+
+        return set()
+
+    def prefix(self, term: str) -> Set[int]:
+        key = term.encode()
+        position = self.lower_bound(key)
+        result = set()
+
+        while position < self.size and self.term(position).startswith(key):
+            result.update(self.postings(position))
+            position += 1
+
+        return result
+
+    def items(self) -> Iterable:
+        for position in range(self.size):
+            yield self.term(position).decode(), self.postings(position)
+
+
+class ProductSearchIndex:
+    """
+    Инвертированный поисковый индекс товаров (основа слова -> отсортированный список id товаров)
+    по названию, описанию и активным тегам. Хранится в файле settings.PRODUCT_SEARCH_INDEX_PATH,
+    который каждый процесс отображает в память; изменения записываются во временный файл и атомарно
+    подменяют индекс (os.replace), процессы переоткрывают файл при изменении.
+    Индекс создается командой build_search_index. При сохранении товаров и тегов их id дописываются
+    в журнал изменений, который объединяется с индексом фоновой задачей (одна перезапись индекса
+    на все изменения, накопленные за settings.PRODUCT_SEARCH_INDEX_DELAY сек).
+    """
+
+    _reader = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def path(cls) -> str:
+        return str(settings.PRODUCT_SEARCH_INDEX_PATH)
+
+    @classmethod
+    def exists(cls) -> bool:
+        return os.path.exists(cls.path())
+
+    @classmethod
+    def search(cls, query: str) -> Union[Set[int], None]:
+        """
+        Метод возвращает id товаров, содержащих все слова поисковой фразы
+        (последнее слово ищется по префиксу, чтобы находить товары по неполному вводу)
+
+        @param query: поисковая фраза
+        @return: множество id товаров / None, если индекс не создан
+        """
+        reader = cls.reader()
+
+        if reader is None:
+            return None
+
+        tokens = SearchTextNormalizer.tokens(query)
+
+        if not tokens:
+            return set()
+
+        result = None
+
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                ids = reader.prefix(token)
+            else:
+                ids = reader.exact(token)
+
+            result = ids if result is None else result & ids
+
+            if not result:
+                break
+
+        logger.debug(f"Найдено товаров по индексу: {len(result)}")
+
+        return result
+
+    @classmethod
+    def reader(cls) -> Union[_IndexReader, None]:
+        """
+        Метод возвращает объект для чтения индекса, переоткрывая файл, если он был заменен
+
+        @return: объект для чтения индекса / None, если индекс не создан
+        """
+        try:
+            stat = os.stat(cls.path())
+
+        except FileNotFoundError:
+            return None
+
+        with cls._lock:
+            reader = cls._reader
+
+            if reader is None or (reader.stat.st_ino, reader.stat.st_mtime_ns) != (
+                stat.st_ino,
+                stat.st_mtime_ns,
+            ):
+                logger.info("Открытие файла поискового индекса")
+                cls._reader = reader = _IndexReader(cls.path())
+
+        return reader
+
+    @classmethod
+    def build(cls) -> int:
+        """
+        Метод для полного создания индекса по всем активным товарам
+
+        @return: кол-во слов в индексе
+        """
+        logger.info("Создание поискового индекса товаров")
+
+        with cls.write_lock():
+            index = cls.documents(product_ids=None)
+            cls.write(index=index)
+
+        return len(index)
+
+    @classmethod
+    def update(cls, product_ids: Iterable[int]) -> None:
+        """
+        Метод для обновления записей индекса по переданным товарам (индекс должен быть уже создан)
+
+        @param product_ids: список с id товаров
+        """
+        product_ids = set(product_ids)
+
+        if not product_ids or not cls.exists():
+            return
+
+        try:
+            with cls.write_lock():
+                cls.apply(product_ids=product_ids)
+
+        except (OSError, ValueError) as exc:
+            logger.error(f"Ошибка при обновлении поискового индекса: {exc}")
+
+    @classmethod
+    def apply(cls, product_ids: Set[int]) -> None:
+        """
+        Метод для замены записей индекса по переданным товарам (вызывается под блокировкой на запись)
+
+        @param product_ids: множество с id товаров
+        """
+        logger.debug(f"Обновление поискового индекса для товаров: {product_ids}")
+
+        index = cls.load(exclude=product_ids)
+
+        for term, ids in cls.documents(product_ids=product_ids).items():
+            index.setdefault(term, set()).update(ids)
+
+        cls.write(index=index)
+
+    @classmethod
+    def schedule(cls, product_ids: Iterable[int]) -> None:
+        """
+        Метод дописывает id товаров в журнал изменений индекса и ставит задачу объединения журнала с индексом
+        (запрос не ожидает перезаписи индекса)
+
+        @param product_ids: список с id товаров
+        """
+        # Импорт внутри метода, т.к. модуль задач сам импортирует сервисы поиска
+        from app.app_shop.tasks import update_search_index
+
+        product_ids = set(product_ids)
+
+        if not product_ids or not cls.exists():
+            return
+
+        try:
+            with cls.journal_lock():
+                with open(cls.journal_path(), "a") as file:
+                    file.write("".join(f"{product_id}\n" for product_id in product_ids))
+
+        except OSError as exc:
+            logger.error(f"Ошибка при записи журнала поискового индекса: {exc}")
+            return
+
+        try:
+            update_search_index.apply_async(
+                countdown=settings.PRODUCT_SEARCH_INDEX_DELAY
+            )
+
+        except OperationalError as exc:
+            # Журнал будет объединен с индексом периодической задачей
+            logger.error(f"Задача обновления поискового индекса не запущена: {exc}")
+
+    @classmethod
+    def merge(cls) -> int:
+        """
+        Метод для объединения журнала изменений с индексом. Если журнал уже объединен другой задачей
+        (несколько изменений за время ожидания) - индекс не перезаписывается.
+
+        @return: кол-во обновленных товаров
+        """
+        if not cls.exists():
+            return 0
+
+        with cls.write_lock():
+            with cls.journal_lock():
+                try:
+                    with open(cls.journal_path(), "r+") as file:
+                        product_ids = {int(line) for line in file if line.strip()}
+                        file.truncate(0)
+
+                except FileNotFoundError:
+                    return 0
+
+            if not product_ids:
+                return 0
+
+            try:
+                cls.apply(product_ids=product_ids)
+
+            except (OSError, ValueError):
+                # Возвращаем id в журнал, чтобы изменения не потерялись при повторе задачи
+                with cls.journal_lock():
+                    with open(cls.journal_path(), "a") as file:
+                        file.write(
+                            "".join(f"{product_id}\n" for product_id in product_ids)
+                        )
+                raise
+
+        return len(product_ids)
+
+    @classmethod
+    def documents(cls, product_ids: Union[Set[int], None]) -> Dict[str, Set[int]]:
+        """
+        Метод для разбора текстов активных товаров из БД
+
+        @param product_ids: id товаров (None - все товары)
+        @return: словарь: основа слова - множество id товаров
+        """
+        products = Product.objects.filter(deleted=False)
+
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+
+        tags = Product.tags.through.objects.filter(
+            producttags__deleted=False, product__in=products
+        ).values_list("product_id", "producttags__name")
+
+        index = {}
+
+        def add(product_id: int, text: str) -> None:
+            for term in SearchTextNormalizer.tokens(text):
+                index.setdefault(term, set()).add(product_id)
+
+        for product_id, name, definition in products.values_list(
+            "id", "name", "definition"
+        ).iterator(chunk_size=1000):
+            add(product_id, name)
+            add(product_id, definition)
+
+        for product_id, tag in tags.iterator(chunk_size=1000):
+            add(product_id, tag)
+
+        return index
+
+    @classmethod
+    def load(cls, exclude: Set[int]) -> Dict[str, Set[int]]:
+        """
+        Метод для загрузки текущего индекса в словарь
+
+        @param exclude: id товаров, которые нужно исключить из индекса
+        @return: словарь: основа слова - множество id товаров
+        """
+        reader = _IndexReader(cls.path())
+
+        try:
+            index = {}
+
+            for term, postings in reader.items():
+                ids = set(postings) - exclude
+
+                if ids:
+                    index[term] = ids
+
+            return index
+
+        finally:
+            reader.close()
+
+    @classmethod
+    def write(cls, index: Dict[str, Set[int]]) -> None:
+        """
+        Метод для записи индекса во временный файл и атомарной замены текущего файла
+
+        @param index: словарь: основа слова - множество id товаров
+        """
+        terms = sorted((term.encode(), sorted(ids)) for term, ids in index.items())
+
+        header_size = _IndexReader.HEADER.size
+        table_size = _IndexReader.RECORD.size * len(terms)
+        strings_offset = header_size + table_size
+
+        records, strings, postings = (
+            bytearray(),
+            bytearray(),
+            array(_IndexReader.ID_TYPE),
+        )
+
+        for term, ids in terms:
+            records += _IndexReader.RECORD.pack(
+                strings_offset + len(strings), len(term), len(postings), len(ids)
+            )
+            strings += term
+            postings.extend(ids)
+
+        # Выравниваем начало списков id по размеру элемента для memoryview.cast
+        postings_offset = strings_offset + len(strings)
+        padding = -postings_offset % postings.itemsize
+        postings_offset += padding
+
+        path = cls.path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(temp_path, "wb") as file:
+            file.write(
+                _IndexReader.HEADER.pack(
+                    _IndexReader.MAGIC,
+                    _IndexReader.VERSION,
+                    len(terms),
+                    postings_offset,
+                )
+            )
+            file.write(records)
+            file.write(strings)
+            file.write(b"\0" * padding)
+            postings.tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, path)
+        logger.info(f"Поисковый индекс записан: слов - {len(terms)}")
+
+    @classmethod
+    def write_lock(cls):
+        """
+        Метод возвращает межпроцессную блокировку на запись индекса (файловая блокировка flock)
+        """
+        return _FileLock(f"{cls.path()}.lock")
+
+    @classmethod
+    def journal_path(cls) -> str:
+        return f"{cls.path()}.journal"
+
+    @classmethod
+    def journal_lock(cls):
+        """
+        Метод возвращает межпроцессную блокировку журнала изменений (удерживается только на время записи
+        или чтения журнала, не на время перезаписи индекса)
+        """
+        return _FileLock(f"{cls.journal_path()}.lock")
+
+
+class _FileLock:
+    """
+    Эксклюзивная файловая блокировка (контекстный менеджер)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import posixpath
+
+from io import BytesIO
+from typing import Dict, Iterable, List
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from kombu.exceptions import OperationalError
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImageRenditionService:
+    """
+    Сервис для создания уменьшенных копий изображений (карточка товара, корзина, галерея, аватар).
+    Копии создаются фоновой задачей после загрузки изображения для каждой ширины из settings.IMAGE_RENDITIONS
+    в форматах settings.IMAGE_RENDITION_FORMATS и сохраняются рядом с оригиналом (папка renditions).
+    В имя копии входит хэш содержимого оригинала, поэтому файл по одному URL никогда не меняется
+    и может кэшироваться браузером без ограничения срока.
+    Поля с изображениями задаются в атрибуте модели RENDITIONS, список копий хранится в поле "<поле>_renditions":
+        {"source": имя оригинала, "card": {"webp": [[ширина, имя файла], ...], "jpeg": [...]}, ...}.
+    """
+
+    _EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+    _HASH_LENGTH = 12
+
+    @classmethod
+    def schedule(cls, instance) -> None:
+        """
+        Метод ставит задачи создания копий после фиксации транзакции для изображений объекта, которые изменились.
+        Поля и назначения копий задаются в атрибуте модели RENDITIONS: {"image": ("card", "cart"), ...}.
+
+        @param instance: объект модели
+        @return: None
+        """
+        for field_name, kinds in instance.RENDITIONS.items():
+            cls.schedule_field(instance=instance, field_name=field_name, kinds=kinds)
+
+    @classmethod
+    def schedule_field(cls, instance, field_name: str, kinds: Iterable[str]) -> None:
+        """
+        Метод ставит задачу создания копий изображения из поля объекта, если изображение изменилось
+
+        @param instance: объект модели
+        @param field_name: название поля с изображением
+        @param kinds: назначения копий (ключи settings.IMAGE_RENDITIONS)
+        @return: None
+        """
+        # Импорт внутри метода, т.к. модуль задач сам импортирует модели
+        from app.app_shop.tasks import image_renditions
+
+        file = getattr(instance, field_name)
+        renditions_field = f"{field_name}_renditions"
+        renditions = getattr(instance, renditions_field) or {}
+
+        if not file:
+            if renditions:
+                # Изображение удалено - копии старого изображения больше не выводятся
+                setattr(instance, renditions_field, {})
+                type(instance).objects.filter(pk=instance.pk).update(
+                    **{renditions_field: {}}
+                )
+            return
+
+        if renditions.get("source") == file.name:
+            return
+
+        label, pk, kinds = instance._meta.label, instance.pk, list(kinds)
+
+        def send() -> None:
+            try:
+                image_renditions.delay(
+                    label=label, pk=pk, field_name=field_name, kinds=kinds
+                )
+
+            except OperationalError as exc:
+                logger.error(f"Задача создания копий изображения не запущена: {exc}")
+
+        transaction.on_commit(send)
+
+    @classmethod
+    def generate(cls, label: str, pk: int, field_name: str, kinds: List[str]) -> Dict:
+        """
+        Метод для создания копий изображения и сохранения их списка в объекте модели
+
+        @param label: модель ("app_shop.ProductImages")
+        @param pk: id объекта
+        @param field_name: название поля с изображением
+        @param kinds: назначения копий
+        @return: словарь с копиями изображения (пустой, если объект или изображение не найдены)
+        """
+        model = apps.get_model(label)
+        instance = model.objects.filter(pk=pk).first()
+        file = getattr(instance, field_name, None)
+
+        if not file:
+            logger.warning(f"Изображение не найдено: {label}, id - {pk}")
+            return {}
+
+        source = file.name
+
+        with file.open("rb"):
+            content = file.read()
+
+        digest = hashlib.sha256(content).hexdigest()[: cls._HASH_LENGTH]
+        image = ImageOps.exif_transpose(Image.open(BytesIO(content)))
+        renditions = {"source": source}
+
+        for kind in kinds:
+            renditions[kind] = {
+                image_format: [
+                    [width, cls.save(image, source, kind, width, image_format, digest)]
+                    for width in cls.widths(kind=kind, original_width=image.width)
+                ]
+                for image_format in settings.IMAGE_RENDITION_FORMATS
+            }
+
+        renditions_field = f"{field_name}_renditions"
+
+        # Список сохраняется, только если изображение не заменили во время создания копий
+        updated = model.objects.filter(pk=pk, **{field_name: source}).update(
+            **{renditions_field: renditions}
+        )
+
+        if updated:
+            previous = getattr(instance, renditions_field) or {}
+
+            # Копии общего файла (одно изображение у нескольких записей) удаляются вместе с последней записью
+            if (
+                not previous.get("source")
+                or not model.objects.filter(**{field_name: previous["source"]})
+                .exclude(pk=pk)
+                .exists()
+            ):
+                cls.delete_unused(previous=previous, current=renditions)
+
+            logger.info(f"Созданы копии изображения: {source}")
+
+        return renditions
+
+    @classmethod
+    def widths(cls, kind: str, original_width: int) -> List[int]:
+        """
+        Метод возвращает ширины копий для назначения (изображение не увеличивается)
+        """
+        return sorted(
+            {min(width, original_width) for width in settings.IMAGE_RENDITIONS[kind]}
+        )
+
+    @classmethod
+    def save(
+        cls,
+        image: Image.Image,
+        source: str,
+        kind: str,
+        width: int,
+        image_format: str,
+        digest: str,
+    ) -> str:
+        """
+        Метод для сохранения копии изображения заданной ширины (с сохранением пропорций)
+
+        @return: имя файла копии в хранилище
+        """
+        directory, filename = posixpath.split(source)
+        stem = posixpath.splitext(filename)[0]
+        name = posixpath.join(
+            directory,
+            "renditions",
+            f"{stem}.{kind}-{width}.{digest}.{cls._EXTENSIONS[image_format]}",
+        )
+
+        if default_storage.exists(name):
+            return name
+
+        rendition = image.copy()
+        rendition.thumbnail((width, image.height), Image.LANCZOS)
+
+        if image_format == "jpeg":
+            rendition = cls.flatten(rendition)
+        elif rendition.mode not in ("RGB", "RGBA"):
+            rendition = rendition.convert("RGBA")
+
+        buffer = BytesIO()
+        rendition.save(
+            buffer,
+            format=image_format.upper(),
+            quality=settings.IMAGE_RENDITION_QUALITY,
+            optimize=True,
+        )
+
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    @classmethod
+    def flatten(cls, image: Image.Image) -> Image.Image:
+        """
+        Метод переводит изображение в RGB (прозрачные области заменяются белым фоном)
+        """
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+
+        return image.convert("RGB")
+
+    @classmethod
+    def delete_unused(cls, previous: Dict, current: Dict) -> None:
+        """
+        Метод удаляет файлы копий предыдущего изображения, которые не используются в новом списке
+        """
+        unused = cls.names(previous) - cls.names(current)
+
+        for name in unused:
+            default_storage.delete(name)
+
+        if unused:
+            logger.debug(f"Удалены неиспользуемые копии изображения: {len(unused)}")
+
+    @classmethod
+    def names(cls, renditions: Dict) -> set:
+        return {
+            name
+            for kind, formats in renditions.items()
+            if kind != "source"
+            for sizes in formats.values()
+            for _, name in sizes
+        }
+
+    @classmethod
+    def srcset(cls, renditions: Dict, kind: str, image_format: str) -> str:
+        """
+        Метод возвращает значение атрибута srcset для копий изображения
+
+        @param renditions: словарь с копиями изображения
+        @param kind: назначение копий
+        @param image_format: формат копий
+        @return: строка "URL ширина, ..." / пустая строка, если копий нет
+        """
+        sizes = ((renditions or {}).get(kind) or {}).get(image_format) or []
+
+        return ", ".join(
+            f"{default_storage.url(name)} {width}w" for width, name in sizes
+        )
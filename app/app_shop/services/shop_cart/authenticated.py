@@ -1,13 +1,17 @@
 import logging
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.exceptions import ObjectDoesNotExist
+from typing import Dict, List, Tuple
 from django.core.cache import cache
-from django.db.models import QuerySet
+from django.db import connection, transaction
+from django.db.models import F
 
-from app.config.admin import config
+from app.config.utils.configuration import get_config
 from app.app_shop.models.products import Product
 from app.app_shop.models.cart_and_orders import Cart
+from app.app_shop.services.caching import CachedQueryService
+from app.app_shop.services.shop_cart.redis_storage import RedisCartStorage
 
 
 logger = logging.getLogger(__name__)
@@ -15,50 +19,169 @@ logger = logging.getLogger(__name__)
 
 class ProductsCartUserService:
     """
-    Сервис для добавления, изменения и удаления товаров в корзине авторизованного пользователя (БД)
+    Сервис для добавления, изменения и удаления товаров в корзине авторизованного пользователя
+    (БД или Redis с отложенной записью в БД - в зависимости от settings.CART_BACKEND)
     """
 
+    # Поля записей корзины для вывода (товар с основным изображением)
+    _FIELDS = (
+        "id",
+        "count",
+        "product__id",
+        "product__name",
+        "product__definition",
+        "product__primary_image__title",
+        "product__primary_image__image",
+        "product__primary_image__image_renditions",
+        "product__price",
+        "product__discount",
+    )
+
+    @classmethod
+    def redis_backend(cls) -> bool:
+        """
+        Метод проверяет, хранятся ли корзины в Redis (settings.CART_BACKEND = "redis")
+        """
+        return getattr(settings, "CART_BACKEND", "database") == "redis"
+
     @classmethod
     def add(cls, user: User, product_id: int, count: int = 1) -> bool:
         """
-        Метод для добавления товара в корзину пользователя
+        Метод для добавления товара в корзину пользователя одним запросом (upsert): новая запись создается,
+        если товара нет в корзине, иначе кол-во увеличивается (count = count + n) без чтения записи,
+        поэтому одновременные добавления не теряются
 
         @param user: объект пользователя
         @param product_id: id товара
         @param count: кол-во добавляемого товара
-        @return:
+        @return: True - товар добавлен / False - товар не найден
         """
         logger.debug(
             f"Добавление товара в корзину: user - {user.id}, id товара - {product_id}, кол-во: {count}"
         )
 
-        try:
-            product = Product.objects.get(id=product_id)
-            logger.info(f"Товар найден: {product.name}")
-
-        except ObjectDoesNotExist:
-            logger.error("Товар не найден")
-            return False
-
         if count == 0:
             logger.warning(
                 "Нельзя добавить 0 товаров в корзину, увеличение кол-ва на 1"
             )
             count = 1
 
-        if ProductsCartUserService.check_product(user=user, product_id=product_id):
-            logger.warning("Добавляемый товар уже есть в корзине пользователя")
-            ProductsCartUserService.change_quantity(
+        if count < 0:
+            return ProductsCartUserService.change_quantity(
                 user=user, product_id=product_id, count=count
             )
+
+        if ProductsCartUserService.redis_backend():
+            added = Product.objects.filter(id=product_id, deleted=False).exists()
+
+            if added:
+                RedisCartStorage.increment(
+                    user_id=user.id, product_id=product_id, count=count
+                )
+
         else:
-            Cart.objects.create(user=user, product=product, count=count)
+            added = ProductsCartUserService.upsert(
+                user=user, product_id=product_id, count=count
+            )
+
+        if not added:
+            logger.error("Товар не найден")
+            return False
+
+        logger.info(f"Товар добавлен в корзину: id - {product_id}, кол-во: {count}")
 
-        # Очистка кэша с товарами в корзине пользователя
-        cache.delete(f"cart_{user.id}")
+        # Очистка кэша с товарами и итогами корзины пользователя
+        ProductsCartUserService.clear_cache(user_id=user.id)
 
         return True
 
+    @classmethod
+    def upsert(cls, user: User, product_id: int, count: int) -> bool:
+        """
+        Метод для добавления товара в таблицу корзины одним запросом (INSERT ... ON CONFLICT)
+
+        @param user: объект пользователя
+        @param product_id: id товара
+        @param count: кол-во добавляемого товара (> 0)
+        @return: True - товар добавлен / False - товар не найден (или удален)
+        """
+        # INSERT ... SELECT не создает запись, если товара нет в БД или он удален (как и при слиянии корзин);
+        # при конфликте по (user, product) кол-во увеличивается в той же команде
+        quote = connection.ops.quote_name
+        table = quote(Cart._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({quote('user_id')}, {quote('product_id')}, {quote('count')}) "
+                f"SELECT %s, {quote('id')}, %s FROM {quote(Product._meta.db_table)} "
+                f"WHERE {quote('id')} = %s AND {quote('deleted')} = %s "
+                f"ON CONFLICT ({quote('user_id')}, {quote('product_id')}) "
+                f"DO UPDATE SET {quote('count')} = {table}.{quote('count')} + EXCLUDED.{quote('count')}",
+                [user.id, count, product_id, False],
+            )
+            return cursor.rowcount > 0
+
+    @classmethod
+    def merge(cls, user: User, items: Dict[int, int]) -> int:
+        """
+        Метод для добавления в корзину пользователя товаров из корзины гостя (при авторизации и регистрации).
+        Товары и записи корзины загружаются двумя запросами (IN), кол-во суммируется в памяти,
+        записи сохраняются одним запросом (INSERT ... ON CONFLICT DO UPDATE).
+        Несуществующие и удаленные товары пропускаются.
+
+        @param user: объект пользователя
+        @param items: словарь: id товара - кол-во
+        @return: кол-во добавленных позиций
+        """
+        product_ids = set(
+            Product.objects.filter(id__in=items, deleted=False).values_list(
+                "id", flat=True
+            )
+        )
+        items = {
+            product_id: count
+            for product_id, count in items.items()
+            if product_id in product_ids and count > 0
+        }
+
+        if not items:
+            logger.warning("Товары корзины гостя не найдены")
+            return 0
+
+        if ProductsCartUserService.redis_backend():
+            for product_id, count in items.items():
+                RedisCartStorage.increment(
+                    user_id=user.id, product_id=product_id, count=count
+                )
+
+        else:
+            with transaction.atomic():
+                # Блокировка записей, чтобы параллельные изменения не потерялись
+                existing = dict(
+                    Cart.objects.select_for_update()
+                    .filter(user=user, product_id__in=items)
+                    .values_list("product_id", "count")
+                )
+                Cart.objects.bulk_create(
+                    [
+                        Cart(
+                            user=user,
+                            product_id=product_id,
+                            count=existing.get(product_id, 0) + count,
+                        )
+                        for product_id, count in items.items()
+                    ],
+                    update_conflicts=True,
+                    # Имена столбцов: Django 4.1 подставляет unique_fields в ON CONFLICT без преобразования
+                    unique_fields=["user_id", "product_id"],
+                    update_fields=["count"],
+                )
+
+        logger.info(f"Товары корзины гостя добавлены в корзину пользователя: {items}")
+        ProductsCartUserService.clear_cache(user_id=user.id)
+
+        return len(items)
+
     @classmethod
     def remove(cls, user: User, product_id: int) -> None:
         """
@@ -70,45 +193,112 @@ class ProductsCartUserService:
         """
         logger.debug(f"Удаление товара из корзины: user - {user.id}, id - {product_id}")
 
-        Cart.objects.filter(user=user, product__id=product_id).delete()
+        if ProductsCartUserService.redis_backend():
+            RedisCartStorage.remove(user_id=user.id, product_id=product_id)
+        else:
+            Cart.objects.filter(user=user, product_id=product_id).delete()
 
-        # Очистка кэша с товарами в корзине пользователя
-        cache.delete(f"cart_{user.id}")
+        # Очистка кэша с товарами и итогами корзины пользователя
+        ProductsCartUserService.clear_cache(user_id=user.id)
 
     @classmethod
-    def change_quantity(cls, user: User, product_id: int, count: int) -> None:
+    def change_quantity(cls, user: User, product_id: int, count: int) -> bool:
         """
-        Метод для изменения кол-во товара в корзине пользователя
+        Метод для изменения кол-ва товара в корзине пользователя атомарным UPDATE (count = count + n).
+        Если кол-во становится меньше или равно 0, запись удаляется.
 
         @param user: объект пользователя
         @param product_id: id товара
         @param count: кол-во товара (может быть > 0 / < 0)
-        @return: None
+        @return: True - кол-во изменено / False - товара нет в корзине (или он удален)
         """
         logger.debug(
             f"Изменение кол-ва товара в корзине: пользователь - {user.id}, id товара - {product_id}, изменить на - {count}"
         )
 
-        record = Cart.objects.get(user=user, product__id=product_id)
-        record.count += count
-
-        if record.count <= 0:
-            logger.warning(
-                "Кол-во товара меньше или равно 0. Удаление товара из корзины"
+        if ProductsCartUserService.redis_backend():
+            changed = RedisCartStorage.increment(
+                user_id=user.id, product_id=product_id, count=count, existing=True
             )
-            ProductsCartUserService.remove(user=user, product_id=product_id)
 
         else:
-            record.save(update_fields=["count"])
-            logger.info(f"Товар: id - {product_id}, кол-во: {record.count}")
+            changed, deleted = ProductsCartUserService.update_or_delete(
+                user=user, product_id=product_id, count=count
+            )
+
+            if deleted:
+                logger.warning(
+                    "Кол-во товара меньше или равно 0. Удаление товара из корзины"
+                )
+
+        logger.info(f"Товар: id - {product_id}, кол-во изменено на {count}")
+
+        # Очистка кэша с товарами и итогами корзины пользователя
+        ProductsCartUserService.clear_cache(user_id=user.id)
 
-        # Очистка кэша с товарами в корзине пользователя
-        cache.delete(f"cart_{user.id}")
+        return bool(changed)
+
+    @classmethod
+    def update_or_delete(
+        cls, user: User, product_id: int, count: int
+    ) -> Tuple[int, int]:
+        """
+        Метод для изменения кол-ва товара в таблице корзины: запись обновляется, если кол-во остается больше 0,
+        иначе удаляется. Условия взаимоисключающие и проверяются СУБД по текущему значению записи,
+        поэтому одновременные изменения не теряются и запись с увеличенным другим запросом кол-вом не удаляется.
+        В PostgreSQL - одна команда (DELETE в WITH и UPDATE), в остальных СУБД - UPDATE и, если запись
+        не обновлена, DELETE.
+
+        @param user: объект пользователя
+        @param product_id: id товара
+        @param count: кол-во товара (может быть > 0 / < 0)
+        @return: кол-во обновленных и удаленных записей
+        """
+        records = Cart.objects.filter(user=user, product_id=product_id)
+
+        # Оба условия не выполняются, только если запись одновременно изменил другой запрос - повтор
+        for _ in range(3):
+            if connection.vendor == "postgresql":
+                quote = connection.ops.quote_name
+                table = quote(Cart._meta.db_table)
+                where = f"{quote('user_id')} = %s AND {quote('product_id')} = %s"
+
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"WITH deleted AS (DELETE FROM {table} WHERE {where} AND {quote('count')} <= %s RETURNING 1), "
+                        f"updated AS (UPDATE {table} SET {quote('count')} = {quote('count')} + %s "
+                        f"WHERE {where} AND {quote('count')} > %s RETURNING 1) "
+                        f"SELECT (SELECT COUNT(*) FROM updated), (SELECT COUNT(*) FROM deleted)",
+                        [
+                            user.id,
+                            product_id,
+                            -count,
+                            count,
+                            user.id,
+                            product_id,
+                            -count,
+                        ],
+                    )
+                    changed, deleted = cursor.fetchone()
+
+            else:
+                changed = records.filter(count__gt=-count).update(
+                    count=F("count") + count
+                )
+                deleted = 0
+
+                if not changed and count < 0:
+                    deleted, _ = records.filter(count__lte=-count).delete()
+
+            if changed or deleted or not records.exists():
+                return changed, deleted
+
+        return 0, 0
 
     @classmethod
     def reduce_product(cls, user: User, product_id: int) -> None:
         """
-        Метод для уменьшения кол-ва товара на 1
+        Метод для уменьшения кол-ва товара на 1 (при кол-ве 1 товар удаляется из корзины)
 
         @param user: объект пользователя
         @param product_id: id товара
@@ -117,19 +307,9 @@ class ProductsCartUserService:
         logger.debug(
             f"Уменьшение товара в корзине пользователя на 1: id товара - {product_id}"
         )
-
-        record = Cart.objects.get(user=user, product__id=product_id)
-        record.count -= 1
-
-        if record.count > 0:
-            record.save(update_fields=["count"])
-
-        else:
-            logger.warning("Кол-во товара уменьшено до 0. Удаление товара из корзины")
-            ProductsCartUserService.remove(user=user, product_id=product_id)
-
-        # Очистка кэша с товарами в корзине пользователя
-        cache.delete(f"cart_{user.id}")
+        ProductsCartUserService.change_quantity(
+            user=user, product_id=product_id, count=-1
+        )
 
     @classmethod
     def increase_product(cls, user: User, product_id: int) -> None:
@@ -143,13 +323,9 @@ class ProductsCartUserService:
         logger.debug(
             f"Увеличение товара в корзине пользователя на 1: id товара - {product_id}"
         )
-
-        record = Cart.objects.get(user=user, product__id=product_id)
-        record.count += 1
-        record.save(update_fields=["count"])
-
-        # Очистка кэша с товарами в корзине пользователя
-        cache.delete(f"cart_{user.id}")
+        ProductsCartUserService.change_quantity(
+            user=user, product_id=product_id, count=1
+        )
 
     @classmethod
     def check_product(cls, user: User, product_id: int) -> bool:
@@ -162,49 +338,93 @@ class ProductsCartUserService:
         """
         logger.debug("Проверка товара в корзине текущего пользователя")
 
-        try:
-            Cart.objects.get(user=user, product__id=product_id)
-            logger.debug("Товар есть в корзине")
-            return True
+        if ProductsCartUserService.redis_backend():
+            return product_id in RedisCartStorage.items(user_id=user.id)
 
-        except ObjectDoesNotExist:
-            logger.debug("Товара нет в корзине")
-            return False
+        return Cart.objects.filter(user=user, product_id=product_id).exists()
 
     @classmethod
-    def all(cls, user: User) -> QuerySet:
+    def all(cls, user: User, durable: bool = False) -> List[Cart]:
         """
         Метод для вывода всех товаров в корзине текущего пользователя
 
         @param user: объект пользователя
-        @return: QuerySet с товарами в корзине пользователя
+        @param durable: True - записи из БД без кэша (для оформления заказа)
+        @return: список с товарами в корзине пользователя
         """
         logger.debug(f"Вывод товаров из корзины покупателя")
 
-        products = cache.get_or_set(
-            f"cart_{user.id}",
-            Cart.objects.select_related("product")
-            .only(
-                "id",
-                "count",
-                "product__id",
-                "product__name",
-                "product__definition",
-                "product__price",
-                "product__discount",
+        if durable:
+            return list(
+                Cart.objects.select_related("product").filter(user=user).order_by("id")
             )
-            .filter(user=user),
-            60 * config.caching_time,
+
+        if ProductsCartUserService.redis_backend():
+            loader = lambda: ProductsCartUserService.from_redis(user=user)
+        else:
+            loader = lambda: (
+                Cart.objects.select_related("product__primary_image")
+                .only(*cls._FIELDS)
+                .filter(user=user)
+            )
+
+        config = get_config()
+        products = CachedQueryService.get_or_load(
+            key=f"cart_{user.id}",
+            loader=loader,
+            timeout=60 * config.caching_time,
         )
 
         return products
 
     @classmethod
-    def total_cost(cls, products: QuerySet) -> int:
+    def from_redis(cls, user: User) -> List[Cart]:
+        """
+        Метод возвращает записи корзины (без сохранения в БД) по товарам из Redis
+
+        @param user: объект пользователя
+        @return: список с товарами в корзине пользователя
+        """
+        items = RedisCartStorage.items(user_id=user.id)
+        products = (
+            Product.objects.select_related("primary_image")
+            .only(*(field.split("__", 1)[1] for field in cls._FIELDS[2:]))
+            .in_bulk(items)
+        )
+
+        return [
+            Cart(user_id=user.id, product=products[product_id], count=count)
+            for product_id, count in items.items()
+            if product_id in products
+        ]
+
+    @classmethod
+    def flush(cls, user: User) -> None:
+        """
+        Метод для записи корзины пользователя из Redis в БД (перед оформлением заказа)
+
+        @param user: объект пользователя
+        @return: None
+        """
+        if ProductsCartUserService.redis_backend():
+            RedisCartStorage.flush(user_ids=[user.id])
+
+    @classmethod
+    def clear_cache(cls, user_id: int) -> None:
+        """
+        Метод для очистки кэша с товарами и итогами корзины пользователя
+
+        @param user_id: id пользователя
+        @return: None
+        """
+        cache.delete_many([f"cart_{user_id}", f"cart_summary_{user_id}"])
+
+    @classmethod
+    def total_cost(cls, products: List[Cart]) -> int:
         """
         Метод для возврата общей стоимости товаров в корзине пользователя
 
-        @param products: QuerySet с товарами
+        @param products: список с товарами
         @return: число - общая стоимость товаров
         """
         logger.debug("Подсчет общей стоимости товаров в корзине")
@@ -223,4 +443,9 @@ class ProductsCartUserService:
         logger.debug("Запуск сервиса по очистке корзины")
 
         Cart.objects.filter(user=user).delete()
-        cache.delete(f"cart_{user.id}")
+
+        if ProductsCartUserService.redis_backend():
+            # Корзина удаляется из Redis только после фиксации заказа
+            transaction.on_commit(lambda: RedisCartStorage.clear(user_id=user.id))
+
+        ProductsCartUserService.clear_cache(user_id=user.id)
@@ -0,0 +1,183 @@
+import logging
+import uuid
+
+from typing import Dict, Union
+from django.conf import settings
+from django.core import signing
+from django.http import HttpRequest, HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+
+class GuestCart:
+    """
+    Корзина гостя в подписанной cookie (без сессии и запросов к БД): {"id": идентификатор корзины, "items": {id товара: кол-во}}.
+    Cookie читается при первом обращении к корзине в запросе, а записывается в ответ один раз (GuestCartMiddleware)
+    и только если корзина изменилась, поэтому несколько изменений за запрос дают одну запись.
+    Идентификатор корзины используется в ключах кэша вместо ключа сессии.
+    """
+
+    _SALT = "app_shop.guest_cart"
+
+    def __init__(self, request: HttpRequest):
+        self.request = request
+        self.modified = False
+        self._data = None
+
+    @classmethod
+    def of(cls, request: HttpRequest) -> "GuestCart":
+        """
+        Метод возвращает корзину гостя для запроса (создается один раз за запрос)
+        """
+        cart = getattr(request, "guest_cart", None)
+
+        if cart is None:
+            cart = request.guest_cart = cls(request)
+
+        return cart
+
+    @property
+    def data(self) -> Dict:
+        if self._data is None:
+            self._data = self.load()
+
+        return self._data
+
+    @property
+    def items(self) -> Dict[str, int]:
+        """
+        Товары в корзине: id товара (строка) - кол-во
+        """
+        return self.data["items"]
+
+    @property
+    def token(self) -> str:
+        """
+        Идентификатор корзины (создается вместе с первым товаром, у пустой корзины - пустая строка)
+        """
+        return self.data["id"]
+
+    def load(self) -> Dict:
+        """
+        Метод для чтения корзины из cookie (при ошибке подписи или истекшем сроке корзина пустая)
+        """
+        value = self.request.COOKIES.get(settings.GUEST_CART_COOKIE_NAME)
+
+        if value:
+            try:
+                data = signing.loads(
+                    value, salt=self._SALT, max_age=settings.SESSION_COOKIE_AGE
+                )
+
+                return {"id": str(data["id"]), "items": dict(data["items"])}
+
+            except (signing.BadSignature, KeyError, TypeError, ValueError):
+                logger.warning("Некорректная cookie корзины гостя, корзина очищена")
+                self.modified = True
+
+        items = self.from_session()
+
+        return {"id": uuid.uuid4().hex if items else "", "items": items}
+
+    def from_session(self) -> Dict[str, int]:
+        """
+        Метод для переноса корзины, сохраненной в сессии до перехода на cookie
+        (сессия читается, только если у гостя есть cookie сессии)
+        """
+        session = getattr(self.request, "session", None)
+
+        if session is None or settings.SESSION_COOKIE_NAME not in self.request.COOKIES:
+            return {}
+
+        items = session.pop("cart", None)
+
+        if not items:
+            return {}
+
+        logger.info("Корзина гостя перенесена из сессии в cookie")
+        self.modified = True
+
+        return dict(items)
+
+    def get(self, product_id: Union[int, str]) -> int:
+        return self.items.get(str(product_id), 0)
+
+    def set(self, product_id: Union[int, str], count: int) -> bool:
+        """
+        Метод для изменения кол-ва товара (при кол-ве <= 0 товар удаляется)
+
+        @param product_id: id товара
+        @param count: новое кол-во товара
+        @return: True - корзина изменена / False - превышено кол-во позиций в корзине
+        """
+        product_id = str(product_id)
+
+        if count <= 0:
+            return self.remove(product_id)
+
+        if (
+            product_id not in self.items
+            and len(self.items) >= settings.GUEST_CART_MAX_POSITIONS
+        ):
+            logger.warning("Превышено кол-во позиций в корзине гостя")
+            return False
+
+        if self.items.get(product_id) != count:
+            self.items[product_id] = count
+            self.data["id"] = self.data["id"] or uuid.uuid4().hex
+            self.modified = True
+
+        return True
+
+    def remove(self, product_id: Union[int, str]) -> bool:
+        if self.items.pop(str(product_id), None) is None:
+            return False
+
+        self.modified = True
+
+        return True
+
+    def clear(self) -> None:
+        if self.items:
+            self.items.clear()
+            self.modified = True
+
+    def save(self, response: HttpResponse) -> None:
+        """
+        Метод для записи корзины в cookie ответа (пустая корзина удаляет cookie)
+        """
+        if not self.modified:
+            return
+
+        if not self.items:
+            response.delete_cookie(settings.GUEST_CART_COOKIE_NAME)
+            return
+
+        response.set_cookie(
+            settings.GUEST_CART_COOKIE_NAME,
+            signing.dumps(self.data, salt=self._SALT, compress=True),
+            max_age=settings.SESSION_COOKIE_AGE,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite="Lax",
+        )
+        self.modified = False
+
+
+class GuestCartMiddleware:
+    """
+    Middleware для записи измененной корзины гостя в cookie ответа (один раз за запрос)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        cart = getattr(request, "guest_cart", None)
+
+        if cart is not None:
+            cart.save(response)
+
+        return response
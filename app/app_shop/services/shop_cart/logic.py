@@ -5,9 +5,8 @@ from django.db.models import QuerySet
 from django.http import HttpRequest
 from django.contrib.auth.models import User
 
-from app.app_shop.models.products import Product
-from app.app_shop.models.cart_and_orders import Cart
 from app.app_shop.services.shop_cart.authenticated import ProductsCartUserService
+from app.app_shop.services.shop_cart.guest_storage import GuestCart
 from app.app_shop.services.shop_cart.quest import ProductsCartQuestService
 
 
@@ -63,11 +62,7 @@ class CartProductsListService:
 
         else:
             logger.debug("Пользователь не авторизован")
-            records = request.session.get("cart", False)
-
-            if records:
-                logger.debug("В объекте сессии имеются данные о товарах")
-                id_list = list(map(int, records.keys()))
+            id_list = list(map(int, GuestCart.of(request).items))
 
         logger.info(f"Список с id товаров: {id_list}")
 
@@ -108,7 +103,7 @@ class CartProductsService:
             )
 
         else:
-            # Добавление товара в корзину гостя (запись в объект сессии)
+            # Добавление товара в корзину гостя (cookie)
             res = ProductsCartQuestService.add(
                 request=request, product_id=str(product_id), count=count
             )
@@ -184,7 +179,7 @@ class CartProductsService:
             # Удаление товара из корзины зарегистрированного пользователя
             ProductsCartUserService.remove(user=request.user, product_id=product_id)
         else:
-            # Удаление товара из корзины гостя (объект сессии)
+            # Удаление товара из корзины гостя (cookie)
             ProductsCartQuestService.remove(request=request, product_id=product_id)
 
     @classmethod
@@ -198,50 +193,24 @@ class CartProductsService:
         """
         logger.debug("Слияние корзин при регистрации/авторизации пользователя")
 
-        records = request.session.get("cart", False)
-        new_records = []
-
-        if records:
-            logger.debug(f"Имеются данные для слияния: {records}")
-
-            for prod_id, count in records.items():
-                logger.debug(f"Поиск товара в БД по id - {prod_id}")
-                product = Product.objects.get(id=prod_id)
-                logger.debug(f"Товар найден: {product.name}")
-
-                # Проверка, есть ли товар уже в корзине зарегистрированного пользователя
-                deferred_product = Cart.objects.filter(
-                    user=user, product=product
-                ).first()
-
-                if deferred_product:
-                    logger.warning(
-                        f"Товар уже есть в корзине: id - {deferred_product.id}, "
-                        f"{deferred_product.count} шт., суммирование кол-ва"
-                    )
+        guest_cart = GuestCart.of(request)
+        items = {}
 
-                    deferred_product.count += count  # Суммируем кол-во товара
-                    deferred_product.save(update_fields=["count"])
+        for prod_id, count in guest_cart.items.items():
+            try:
+                items[int(prod_id)] = int(count)
 
-                else:
-                    logger.info(
-                        f"Добавление нового товара: {product.name}, {count} шт."
-                    )
+            except (TypeError, ValueError):
+                logger.warning(f"Некорректная запись корзины гостя: {prod_id}")
 
-                    new_records.append(
-                        Cart(
-                            user=user,
-                            product=Product.objects.get(id=prod_id),
-                            count=count,
-                        )
-                    )
-
-            Cart.objects.bulk_create(new_records)
-            logger.info("Данные успешно записаны в БД")
+        if not items:
+            logger.warning("Нет записей для слияния")
+            return
 
-            del request.session["cart"]  # Удаляем записи из сессии
-            request.session.save()
-            logger.info("Объект сессии успешно очищен")
+        logger.debug(f"Имеются данные для слияния: {items}")
+        ProductsCartUserService.merge(user=user, items=items)
 
-        else:
-            logger.warning("Нет записей для слияния")
+        # Очистка корзины гостя (cookie удаляется в ответе)
+        ProductsCartQuestService.clear_cache_cart(request=request)
+        guest_cart.clear()
+        logger.info("Корзина гостя очищена")
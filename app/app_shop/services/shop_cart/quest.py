@@ -1,12 +1,13 @@
 import logging
 
-from django.db.models import QuerySet
+from typing import List
 from django.http import HttpRequest
 from django.core.cache import cache
 
-from app.config.admin import config
+from app.config.utils.configuration import get_config
 from app.app_shop.models.products import Product
 from app.app_shop.models.cart_and_orders import Cart
+from app.app_shop.services.shop_cart.guest_storage import GuestCart
 
 
 logger = logging.getLogger(__name__)
@@ -14,13 +15,14 @@ logger = logging.getLogger(__name__)
 
 class ProductsCartQuestService:
     """
-    Сервис для добавления, изменения и удаления товаров в корзине неавторизованного пользователя (session)
+    Сервис для добавления, изменения и удаления товаров в корзине неавторизованного пользователя
+    (подписанная cookie, см. GuestCart - без записи сессии в БД)
     """
 
     @classmethod
     def add(cls, request: HttpRequest, product_id: str, count: int = 1) -> bool:
         """
-        Метод для добавления товара в корзину пользователя (объект сессии)
+        Метод для добавления товара в корзину гостя
 
         @param request: объект http-запроса
         @param product_id: id товара
@@ -28,62 +30,54 @@ class ProductsCartQuestService:
         @return: bool-значение
         """
         logger.debug(
-            f"Добавление товара в корзину гостя: id пользователя: "
-            f"{request.user.id}, id товара - {product_id}, кол-во: {count}"
+            f"Добавление товара в корзину гостя: id товара - {product_id}, кол-во: {count}"
         )
 
-        ProductsCartQuestService.check_key(
-            request=request
-        )  # Проверка / создание ключа "cart" в объекте сессии
-
         if count == 0:
             logger.warning("Нельзя добавить 0 товаров, увеличение кол-ва на 1")
             count = 1
 
-        logger.debug(f'Корзина ДО: {request.session["cart"]}')
-        record = request.session["cart"].get(product_id, False)
+        cart = GuestCart.of(request)
+
+        if not cart.get(product_id) and count > 0:
+            if not Product.objects.filter(id=product_id).exists():
+                logger.error("Товар не найден")
+                return False
 
-        if record:
-            logger.warning("Товар уже есть в корзине, увеличение кол-ва")
-            request.session["cart"][product_id] += count
-        else:
             logger.info("Добавление нового товара")
-            request.session["cart"][product_id] = count
 
-        request.session.save()
-        logger.debug(f'Корзина ПОСЛЕ: {request.session["cart"]}')
+        res = cart.set(product_id=product_id, count=cart.get(product_id) + count)
+        logger.debug(f"Корзина ПОСЛЕ: {cart.items}")
 
         # Очистка кэша с товарами корзины
         cls.clear_cache_cart(request=request)
 
-        return True
+        return res
 
     @classmethod
     def remove(cls, request: HttpRequest, product_id: int) -> None:
         """
-        Метод для удаления товара из корзины (объекта сессии)
+        Метод для удаления товара из корзины гостя
 
         @param request: объект http-запроса
         @param product_id: id товара
         @return: None
         """
-        logger.debug(f"Удаление товара из объекта сессии: id товара - {product_id}")
+        logger.debug(f"Удаление товара из корзины гостя: id товара - {product_id}")
 
-        try:
-            del request.session["cart"][product_id]
-            request.session.save()
-            logger.info("Товар удален из объекта сессии")
+        if GuestCart.of(request).remove(product_id):
+            logger.info("Товар удален из корзины гостя")
 
             # Очистка кэша с товарами корзины
             cls.clear_cache_cart(request=request)
 
-        except KeyError:
-            logger.warning(f'Не найден ключ "cart" в объекте сессии гостя')
+        else:
+            logger.warning(f"Товар не найден в корзине гостя")
 
     @classmethod
     def reduce_product(cls, request: HttpRequest, product_id: int) -> None:
         """
-        Метод для уменьшения кол-ва товара на 1 (в объекте сессии)
+        Метод для уменьшения кол-ва товара на 1 (при кол-ве 1 товар удаляется из корзины)
 
         @param request: объект http-запроса
         @param product_id: id товара
@@ -91,16 +85,8 @@ class ProductsCartQuestService:
         """
         logger.debug(f"Уменьшение товара на 1: id товара - {product_id}")
 
-        product_id = str(product_id)
-        count = request.session["cart"][product_id]
-        count -= 1
-
-        if count <= 0:
-            logger.warning("Кол-во товара уменьшено до 0. Удаление товара из корзины")
-            ProductsCartQuestService.remove(request=request, product_id=product_id)
-        else:
-            request.session["cart"][product_id] = count
-            request.session.save()
+        cart = GuestCart.of(request)
+        cart.set(product_id=product_id, count=cart.get(product_id) - 1)
 
         # Очистка кэша с товарами корзины
         cls.clear_cache_cart(request=request)
@@ -108,7 +94,7 @@ class ProductsCartQuestService:
     @classmethod
     def increase_product(cls, request: HttpRequest, product_id: int) -> None:
         """
-        Метод для увеличения кол-ва товара на 1 (в объекте сессии)
+        Метод для увеличения кол-ва товара на 1 (только для товара в корзине)
 
         @param request: объект http-запроса
         @param product_id: id товара
@@ -116,87 +102,74 @@ class ProductsCartQuestService:
         """
         logger.debug(f"Увеличение товара на 1: id товара - {product_id}")
 
-        product_id = str(product_id)
-        count = request.session["cart"][product_id]
-        count += 1
+        cart = GuestCart.of(request)
+        count = cart.get(product_id)
 
-        request.session["cart"][product_id] = count
-        request.session.save()
+        if count:
+            cart.set(product_id=product_id, count=count + 1)
 
-        # Очистка кэша с товарами корзины
-        cls.clear_cache_cart(request=request)
-
-    @classmethod
-    def check_key(cls, request: HttpRequest) -> None:
-        """
-        Метод для проверки ключа в объекте сессии (создание при необходимости) для записи, чтения и удаления товаров
-
-        @param request: объект http-запроса
-        @return: None
-        """
-        logger.debug('Проверка ключа "cart" в объекте сессии текущего пользователя')
-
-        if not request.session.get("cart", False):
-            logger.warning("Ключ не найден, создание ключа")
-            request.session["cart"] = {}
+            # Очистка кэша с товарами корзины
+            cls.clear_cache_cart(request=request)
 
     @classmethod
-    def all(cls, request: HttpRequest) -> QuerySet:
+    def all(cls, request: HttpRequest) -> List[Cart]:
         """
-        Метод для вывода всех товаров в корзине текущего пользователя (объекте сессии)
+        Метод для вывода всех товаров в корзине гостя (товары загружаются одним запросом и кэшируются)
 
         @param request: объект http-запроса
-        @return: QuerySet с товарами
+        @return: список с товарами
         """
-        logger.debug(f"Вывод товаров корзины гостя: {request.user}")
-
-        records_list = []
-        session_key = request.session.session_key
-        cart_cache_key = f"cart_{session_key}"
-
-        if cart_cache_key not in cache:
-            logger.warning("В кэше для текущей сессии нет данных о товарах в корзине")
-            products = request.session.get("cart", False)
-
-            if products:
-                logger.debug(f"Записи о товарах в текущей сессии гостя: {products}")
-
-                for prod_id, count in products.items():
-                    records_list.append(
-                        Cart(
-                            product=Product.objects.only(
-                                "id", "name", "definition", "price", "discount"
-                            ).get(id=prod_id),
-                            count=count,
-                        )
-                    )
-
-                cache.set(cart_cache_key, records_list, 60 * config.caching_time)
-                logger.info("Товары сохранены в кэш")
-
-            else:
-                logger.warning("Записи о товарах не найдены")
-        else:
-            records_list = cache.get(cart_cache_key)
+        logger.debug("Вывод товаров корзины гостя")
+
+        cart = GuestCart.of(request)
+
+        if not cart.items:
+            logger.debug("Корзина гостя пустая")
+            return []
+
+        cart_cache_key = f"cart_{cart.token}"
+        records_list = cache.get(cart_cache_key)
+
+        if records_list is None:
+            logger.warning("В кэше нет данных о товарах в корзине гостя")
+
+            products = (
+                Product.objects.select_related("primary_image")
+                .only(
+                    "id",
+                    "name",
+                    "definition",
+                    "price",
+                    "discount",
+                    "primary_image__title",
+                    "primary_image__image",
+                    "primary_image__image_renditions",
+                )
+                .in_bulk(map(int, cart.items))
+            )
+            records_list = [
+                Cart(product=products[int(prod_id)], count=count)
+                for prod_id, count in cart.items.items()
+                if int(prod_id) in products
+            ]
+
+            config = get_config()
+            cache.set(cart_cache_key, records_list, 60 * config.caching_time)
+            logger.info("Товары сохранены в кэш")
 
         return records_list
 
     @classmethod
     def clear_cache_cart(cls, request: HttpRequest) -> None:
         """
-        Метод для очистки кэша с товарами в корзине
+        Метод для очистки кэша с товарами и итогами корзины гостя
 
         @param request: объект http-запроса
         @return: None
         """
         logger.debug("Очистка кэша с товарами в корзине")
 
-        session_key = request.session.session_key
-        cart_cache_key = f"cart_{session_key}"
+        token = GuestCart.of(request).token
 
-        res = cache.delete(cart_cache_key)
-
-        if res:
-            logger.info("Кэш с товарами успешно очищен")
-        else:
-            logger.error("Кэш с товарами не очищен")
+        if token:
+            cache.delete_many([f"cart_{token}", f"cart_summary_{token}"])
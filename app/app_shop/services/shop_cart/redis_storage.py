@@ -0,0 +1,289 @@
+import logging
+
+from typing import Dict, Iterable, Union
+from django.conf import settings
+from django.db import transaction
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.app_shop.models.products import Product
+from app.app_shop.models.cart_and_orders import Cart
+
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCartStorage:
+    """
+    Хранилище корзин авторизованных пользователей в Redis с отложенной записью в БД (write-behind).
+    Корзина - хэш "cart:<id пользователя>" (id товара - кол-во), при первом обращении заполняется из таблицы Cart.
+    Измененные корзины отмечаются в множестве "cart:dirty" и записываются в БД фоновой задачей flush_carts
+    (Celery beat) и перед оформлением заказа, поэтому заказ всегда создается по данным из БД.
+    """
+
+    _DIRTY = "cart:dirty"
+    # Служебное поле хэша: корзина загружена из БД (в т.ч. пустая корзина)
+    _LOADED = "_"
+    # Время хранения корзины в Redis после последнего изменения (сек)
+    _TTL = 30 * 24 * 60 * 60
+
+    # Заполнение корзины данными из БД, только если корзина еще не загружена в Redis (поле "_" - _LOADED)
+    _LOAD_SCRIPT = """
+    if redis.call('HEXISTS', KEYS[1], '_') == 1 then
+        return 0
+    end
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+    return 1
+    """
+
+    # Изменение кол-ва товара: при кол-ве <= 0 товар удаляется, корзина отмечается как измененная.
+    # Если корзина истекла после загрузки - nil (HINCRBY создал бы хэш без товаров из БД).
+    # ARGV: id товара, изменение кол-ва, id пользователя, время хранения, 1 - только товар из корзины
+    _INCREMENT_SCRIPT = """
+    if redis.call('HEXISTS', KEYS[1], '_') == 0 then
+        return false
+    end
+    if ARGV[5] == '1' and redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+        return 0
+    end
+    local count = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+    if count <= 0 then
+        redis.call('HDEL', KEYS[1], ARGV[1])
+    end
+    redis.call('SADD', KEYS[2], ARGV[3])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    return count
+    """
+
+    # Удаление товара из загруженной корзины. ARGV: id товара, id пользователя
+    _REMOVE_SCRIPT = """
+    if redis.call('HEXISTS', KEYS[1], '_') == 0 then
+        return false
+    end
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('SADD', KEYS[2], ARGV[2])
+    return 1
+    """
+
+    _ATTEMPTS = 3  # Кол-во попыток изменения корзины, если она истекла после загрузки
+
+    _client = None
+    _scripts = {}
+
+    @classmethod
+    def client(cls) -> Redis:
+        """
+        Метод возвращает клиент Redis (один пул соединений на процесс)
+        """
+        if cls._client is None:
+            cls._client = Redis.from_url(settings.CART_REDIS_URL, decode_responses=True)
+            cls._scripts = {
+                "load": cls._client.register_script(cls._LOAD_SCRIPT),
+                "increment": cls._client.register_script(cls._INCREMENT_SCRIPT),
+                "remove": cls._client.register_script(cls._REMOVE_SCRIPT),
+            }
+
+        return cls._client
+
+    @classmethod
+    def key(cls, user_id: int) -> str:
+        return f"cart:{user_id}"
+
+    @classmethod
+    def load(cls, user_id: int) -> None:
+        """
+        Метод для загрузки корзины пользователя из БД в Redis (если ее там еще нет)
+
+        @param user_id: id пользователя
+        @return: None
+        """
+        client = cls.client()
+
+        if client.hexists(cls.key(user_id), cls._LOADED):
+            return
+
+        logger.debug(f"Загрузка корзины пользователя из БД в Redis: id - {user_id}")
+
+        fields = [cls._LOADED, 1]
+
+        for product_id, count in Cart.objects.filter(user_id=user_id).values_list(
+            "product_id", "count"
+        ):
+            fields += [product_id, count]
+
+        cls._scripts["load"](keys=[cls.key(user_id)], args=[cls._TTL, *fields])
+
+    @classmethod
+    def items(cls, user_id: int) -> Dict[int, int]:
+        """
+        Метод возвращает товары в корзине пользователя
+
+        @param user_id: id пользователя
+        @return: словарь: id товара - кол-во
+        """
+        for _ in range(cls._ATTEMPTS):
+            cls.load(user_id)
+            data = cls.client().hgetall(cls.key(user_id))
+
+            # Корзина могла истечь между загрузкой и чтением
+            if cls._LOADED in data:
+                return cls.parse(data)
+
+        return dict(
+            Cart.objects.filter(user_id=user_id).values_list("product_id", "count")
+        )
+
+    @classmethod
+    def increment(
+        cls, user_id: int, product_id: int, count: int, existing: bool = False
+    ) -> int:
+        """
+        Метод для изменения кол-ва товара в корзине одной командой (товар удаляется при кол-ве <= 0)
+
+        @param user_id: id пользователя
+        @param product_id: id товара
+        @param count: изменение кол-ва (может быть > 0 / < 0)
+        @param existing: True - изменить кол-во, только если товар уже есть в корзине
+        @return: новое кол-во товара (0 - товара нет в корзине)
+        """
+        count = cls.run(
+            script="increment",
+            user_id=user_id,
+            args=[product_id, count, user_id, cls._TTL, int(existing)],
+        )
+
+        return max(int(count), 0)
+
+    @classmethod
+    def remove(cls, user_id: int, product_id: int) -> None:
+        """
+        Метод для удаления товара из корзины
+        """
+        cls.run(script="remove", user_id=user_id, args=[product_id, user_id])
+
+    @classmethod
+    def run(cls, script: str, user_id: int, args: list):
+        """
+        Метод выполняет скрипт изменения корзины, предварительно загрузив ее из БД.
+        Если корзина истекла между загрузкой и выполнением скрипта (скрипт вернул nil) - корзина загружается повторно.
+
+        @param script: название скрипта
+        @param user_id: id пользователя
+        @param args: аргументы скрипта
+        @return: результат скрипта
+        """
+        for _ in range(cls._ATTEMPTS):
+            cls.load(user_id)
+            result = cls._scripts[script](
+                keys=[cls.key(user_id), cls._DIRTY], args=args
+            )
+
+            if result is not None:
+                return result
+
+            logger.warning(
+                f"Корзина пользователя истекла в Redis до изменения: id - {user_id}"
+            )
+
+        raise RedisError(
+            f"Не удалось загрузить корзину пользователя в Redis: {user_id}"
+        )
+
+    @classmethod
+    def clear(cls, user_id: int) -> None:
+        """
+        Метод для удаления корзины из Redis (при следующем обращении корзина загружается из БД)
+        """
+        with cls.client().pipeline() as pipe:
+            pipe.delete(cls.key(user_id))
+            pipe.srem(cls._DIRTY, user_id)
+            pipe.execute()
+
+    @classmethod
+    def flush(cls, user_ids: Union[Iterable[int], None] = None) -> int:
+        """
+        Метод для записи измененных корзин из Redis в таблицу Cart.
+        Без списка пользователей записываются все корзины, отмеченные как измененные (отметка снимается
+        до чтения корзины, поэтому изменения во время записи попадут в следующий запуск).
+        Корзины переданных пользователей записываются без снятия отметки (например, перед оформлением заказа
+        внутри транзакции, которая может быть отменена).
+
+        @param user_ids: список id пользователей / None - все измененные корзины
+        @return: кол-во записанных корзин
+        """
+        client = cls.client()
+
+        if user_ids is not None:
+            return sum(cls.flush_user(user_id) for user_id in user_ids)
+
+        flushed = 0
+
+        while True:
+            user_ids = [int(user_id) for user_id in client.spop(cls._DIRTY, 500)]
+
+            if not user_ids:
+                break
+
+            for number, user_id in enumerate(user_ids):
+                try:
+                    flushed += cls.flush_user(user_id)
+
+                except Exception:
+                    # Незаписанные корзины снова отмечаются для следующего запуска
+                    client.sadd(cls._DIRTY, *user_ids[number:])
+                    raise
+
+        if flushed:
+            logger.info(f"Корзины записаны в БД: {flushed}")
+
+        return flushed
+
+    @classmethod
+    def flush_user(cls, user_id: int) -> int:
+        """
+        Метод для записи корзины пользователя из Redis в БД
+
+        @param user_id: id пользователя
+        @return: 1 - корзина записана / 0 - корзины нет в Redis
+        """
+        data = cls.client().hgetall(cls.key(user_id))
+
+        # Корзины нет в Redis (не загружалась или удалена) - данные в БД актуальны
+        if cls._LOADED not in data:
+            return 0
+
+        items = cls.parse(data)
+        # Товары, удаленные из БД, не записываются
+        product_ids = set(
+            Product.objects.filter(id__in=items).values_list("id", flat=True)
+        )
+
+        with transaction.atomic():
+            Cart.objects.filter(user_id=user_id).exclude(
+                product_id__in=product_ids
+            ).delete()
+            Cart.objects.bulk_create(
+                [
+                    Cart(user_id=user_id, product_id=product_id, count=count)
+                    for product_id, count in items.items()
+                    if product_id in product_ids
+                ],
+                update_conflicts=True,
+                # Имена столбцов: Django 4.1 подставляет unique_fields в ON CONFLICT без преобразования
+                unique_fields=["user_id", "product_id"],
+                update_fields=["count"],
+            )
+
+        return 1
+
+    @classmethod
+    def parse(cls, data: Dict[str, str]) -> Dict[int, int]:
+        """
+        Метод преобразует хэш корзины в словарь: id товара - кол-во (без служебного поля)
+        """
+        return {
+            int(product_id): int(count)
+            for product_id, count in data.items()
+            if product_id != cls._LOADED
+        }
@@ -0,0 +1,118 @@
+import logging
+
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from app.config.utils.configuration import get_config
+from app.app_shop.services.caching import CachedRow
+from app.app_shop.services.shop_cart.guest_storage import GuestCart
+from app.app_shop.services.shop_cart.logic import CartProductsListService
+
+
+logger = logging.getLogger(__name__)
+
+
+class CartSummary(CachedRow):
+    """
+    Итоги корзины текущего пользователя: кол-во товаров, стоимость без скидок, сумма скидок и стоимость со скидками
+    """
+
+    __slots__ = ("count", "positions", "subtotal", "discount_total", "total")
+
+    @classmethod
+    def from_object(cls, records) -> "CartSummary":
+        """
+        Метод для расчета итогов по записям корзины
+
+        @param records: список записей корзины (товар и его кол-во)
+        @return: итоги корзины
+        """
+        subtotal = sum(int(record.product.price * record.count) for record in records)
+        total = sum(record.position_cost for record in records)
+
+        return cls(
+            count=sum(record.count for record in records),
+            positions=len(records),
+            subtotal=subtotal,
+            discount_total=subtotal - total,
+            total=total,
+        )
+
+    @property
+    def free_shipping(self) -> bool:
+        """
+        Бесплатная обычная доставка (стоимость товаров больше минимальной стоимости заказа из настроек сайта)
+        """
+        return self.total > get_config().min_order_cost
+
+    @property
+    def free_shipping_left(self) -> int:
+        """
+        Сумма, которую нужно добавить в корзину для бесплатной доставки
+        """
+        return 0 if self.free_shipping else get_config().min_order_cost - self.total
+
+    @property
+    def free_shipping_progress(self) -> int:
+        """
+        Процент стоимости товаров от суммы для бесплатной доставки (0 - 100)
+        """
+        min_order_cost = get_config().min_order_cost
+
+        if self.free_shipping or min_order_cost <= 0:
+            return 100
+
+        return int(self.total * 100 / min_order_cost)
+
+
+class CartSummaryService:
+    """
+    Сервис для вывода итогов корзины: итоги рассчитываются один раз и хранятся в кэше рядом с товарами корзины
+    ("cart_summary_<id пользователя / идентификатор корзины гостя>"), кэш очищается при каждом изменении корзины.
+    В рамках запроса итоги запоминаются в объекте запроса.
+    """
+
+    _EMPTY = CartSummary(count=0, positions=0, subtotal=0, discount_total=0, total=0)
+
+    @classmethod
+    def get(cls, request: HttpRequest) -> CartSummary:
+        """
+        Метод возвращает итоги корзины текущего пользователя
+
+        @param request: объект http-запроса
+        @return: итоги корзины
+        """
+        summary = getattr(request, "_cart_summary", None)
+
+        if summary is None:
+            summary = request._cart_summary = cls.load(request=request)
+
+        return summary
+
+    @classmethod
+    def load(cls, request: HttpRequest) -> CartSummary:
+        """
+        Метод возвращает итоги корзины из кэша, при промахе рассчитывает их по товарам корзины
+        """
+        if request.user.is_authenticated:
+            owner = request.user.id
+
+        else:
+            owner = GuestCart.of(request).token
+
+            # Пустая корзина гостя (идентификатор создается вместе с первым товаром)
+            if not owner:
+                return cls._EMPTY
+
+        key = f"cart_summary_{owner}"
+        summary = cache.get(key)
+
+        if summary is None:
+            logger.debug(f"Расчет итогов корзины: {key}")
+
+            config = get_config()
+            records = CartProductsListService.all_products(request=request) or []
+            summary = CartSummary.from_object(list(records))
+            cache.set(key, summary, 60 * config.caching_time)
+
+        return summary
@@ -0,0 +1,272 @@
+import logging
+
+from datetime import timedelta
+from typing import Dict, Iterable, List, Union
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from app.app_shop.models.products import Product
+from app.app_shop.models.cart_and_orders import Order, StockReservation
+from app.app_shop.services.products.products_list.facets import ProductFacetService
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStockError(Exception):
+    """
+    Недостаточно товара на складе для оформления заказа
+    """
+
+    def __init__(self, products: List[Product]):
+        self.products = products
+        names = ", ".join(product.name for product in products)
+        super().__init__(f"Недостаточно товара на складе: {names}")
+
+
+class StockReservationService:
+    """
+    Сервис для резервирования товаров под заказ.
+    Кол-во товаров списывается со склада при оформлении заказа (строки товаров блокируются в порядке id,
+    поэтому параллельные заказы одних и тех же товаров не приводят к взаимной блокировке), резерв действует
+    settings.STOCK_RESERVATION_TIMEOUT сек. Если заказ не оплачен до окончания срока, товары возвращаются
+    на склад (задачи release_reservation и release_expired_reservations), при оплате резерв выкупается
+    и увеличивается кол-во покупок товаров.
+    """
+
+    @classmethod
+    def reserve(cls, order: Order, items: Dict[int, int]) -> List[StockReservation]:
+        """
+        Метод для списания товаров со склада и создания резервов (вызывается внутри транзакции заказа)
+
+        @param order: объект заказа
+        @param items: словарь: id товара - кол-во
+        @return: список резервов
+        @raise OutOfStockError: товара недостаточно на складе (ничего не списывается)
+        """
+        logger.debug(f"Резервирование товаров по заказу №{order.id}: {items}")
+
+        with transaction.atomic():
+            products = cls.lock(product_ids=items)
+            missing = [
+                product for product in products if product.count < items[product.id]
+            ]
+
+            if missing or len(products) != len(items):
+                logger.warning(f"Недостаточно товара на складе: заказ №{order.id}")
+                raise OutOfStockError(missing)
+
+            for product in products:
+                product.count -= items[product.id]
+                product.update_limited_edition()
+
+            Product.objects.bulk_update(products, fields=["count", "limited_edition"])
+
+            expires_at = timezone.now() + timedelta(
+                seconds=settings.STOCK_RESERVATION_TIMEOUT
+            )
+            reservations = StockReservation.objects.bulk_create(
+                [
+                    StockReservation(
+                        order=order,
+                        product_id=product_id,
+                        count=count,
+                        expires_at=expires_at,
+                    )
+                    for product_id, count in items.items()
+                ]
+            )
+
+            cls.clear_cache(product_ids=items)
+
+        logger.info(f"Товары зарезервированы по заказу №{order.id}")
+
+        return reservations
+
+    @classmethod
+    def ensure(cls, order: Order) -> bool:
+        """
+        Метод проверяет резерв заказа перед оплатой: срок действующего резерва (в т.ч. истекшего, но еще
+        не возвращенного на склад) продлевается, если резерв уже возвращен на склад - товары заказа
+        резервируются повторно. Строка заказа блокируется, поэтому возврат резерва не выполняется одновременно.
+        Резерв заказа, оплата которого уже начата или завершена, не меняется (повторный запуск оплаты).
+
+        @param order: объект заказа
+        @return: True - товары зарезервированы / False - товара недостаточно на складе или заказ не найден
+        """
+        with transaction.atomic():
+            status = cls.lock_order(order_id=order.id)
+
+            if status is None:
+                return False
+
+            if status not in (1, 2):
+                logger.info(
+                    f"Оплата заказа №{order.id} уже начата (статус {status}), резерв не меняется"
+                )
+                return True
+
+            extended = order.reservations.filter(status=1).update(
+                expires_at=timezone.now()
+                + timedelta(seconds=settings.STOCK_RESERVATION_TIMEOUT)
+            )
+
+            if extended:
+                return True
+
+            items = {}
+
+            for product_id, count in order.purchasedproduct_set.values_list(
+                "product_id", "count"
+            ):
+                items[product_id] = items.get(product_id, 0) + count
+
+            try:
+                cls.reserve(order=order, items=items)
+
+            except OutOfStockError:
+                return False
+
+        return True
+
+    @classmethod
+    def release(cls, order_id: int) -> int:
+        """
+        Метод для возврата просроченных резервов заказа на склад (повторный вызов ничего не меняет;
+        резервы заказов в оплате и оплаченных заказов не возвращаются)
+
+        @param order_id: id заказа
+        @return: кол-во возвращенных позиций
+        """
+        return cls.close(order_id=order_id, status=2)
+
+    @classmethod
+    def complete(cls, order_id: int) -> int:
+        """
+        Метод для выкупа резерва оплаченного заказа: увеличение кол-ва покупок товаров
+
+        @param order_id: id заказа
+        @return: кол-во выкупленных позиций
+        """
+        return cls.close(order_id=order_id, status=3)
+
+    @classmethod
+    def close(cls, order_id: int, status: int) -> int:
+        """
+        Метод для закрытия действующих резервов заказа: возврат на склад (2) или выкуп (3).
+        Перед возвратом на склад строка заказа блокируется и повторно проверяются статус заказа
+        и срок резерва (заказ мог перейти к оплате или резерв мог быть продлен после выборки просроченных резервов).
+        """
+        with transaction.atomic():
+            reservations = StockReservation.objects.select_for_update().filter(
+                order_id=order_id, status=1
+            )
+
+            if status == 2:
+                if cls.lock_order(order_id=order_id) in (3, 4, 5):
+                    return 0
+
+                reservations = reservations.filter(expires_at__lte=timezone.now())
+
+            reservations = list(reservations.order_by("product_id"))
+
+            if not reservations:
+                return 0
+
+            items = {}
+
+            for reservation in reservations:
+                items[reservation.product_id] = (
+                    items.get(reservation.product_id, 0) + reservation.count
+                )
+
+            products = cls.lock(product_ids=items)
+
+            for product in products:
+                if status == 2:
+                    product.count += items[product.id]
+                    product.update_limited_edition()
+                else:
+                    product.purchases += items[product.id]
+
+            Product.objects.bulk_update(
+                products,
+                fields=["count", "limited_edition"] if status == 2 else ["purchases"],
+            )
+            StockReservation.objects.filter(
+                id__in=[reservation.id for reservation in reservations]
+            ).update(status=status)
+
+            cls.clear_cache(product_ids=items)
+
+        logger.info(
+            f"Резерв заказа №{order_id} "
+            f"{'возвращен на склад' if status == 2 else 'выкуплен'}: {items}"
+        )
+
+        return len(reservations)
+
+    @classmethod
+    def release_expired(cls, order_id: Union[int, None] = None) -> int:
+        """
+        Метод для возврата на склад просроченных резервов неоплаченных заказов
+        (кроме заказов, оплата которых выполняется в данный момент)
+
+        @param order_id: id заказа / None - все заказы
+        @return: кол-во заказов
+        """
+        reservations = StockReservation.objects.filter(
+            status=1, expires_at__lte=timezone.now()
+        ).exclude(order__status__in=(3, 4, 5))
+
+        if order_id is not None:
+            reservations = reservations.filter(order_id=order_id)
+
+        order_ids = set(reservations.values_list("order_id", flat=True))
+
+        for order_id in order_ids:
+            cls.release(order_id=order_id)
+
+        return len(order_ids)
+
+    @classmethod
+    def lock_order(cls, order_id: int) -> Union[int, None]:
+        """
+        Метод блокирует строку заказа до конца транзакции (SELECT ... FOR UPDATE)
+
+        @param order_id: id заказа
+        @return: статус заказа / None, если заказ не найден
+        """
+        return (
+            Order.objects.select_for_update()
+            .filter(id=order_id)
+            .values_list("status", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def lock(cls, product_ids: Iterable[int]) -> List[Product]:
+        """
+        Метод блокирует строки товаров до конца транзакции (SELECT ... FOR UPDATE в порядке id)
+
+        @param product_ids: список id товаров
+        @return: список товаров
+        """
+        return list(
+            Product.objects.select_for_update()
+            .filter(id__in=list(product_ids))
+            .only("id", "name", "count", "purchases", "limited_edition")
+            .order_by("id")
+        )
+
+    @classmethod
+    def clear_cache(cls, product_ids: Iterable[int]) -> None:
+        """
+        Метод для очистки кэша товаров и фасетов каталога (остатки) после фиксации транзакции
+        (bulk_update не вызывает save())
+        """
+        keys = [f"product_{product_id}" for product_id in product_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+        ProductFacetService.invalidate()
@@ -1,61 +1,354 @@
 import logging
-import random
-import time
 
+from datetime import timedelta
+from typing import List, Union
 from celery import shared_task
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Max, Q
+from django.utils import timezone
 
-from app.app_shop.models.cart_and_orders import PaymentErrors, Order
+from app.app_shop.models.cart_and_orders import Order, StockReservation
+from app.app_shop.services.payment_errors import PaymentErrorCatalog
+from app.app_shop.services.payment_gateways import GatewayError, get_gateway
+from app.app_shop.services.products.autocomplete import ProductAutocompleteService
+from app.app_shop.services.products.search_index import ProductSearchIndex
+from app.app_shop.services.renditions import ImageRenditionService
+from app.app_shop.services.shop_cart.authenticated import ProductsCartUserService
+from app.app_shop.services.shop_cart.redis_storage import RedisCartStorage
+from app.app_shop.services.stock import StockReservationService
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task()
+# Задачи оплаты идемпотентны (Order.change_status), поэтому подтверждаются после выполнения (acks_late)
+# и возвращаются в очередь, если процесс воркера завершился во время выполнения
+@shared_task(
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5},
+    acks_late=True,
+    reject_on_worker_lost=True,
+    soft_time_limit=60,
+    time_limit=90,
+)
 def payment(order_id: int, cart_number: int) -> bool:
     """
-    Оплата заказа
+    Начало оплаты заказа: проверка резерва товаров, перевод заказа в статус "Подтверждение оплаты",
+    авторизация платежа в платежном сервисе (settings.PAYMENT_GATEWAY) и постановка задачи подтверждения
+    оплаты через settings.PAYMENT_CONFIRMATION_DELAY сек (задача не ожидает результата авторизации
+    и не занимает процесс воркера)
 
-    @param order: объект заказа
+    @param order_id: id заказа
     @param cart_number: номер карты
-    @return: True - успешно, иначе False
+    @return: True - оплата начата, иначе False
     """
+    order = Order.objects.filter(id=order_id).first()
 
-    # Поиск заказа по id
-    order = Order.objects.get(id=order_id)
+    if order is None:
+        logger.error(f"Заказ №{order_id} не найден!")
+        return False
 
-    if not order is False:
-        logger.info(
-            f"Оплата заказа: №{order_id}, карта №{cart_number}, сумма к оплате - {order.order_cost} руб"
-        )
+    amount = order.grand_total if order.grand_total is not None else order.order_cost
+    logger.info(
+        f"Оплата заказа: №{order_id}, карта №{cart_number}, сумма к оплате - {amount} руб"
+    )
 
-        order.status = 3  # Смена статуса заказа на "Подтверждение оплаты"
-        order.save()
+    # Резерв товаров мог быть возвращен на склад по истечении срока - резервируем повторно
+    if not StockReservationService.ensure(order):
+        Order.change_status(order_id=order_id, status=2, current=(1, 2))
+        logger.error(f"Заказ #{order_id} не оплачен: товара недостаточно на складе")
 
-        # Имитация ожидания оплаты заказа
-        time.sleep(10)
+        return False
 
-        if cart_number % 2 == 0 and cart_number % 10 != 0:
-            order.status = 4  # Смена статуса заказа на "Оплачен"
-            order.error_message = None  # Удаляем сообщение ошибки, если оно было
-            order.save()
-            logger.info(f"Заказ #{order.id} успешно оплачен")
+    # "Оформлен" / "Не оплачен" -> "Подтверждение оплаты" (повторный запуск не начинает оплату заново)
+    if not Order.change_status(
+        order_id=order_id,
+        status=3,
+        current=(1, 2),
+        payment_updated_at=timezone.now(),
+    ):
+        # Повторный запуск после сбоя (процесс воркера завершился, ошибка записи платежа) - подтверждение
+        # ставится заново, иначе заказ останется в статусе "Подтверждение оплаты"
+        if Order.objects.filter(id=order_id, status=3).exists():
+            logger.warning(
+                f"Оплата заказа №{order_id} уже начата, повторная постановка подтверждения"
+            )
+            confirm_payment.apply_async(
+                kwargs={"order_id": order_id},
+                countdown=settings.PAYMENT_CONFIRMATION_DELAY,
+            )
 
             return True
 
-        else:
-            order.status = 2  # Смена статуса заказа на "Не оплачен"
-            errors_count = PaymentErrors.objects.count()
-            random_error_message = PaymentErrors.objects.get(
-                id=random.randint(1, errors_count - 1)
-            )
-            order.error_message = random_error_message
-            order.save()
+        logger.warning(f"Оплата заказа №{order_id} уже завершена")
+        return False
 
-            logger.error(
-                f'Заказ #{order.id} не оплачен. Ошибка: "{random_error_message.title}"'
-            )
+    try:
+        response = get_gateway().authorize(
+            order_id=order_id, amount=amount, card_number=cart_number
+        )
+
+    except GatewayError as exc:
+        logger.error(f"Заказ #{order_id} не оплачен: {exc}")
+        fail_payment(order_id=order_id, code="gateway_unavailable")
+
+        return False
+
+    Order.objects.filter(id=order_id).update(
+        payment_transaction=response.transaction_id, payment_updated_at=timezone.now()
+    )
+
+    if response.status == "declined":
+        fail_payment(order_id=order_id, code=response.error)
+        return False
+
+    confirm_payment.apply_async(
+        kwargs={"order_id": order_id}, countdown=settings.PAYMENT_CONFIRMATION_DELAY
+    )
+
+    return True
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5},
+    acks_late=True,
+    reject_on_worker_lost=True,
+    soft_time_limit=60,
+    time_limit=90,
+)
+def confirm_payment(self, order_id: int) -> bool:
+    """
+    Подтверждение оплаты заказа по статусу платежа в платежном сервисе:
+    "Подтверждение оплаты" -> "Оплачен" (авторизованный платеж списывается) / "Не оплачен".
+    Пока платеж обрабатывается (или еще не создан, или сервис недоступен), задача повторяется через
+    settings.PAYMENT_CONFIRMATION_DELAY сек, но не более settings.PAYMENT_STATUS_MAX_RETRIES раз.
+    Также запускается по уведомлению платежного сервиса (PaymentWebhookView).
+
+    @param order_id: id заказа
+    @return: True - заказ оплачен, иначе False
+    """
+    order = (
+        Order.objects.filter(id=order_id)
+        .values("status", "payment_transaction")
+        .first()
+    )
+
+    # Оплата уже подтверждена (повтор задачи или уведомления)
+    if order is None or order["status"] != 3:
+        return bool(order) and order["status"] == 4
+
+    gateway = get_gateway()
+    response = None
+
+    if not order["payment_transaction"]:
+        # Задача оплаты еще выполняется или завершилась сбоем до записи платежа - ожидание,
+        # как и при недоступности платежного сервиса
+        logger.warning(f"Платеж заказа №{order_id} еще не создан")
 
-            return False
     else:
-        logger.error(f"Заказ №{order_id} не найден!")
+        try:
+            response = gateway.status(order["payment_transaction"])
+
+            if response.status == "authorized":
+                response = gateway.capture(order["payment_transaction"])
+
+        except GatewayError as exc:
+            logger.warning(f"Статус оплаты заказа №{order_id} не получен: {exc}")
+            response = None
+
+    if response is not None and response.status == "captured":
+        finish_payment(order_id=order_id)
+        return True
+
+    if response is None or response.status in ("pending", "authorized"):
+        if self.request.retries < settings.PAYMENT_STATUS_MAX_RETRIES:
+            raise self.retry(
+                countdown=settings.PAYMENT_CONFIRMATION_DELAY,
+                max_retries=settings.PAYMENT_STATUS_MAX_RETRIES,
+            )
+
+        logger.error(f"Оплата заказа №{order_id} не подтверждена платежным сервисом")
+
+        # Средства могли быть заблокированы, но не списаны - авторизация отменяется, чтобы не удерживать их
+        if order["payment_transaction"]:
+            try:
+                gateway.void(order["payment_transaction"])
+
+            except GatewayError as exc:
+                logger.error(f"Платеж заказа №{order_id} не отменен: {exc}")
+
+        fail_payment(
+            order_id=order_id,
+            code="gateway_unavailable" if response is None else "timeout",
+        )
 
         return False
+
+    fail_payment(order_id=order_id, code=response.error)
+
+    return False
+
+
+@shared_task(acks_late=True)
+def image_renditions(label: str, pk: int, field_name: str, kinds: List[str]) -> int:
+    """
+    Создание уменьшенных копий загруженного изображения
+
+    @param label: модель ("app_shop.ProductImages")
+    @param pk: id объекта
+    @param field_name: название поля с изображением
+    @param kinds: назначения копий (ключи settings.IMAGE_RENDITIONS)
+    @return: кол-во созданных назначений
+    """
+    renditions = ImageRenditionService.generate(
+        label=label, pk=pk, field_name=field_name, kinds=kinds
+    )
+
+    return len(renditions) - 1 if renditions else 0
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True)
+def update_search_index() -> int:
+    """
+    Объединение журнала изменений поискового индекса с индексом (ставится при сохранении товаров и тегов,
+    а также запускается Celery beat на случай потери задачи)
+
+    @return: кол-во обновленных товаров
+    """
+    return ProductSearchIndex.merge()
+
+
+@shared_task()
+def rebuild_autocomplete_index() -> bool:
+    """
+    Перестроение таблицы префиксов подсказок поиска после изменения товаров и категорий
+    (также запускается Celery beat на случай потери задачи)
+
+    @return: True - таблица перестроена, иначе False (каталог не менялся)
+    """
+    return ProductAutocompleteService.rebuild_pending()
+
+
+@shared_task()
+def flush_carts() -> int:
+    """
+    Запись измененных корзин авторизованных пользователей из Redis в БД (запускается Celery beat)
+
+    @return: кол-во записанных корзин
+    """
+    if not ProductsCartUserService.redis_backend():
+        return 0
+
+    return RedisCartStorage.flush()
+
+
+@shared_task()
+def confirm_stale_payments() -> int:
+    """
+    Повторная постановка подтверждения оплаты заказов, которые находятся в статусе "Подтверждение оплаты"
+    без действий по оплате дольше settings.PAYMENT_STALE_TIMEOUT сек (задачи оплаты потеряны), - заказ
+    будет оплачен или переведен в статус "Не оплачен" (запускается Celery beat)
+
+    @return: кол-во заказов
+    """
+    now = timezone.now()
+    deadline = now - timedelta(seconds=settings.PAYMENT_STALE_TIMEOUT)
+    orders = Order.objects.filter(status=3).filter(
+        Q(payment_updated_at__lte=deadline) | Q(payment_updated_at__isnull=True)
+    )
+    scheduled = 0
+
+    for order_id, updated_at in orders.values_list("id", "payment_updated_at"):
+        # Отметка проверки: заказ не ставится повторно до следующего срока (в т.ч. другим запуском)
+        if not Order.objects.filter(
+            id=order_id, status=3, payment_updated_at=updated_at
+        ).update(payment_updated_at=now):
+            continue
+
+        logger.warning(f"Оплата заказа №{order_id} зависла, повторное подтверждение")
+        confirm_payment.delay(order_id=order_id)
+        scheduled += 1
+
+    return scheduled
+
+
+@shared_task()
+def release_reservation(order_id: int) -> int:
+    """
+    Возврат на склад товаров неоплаченного заказа по истечении срока резерва
+
+    @param order_id: id заказа
+    @return: кол-во заказов, товары которых возвращены на склад (0 / 1)
+    """
+    return StockReservationService.release_expired(order_id=order_id)
+
+
+@shared_task()
+def release_expired_reservations() -> int:
+    """
+    Возврат на склад товаров всех неоплаченных заказов с истекшим сроком резерва (запускается Celery beat)
+
+    @return: кол-во заказов
+    """
+    return StockReservationService.release_expired()
+
+
+def finish_payment(order_id: int) -> None:
+    """
+    Завершение успешной оплаты: "Подтверждение оплаты" -> "Оплачен" и выкуп резерва товаров
+
+    @param order_id: id заказа
+    @return: None
+    """
+    # Сообщение ошибки удаляется, если оно было
+    if Order.change_status(
+        order_id=order_id, status=4, current=(3,), error_message=None
+    ):
+        logger.info(f"Заказ #{order_id} успешно оплачен")
+
+    # Выкуп резерва: увеличение кол-ва покупок товаров (повторный вызов ничего не меняет)
+    StockReservationService.complete(order_id=order_id)
+
+
+def fail_payment(order_id: int, code: Union[str, None] = None) -> None:
+    """
+    Завершение неуспешной оплаты: "Подтверждение оплаты" -> "Не оплачен" с сообщением об ошибке
+    (сообщение выбирается по коду ошибки из справочника в памяти процесса, без запросов к БД)
+
+    @param order_id: id заказа
+    @param code: код ошибки платежного сервиса / None
+    @return: None
+    """
+    error = PaymentErrorCatalog.pick(code=code)
+
+    if Order.change_status(
+        order_id=order_id,
+        status=2,
+        current=(3,),
+        error_message_id=error.id if error else None,
+    ):
+        logger.error(
+            f'Заказ #{order_id} не оплачен. Ошибка: "{error.title if error else code}"'
+        )
+
+        # Товары возвращаются на склад, если заказ не будет оплачен до окончания срока резерва
+        schedule_release(order_id=order_id)
+
+
+def schedule_release(order_id: int) -> None:
+    """
+    Постановка задачи возврата товаров заказа на склад на момент окончания срока резерва
+
+    @param order_id: id заказа
+    @return: None
+    """
+    expires_at = StockReservation.objects.filter(order_id=order_id, status=1).aggregate(
+        expires_at=Max("expires_at")
+    )["expires_at"]
+
+    if expires_at:
+        release_reservation.apply_async(kwargs={"order_id": order_id}, eta=expires_at)
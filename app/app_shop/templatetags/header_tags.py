@@ -1,16 +1,12 @@
 import logging
 
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 from django import template
-from django.core.cache import cache
-from django.db.models import QuerySet
 
 from app.config.utils.configuration import get_config
 from app.app_shop.models.products import CategoryProduct
-from app.app_shop.services.shop_cart.logic import (
-    CartProductsListService,
-    ProductsCartUserService,
-)
+from app.app_shop.services.caching import CachedQueryService
+from app.app_shop.services.shop_cart.summary import CartSummaryService
 
 
 logger = logging.getLogger(__name__)
@@ -18,18 +14,20 @@ register = template.Library()
 
 
 @register.simple_tag()
-def output_categories() -> QuerySet:
+def output_categories() -> List[CategoryProduct]:
     """
     Функция возвращает активные родительские категории товаров, в которых есть активные товары
 
-    @return: QuerySet с категориями товаров
+    @return: список с категориями товаров
     """
     config = get_config()
 
-    categories = cache.get_or_set(
-        "categories",
-        CategoryProduct.objects.filter(deleted=False, parent=None).order_by("id"),
-        60 * config.caching_time,
+    categories = CachedQueryService.get_or_load(
+        key="categories",
+        loader=lambda: CategoryProduct.objects.filter(
+            deleted=False, parent=None
+        ).order_by("id"),
+        timeout=60 * config.caching_time,
     )
 
     return categories
@@ -39,23 +37,11 @@ def output_categories() -> QuerySet:
 def products_cart(context: Dict) -> Tuple[int, int]:
     """
     Функция возвращает кол-во товаров в корзине текущего пользователя и их общую стоимость
+    (в шаблонах используется переменная cart_summary из контекстного процессора)
 
     @param context: словарь - контекстная переменная
-    @return: кол-во записей, общая стоимость товаров
+    @return: кол-во товаров, общая стоимость товаров
     """
-    logger.debug("Вывод в header кол-ва и стоимости товаров в корзине пользователя")
+    summary = CartSummaryService.get(context["request"])
 
-    records_number = 0
-    total_cost = 0
-
-    records = CartProductsListService.all_products(context["request"])
-
-    if records:
-        for record in records:
-            records_number += record.count
-
-        total_cost = ProductsCartUserService.total_cost(records)
-
-    logger.debug(f"Товаров: {records_number}, стоимость: {total_cost} руб")
-
-    return records_number, total_cost
+    return summary.count, summary.total
@@ -0,0 +1,76 @@
+from typing import Dict
+
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import SafeString
+
+from app.app_shop.services.renditions import ImageRenditionService
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(
+    url: str, renditions: Dict, kind: str, alt: str = "", css_class: str = ""
+) -> SafeString:
+    """
+    Функция возвращает тег изображения с уменьшенными копиями (srcset) для переданного назначения.
+    Пока копии не созданы, выводится оригинал.
+
+    @param url: URL оригинала изображения
+    @param renditions: словарь с копиями изображения (поле модели "<поле изображения>_renditions")
+    @param kind: назначение копий ("card", "cart", "gallery", "avatar")
+    @param alt: альтернативный текст
+    @param css_class: CSS-класс тега img
+    @return: HTML-код изображения
+    """
+    formats = settings.IMAGE_RENDITION_FORMATS
+    fallback = ImageRenditionService.srcset(renditions, kind, formats[-1])
+
+    if not fallback:
+        return format_html('<img class="{}" src="{}" alt="{}"/>', css_class, url, alt)
+
+    # Первая ширина - размер изображения на странице, остальные выбираются браузером для плотных экранов
+    sizes = f"{settings.IMAGE_RENDITIONS[kind][0]}px"
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}"/>',
+        (
+            (
+                image_format,
+                ImageRenditionService.srcset(renditions, kind, image_format),
+                sizes,
+            )
+            for image_format in formats[:-1]
+        ),
+    )
+
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" alt="{}"/></picture>',
+        sources,
+        css_class,
+        fallback.split(" ", 1)[0],
+        fallback,
+        sizes,
+        alt,
+    )
+
+
+@register.simple_tag
+def rendition_url(url: str, renditions: Dict, kind: str) -> str:
+    """
+    Функция возвращает URL наибольшей копии изображения для назначения (формат для всех браузеров)
+    или URL оригинала, если копий нет
+
+    @param url: URL оригинала изображения
+    @param renditions: словарь с копиями изображения
+    @param kind: назначение копий
+    @return: URL изображения
+    """
+    srcset = ImageRenditionService.srcset(
+        renditions, kind, settings.IMAGE_RENDITION_FORMATS[-1]
+    )
+
+    return srcset.rsplit(", ", 1)[-1].split(" ", 1)[0] if srcset else url
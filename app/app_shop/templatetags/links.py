@@ -30,6 +30,39 @@ def clear_link_for_sort(link: str) -> str:
     elif "?page=" in link:
         link = link.split("?page=")[0]
 
+    elif "&cursor=" in link:
+        link = link.split("&cursor=")[0]
+
+    elif "?cursor=" in link:
+        link = link.split("?cursor=")[0]
+
+    if "?" not in link:
+        link += "?"
+    else:
+        link += "&"
+
+    logger.info(f"Возврат очищенной ссылки: {link}")
+
+    return link
+
+
+@register.simple_tag
+def clear_link_for_cursor(link: str) -> str:
+    """
+    Очистка входящей строки от текста после ключевой фразы 'cursor' (постраничный вывод по ключу).
+    Добавление спец.символа в конце для корректного парсинга параметров из URL.
+
+    @param link: строка-ссылка
+    @return: очищенная строка
+    """
+    logger.debug(f"Очистка ссылки для постраничного вывода по ключу: {link}")
+
+    if "&cursor=" in link:
+        link = link.split("&cursor=")[0]
+
+    elif "?cursor=" in link:
+        link = link.split("?cursor=")[0]
+
     if "?" not in link:
         link += "?"
     else:
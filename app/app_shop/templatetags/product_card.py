@@ -2,7 +2,7 @@ import logging
 
 from django import template
 
-from app.app_shop.models.products import ProductImages
+from app.app_shop.models.products import Product, ProductImages
 
 
 logger = logging.getLogger(__name__)
@@ -10,16 +10,17 @@ register = template.Library()
 
 
 @register.simple_tag
-def product_image(product_id: int) -> ProductImages:
+def product_image(product: Product) -> ProductImages:
     """
-    Функция возвращает изображение по id переданного товара
+    Функция возвращает основное изображение переданного товара
+    (загружается вместе с товаром или сервисом ProductImageService для всех карточек страницы)
 
-    @param product_id: id товара
+    @param product: товар
     @return: объект изображения
     """
-    image = ProductImages.objects.filter(product=product_id).first()
+    image = product.primary_image
 
     if not image:
-        logger.warning("Изображение не найдено")
+        logger.warning(f"Изображение не найдено: товар - {product.id}")
 
     return image
@@ -0,0 +1,182 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from app.app_user.models import Buyer, Profile
+from app.app_shop.models.products import CategoryProduct, Product, ProductReviews
+from app.app_shop.services.caching import CachedQueryService
+from app.app_shop.services.products.detail_page import ProductCommentsService
+from app.config.models import SiteConfiguration
+from app.config.utils.configuration import (
+    SiteConfigurationMiddleware,
+    bump_config_version,
+    get_config,
+)
+from app.megano.cache import LocalLRUCache, TieredCache
+
+
+class TestTieredCache(SimpleTestCase):
+    """
+    Проверка двухуровневого кэша (без подключения к Redis)
+    """
+
+    def test_local_cache(self):
+        """
+        Проверка вытеснения давно не использовавшихся записей и времени жизни записей в L1
+        """
+        local = LocalLRUCache(max_entries=2)
+        local.set("a", [1], timeout=60)
+        local.set("b", 2, timeout=60)
+        local.get("a")
+        local.set("c", 3, timeout=60)
+
+        self.assertEqual(local.get("a"), [1])
+        self.assertIsNone(local.get("b"))
+
+        local.get("a").append(2)  # Изменение полученного объекта не меняет кэш
+        self.assertEqual(local.get("a"), [1])
+
+        local.set("d", 4, timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(local.get("d"))
+
+    def test_namespaces(self):
+        """
+        Проверка выбора параметров по группе ключа и работы без Redis
+        """
+        cache = TieredCache(
+            "redis://127.0.0.1:1/1",
+            {
+                "OPTIONS": {
+                    "NAMESPACES": {
+                        "categories": {"L1_TIMEOUT": 60},
+                        "selected_categories": {"TIMEOUT": 10},
+                        "cart": {"L1": False},
+                    }
+                }
+            },
+        )
+
+        self.assertEqual(cache.namespace("categories"), {"L1_TIMEOUT": 60})
+        self.assertEqual(cache.namespace("selected_categories"), {"TIMEOUT": 10})
+        self.assertEqual(cache.namespace("cart_15"), {"L1": False})
+        self.assertEqual(cache.namespace("product_1"), {})
+        self.assertEqual(cache.l2_timeout("selected_categories"), 10)
+
+        # Redis недоступен: чтение возвращает промах, запись пропускается
+        cache.set("product_1", "value")
+        self.assertEqual(cache.get("product_1", "default"), "default")
+        self.assertEqual(cache.get_or_set("product_1", "value"), "value")
+        self.assertIsNone(cache.incr("product_1"))
+
+        # Запись нескольких ключей возвращает незаписанные ключи, изменения групп без L1 не рассылаются
+        messages = []
+        cache.publish = messages.append
+
+        self.assertEqual(
+            sorted(cache.set_many({"cart_1": 1, "cart_2": 2, "product_2": 3})),
+            ["cart_1", "cart_2", "product_2"],
+        )
+        cache.set_many({"cart_1": 1, "cart_2": 2})
+        cache.delete("cart_1")
+
+        self.assertEqual(len(messages), 1)
+
+
+class TestCachedQueryService(TestCase):
+    """
+    Проверка кэширования результатов запросов списками записей
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=50000,
+        )
+        user = User.objects.create_user(username="buyer", password="secret_password")
+        profile = Profile.objects.create(user=user, full_name="Покупатель")
+        buyer = Buyer.objects.create(profile=profile)
+        ProductReviews.objects.create(product=cls.product, buyer=buyer, review="Отзыв")
+
+    def setUp(self):
+        cache.clear()
+        CachedQueryService.reset_metrics()
+
+    def test_comments(self):
+        """
+        Проверка сохранения комментариев компактными записями и чтения из кэша без запросов к БД
+        """
+        comments = ProductCommentsService.all_comments(product=self.product)
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = ProductCommentsService.all_comments(product_id=self.product.id)
+
+        self.assertFalse(
+            [query for query in queries if "products_reviews" in query["sql"]]
+        )
+
+        self.assertEqual(cached, comments)
+        self.assertEqual(cached[0].full_name, "Покупатель")
+        self.assertEqual(cached[0].avatar_url, "")
+        self.assertEqual(
+            CachedQueryService.metrics()["comments"],
+            {"hits": 1, "misses": 1, "hit_ratio": 0.5},
+        )
+
+    def test_metrics_log(self):
+        """
+        Проверка записи статистики кэша в лог через заданное кол-во обращений
+        """
+        with self.assertLogs("app.app_shop.services.caching", level="INFO") as logs:
+            for _ in range(CachedQueryService._LOG_INTERVAL):
+                CachedQueryService.count(key="comments_1", hit=True)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("comments - попаданий 1000, промахов 0", logs.output[0])
+
+
+class TestSiteConfiguration(TestCase):
+    """
+    Проверка слоя доступа к настройкам сайта
+    """
+
+    def test_request_memo(self):
+        """
+        Проверка загрузки настроек не более одного раза за запрос
+        """
+        cache.clear()
+        middleware = SiteConfigurationMiddleware(
+            lambda request: [get_config(), get_config(), SiteConfiguration.get_solo()]
+        )
+
+        with self.assertNumQueries(1):
+            configs = middleware(RequestFactory().get("/"))
+
+        self.assertTrue(all(config is configs[0] for config in configs))
+
+        with self.assertNumQueries(0):
+            get_config()
+
+    def test_version_bump(self):
+        """
+        Проверка перезагрузки настроек после сохранения
+        """
+        config = get_config()
+        config.caching_time = 5
+        config.save()
+        self.assertEqual(get_config().caching_time, 5)
+
+        SiteConfiguration.objects.update(caching_time=7)
+        self.assertEqual(get_config().caching_time, 5)  # Версия не менялась
+
+        bump_config_version()
+        self.assertEqual(get_config().caching_time, 7)
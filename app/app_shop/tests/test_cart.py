@@ -0,0 +1,322 @@
+from unittest import SkipTest
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.app_shop.forms import MakingOrderForm
+from app.app_shop.models.cart_and_orders import Cart, PurchasedProduct
+from app.app_shop.models.products import CategoryProduct, Product
+from app.app_shop.services.orders import RegistrationOrderService
+from app.app_shop.services.shop_cart.authenticated import ProductsCartUserService
+from app.app_shop.services.shop_cart.redis_storage import RedisCartStorage
+from app.app_shop.services.shop_cart.guest_storage import GuestCart
+from app.app_shop.services.shop_cart.summary import CartSummaryService
+
+
+class TestUserCart(TestCase):
+    """
+    Проверка изменения корзины авторизованного пользователя
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=1000,
+            discount=10,
+        )
+        cls.user = User.objects.create_user(username="buyer", password="password")
+
+    def count(self) -> int:
+        return Cart.objects.get(user=self.user, product=self.product).count
+
+    def test_add(self):
+        """
+        Проверка добавления товара одним запросом (новая запись и увеличение кол-ва существующей)
+        """
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                ProductsCartUserService.add(user=self.user, product_id=self.product.id)
+            )
+
+        with self.assertNumQueries(1):
+            ProductsCartUserService.add(
+                user=self.user, product_id=self.product.id, count=3
+            )
+
+        self.assertEqual(self.count(), 4)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(ProductsCartUserService.add(user=self.user, product_id=0))
+
+        # Удаленный товар не добавляется (как и при слиянии с корзиной гостя)
+        deleted = Product.objects.create(
+            name="Удаленный товар",
+            definition="Описание",
+            characteristics={},
+            category=self.product.category,
+            price=100,
+            deleted=True,
+        )
+        self.assertFalse(
+            ProductsCartUserService.add(user=self.user, product_id=deleted.id)
+        )
+
+    def test_change_quantity(self):
+        """
+        Проверка изменения кол-ва товара и удаления записи при кол-ве 0
+        """
+        ProductsCartUserService.add(user=self.user, product_id=self.product.id, count=2)
+
+        with self.assertNumQueries(1):
+            ProductsCartUserService.reduce_product(
+                user=self.user, product_id=self.product.id
+            )
+
+        self.assertEqual(self.count(), 1)
+
+        # Запись удаляется, только когда кол-во становится меньше или равно 0
+        ProductsCartUserService.add(user=self.user, product_id=self.product.id, count=4)
+        ProductsCartUserService.change_quantity(
+            user=self.user, product_id=self.product.id, count=-3
+        )
+        self.assertEqual(self.count(), 2)
+
+        ProductsCartUserService.change_quantity(
+            user=self.user, product_id=self.product.id, count=-1
+        )
+        ProductsCartUserService.reduce_product(
+            user=self.user, product_id=self.product.id
+        )
+        self.assertFalse(
+            ProductsCartUserService.check_product(
+                user=self.user, product_id=self.product.id
+            )
+        )
+
+    def test_summary(self):
+        """
+        Проверка итогов корзины: расчет один раз, чтение из кэша без запросов, очистка при изменении корзины
+        """
+        cache.clear()
+        ProductsCartUserService.add(user=self.user, product_id=self.product.id, count=2)
+        request = RequestFactory().get("/")
+        request.user = self.user
+
+        summary = CartSummaryService.get(request)
+        self.assertEqual(
+            (summary.count, summary.subtotal, summary.discount_total, summary.total),
+            (2, 2000, 200, 1800),
+        )
+
+        request = RequestFactory().get("/")
+        request.user = self.user
+
+        with self.assertNumQueries(0):
+            self.assertEqual(CartSummaryService.get(request), summary)
+
+        ProductsCartUserService.increase_product(
+            user=self.user, product_id=self.product.id
+        )
+        request = RequestFactory().get("/")
+        request.user = self.user
+        self.assertEqual(CartSummaryService.get(request).total, 2700)
+
+    def test_merge(self):
+        """
+        Проверка слияния корзины гостя с корзиной пользователя фиксированным кол-вом запросов
+        (удаленные и несуществующие товары пропускаются)
+        """
+        ProductsCartUserService.add(user=self.user, product_id=self.product.id, count=2)
+        products = [
+            Product.objects.create(
+                name=f"Товар {number}",
+                definition="Описание",
+                characteristics={},
+                category=self.product.category,
+                price=100,
+                deleted=number == 0,
+            )
+            for number in range(5)
+        ]
+        items = {product.id: 1 for product in products}
+        items.update({self.product.id: 3, 0: 1})
+
+        with self.assertNumQueries(5):
+            merged = ProductsCartUserService.merge(user=self.user, items=items)
+
+        self.assertEqual(merged, 5)
+        self.assertEqual(self.count(), 5)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 5)
+
+
+class TestGuestCart(TestCase):
+    """
+    Проверка корзины гостя в подписанной cookie
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=1000,
+        )
+
+    def add_url(self) -> str:
+        return reverse(
+            "shop:add_product", kwargs={"product_id": self.product.id, "next": "/"}
+        )
+
+    def test_cookie_cart(self):
+        """
+        Проверка хранения корзины гостя в cookie без создания сессии
+        """
+        self.client.get(self.add_url())
+        self.client.get(self.add_url())
+
+        cookie = self.client.cookies[settings.GUEST_CART_COOKIE_NAME].value
+        self.assertTrue(cookie)
+        self.assertFalse(Session.objects.exists())
+
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.GUEST_CART_COOKIE_NAME] = cookie
+        self.assertEqual(GuestCart.of(request).items, {str(self.product.id): 2})
+
+    def test_tampered_cookie(self):
+        """
+        Проверка, что измененная cookie не принимается
+        """
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.GUEST_CART_COOKIE_NAME] = "{}:bad-signature"
+        self.assertEqual(GuestCart.of(request).items, {})
+
+
+class TestRedisCart(TestCase):
+    """
+    Проверка хранения корзин авторизованных пользователей в Redis (CART_BACKEND = "redis").
+    Выполняется при доступном Redis (отдельная БД 15, очищается перед каждой проверкой).
+    """
+
+    url = settings.CART_REDIS_URL.rsplit("/", 1)[0] + "/15"
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            Redis.from_url(cls.url, socket_connect_timeout=1).ping()
+
+        except RedisError:
+            raise SkipTest("Redis недоступен")
+
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=1000,
+            count=10,
+        )
+        cls.user = User.objects.create_user(username="buyer", password="password")
+
+    def setUp(self):
+        settings_override = override_settings(
+            CART_BACKEND="redis", CART_REDIS_URL=self.url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # Клиент создается заново для тестовой БД Redis
+        RedisCartStorage._client = None
+        self.addCleanup(setattr, RedisCartStorage, "_client", None)
+
+        self.redis = RedisCartStorage.client()
+        self.redis.flushdb()
+        cache.clear()
+
+    def test_load_increment_flush(self):
+        """
+        Проверка загрузки корзины из БД, изменения кол-ва в Redis и записи изменений в БД
+        """
+        Cart.objects.create(user=self.user, product=self.product, count=2)
+
+        ProductsCartUserService.add(user=self.user, product_id=self.product.id, count=3)
+        self.assertEqual(RedisCartStorage.items(self.user.id), {self.product.id: 5})
+        self.assertEqual(Cart.objects.get(user=self.user).count, 2)
+
+        self.assertEqual(RedisCartStorage.flush(), 1)
+        self.assertEqual(Cart.objects.get(user=self.user).count, 5)
+
+        ProductsCartUserService.remove(user=self.user, product_id=self.product.id)
+        RedisCartStorage.flush()
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_expired_cart(self):
+        """
+        Проверка изменения корзины, которая истекла в Redis после загрузки (товары из БД не теряются)
+        """
+        Cart.objects.create(user=self.user, product=self.product, count=2)
+        RedisCartStorage.load(self.user.id)
+        self.redis.delete(RedisCartStorage.key(self.user.id))  # Истечение TTL
+
+        self.assertEqual(
+            RedisCartStorage.run(
+                script="increment",
+                user_id=self.user.id,
+                args=[self.product.id, 1, self.user.id, RedisCartStorage._TTL, 0],
+            ),
+            3,
+        )
+        self.assertEqual(RedisCartStorage.flush(user_ids=[self.user.id]), 1)
+        self.assertEqual(Cart.objects.get(user=self.user).count, 3)
+
+    def test_checkout(self):
+        """
+        Проверка оформления заказа по корзине из Redis (корзина записывается в БД перед заказом)
+        """
+        ProductsCartUserService.add(user=self.user, product_id=self.product.id, count=2)
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+        request = RequestFactory().post("/")
+        request.user = self.user
+        form = MakingOrderForm(
+            data={
+                "full_name": "Покупатель",
+                "phone_number": "9001234567",
+                "email": "buyer@example.com",
+                "delivery": "ordinary",
+                "city": "Москва",
+                "address": "Улица, 1",
+                "pay": "online",
+            }
+        )
+        self.assertTrue(form.is_valid())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = RegistrationOrderService.create_order(request=request, form=form)
+
+        self.assertEqual(
+            list(
+                PurchasedProduct.objects.filter(order=order).values_list(
+                    "product_id", "count"
+                )
+            ),
+            [(self.product.id, 2)],
+        )
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+        self.assertEqual(RedisCartStorage.items(self.user.id), {})
@@ -0,0 +1,764 @@
+import json
+import os
+import tempfile
+import zipfile
+
+from io import BytesIO, StringIO
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from django.urls import reverse
+
+from app.megano.celery import app
+from app.app_user.models import Buyer, Profile
+from app.app_shop.admin import ProductReviewsAdmin
+from app.app_shop.models.products import (
+    CategoryProduct,
+    Product,
+    ProductImages,
+    ProductReviews,
+    ProductTags,
+)
+from app.app_shop.services.products.autocomplete import ProductAutocompleteService
+from app.app_shop.services.products.catalog_io import (
+    CatalogExportService,
+    CatalogImportService,
+)
+from app.app_shop.services.renditions import ImageRenditionService
+from app.app_shop.services.products.products_list.filter import ProductFilterService
+from app.app_shop.services.products.products_list.facets import ProductFacetService
+from app.app_shop.services.products.products_list.sorting import ProductSortService
+from app.app_shop.services.products.products_list.pagination import (
+    KeysetPaginationService,
+)
+from app.app_shop.services.products.search import (
+    IndexSearchBackend,
+    PostgresSearchBackend,
+    ProductsListSearchService,
+)
+from app.app_shop.services.products.search_index import ProductSearchIndex
+
+
+class TestCatalogFilter(TestCase):
+    """
+    Проверка фильтрации товаров каталога и подсчета фасетов
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Смартфоны", image="test.jpg")
+        tag = ProductTags.objects.create(name="Новинки")
+
+        for name, price, count in (
+            ("Смартфон 1", 500, 0),
+            ("Смартфон 2", 3000, 5),
+            ("Смартфон 3", 25000, 150),
+        ):
+            product = Product.objects.create(
+                name=name,
+                definition="Описание",
+                characteristics={},
+                category=category,
+                price=price,
+                count=count,
+            )
+
+            if price > 1000:
+                product.tags.add(tag)
+
+    def test_filter_by_all_parameters(self):
+        """
+        Проверка фильтрации одним запросом по нескольким параметрам
+        """
+        filters = {"min_price": "1000", "max_price": "30000", "in_stock": "true"}
+
+        with self.assertNumQueries(1):
+            products = list(
+                ProductFilterService.output(
+                    products=Product.objects.all(), filters=filters
+                )
+            )
+
+        self.assertEqual(len(products), 2)
+
+    def test_filter_with_invalid_price(self):
+        """
+        Проверка игнорирования некорректного значения цены
+        """
+        products = ProductFilterService.output(
+            products=Product.objects.all(), filters={"min_price": "abc"}
+        )
+        self.assertEqual(products.count(), 3)
+
+    def test_facets(self):
+        """
+        Проверка подсчета фасетов для выборки товаров
+        """
+        facets = ProductFacetService.output(products=Product.objects.all())
+
+        self.assertEqual(facets["total"], 3)
+        self.assertEqual(facets["in_stock"], 2)
+
+    def test_facets_cached_per_filters(self):
+        """
+        Проверка кэширования фасетов по набору фильтров (без учета курсора страницы)
+        """
+        cache.clear()
+        filters = {"in_stock": "true", "sort": "price"}
+
+        ProductFacetService.output(products=Product.objects.all(), filters=filters)
+
+        with self.assertNumQueries(0):
+            facets = ProductFacetService.output(
+                products=Product.objects.all(), filters=filters | {"cursor": "abc"}
+            )
+
+        self.assertEqual(facets["total"], 3)
+
+        # Изменение остатка сбрасывает кэш фасетов
+        product = Product.objects.filter(count__gt=0).first()
+        product.count = 0
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        facets = ProductFacetService.output(
+            products=Product.objects.all(), filters=filters
+        )
+        self.assertEqual(facets["in_stock"], 1)
+
+
+class TestReviewsCounters(TestCase):
+    """
+    Проверка денормализованных счетчиков отзывов у товара
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=50000,
+        )
+        user = User.objects.create_user(username="buyer", password="secret_password")
+        profile = Profile.objects.create(user=user, full_name="Покупатель")
+        cls.buyer = Buyer.objects.create(profile=profile)
+
+    def test_counters(self):
+        """
+        Проверка счетчиков при добавлении, мягком удалении и восстановлении отзыва
+        """
+        review = ProductReviews.objects.create(
+            product=self.product, buyer=self.buyer, review="Отзыв"
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.reviews_count, self.product.active_reviews_count), (1, 1)
+        )
+
+        review.deleted = True
+        review.save()
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.reviews_count, self.product.active_reviews_count), (1, 0)
+        )
+
+        ProductReviews.objects.filter(id=review.id).update(deleted=False)
+        Product.recount_reviews([self.product.id])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.active_reviews_count, 1)
+
+        review.refresh_from_db()
+        review.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.reviews_count, self.product.active_reviews_count), (0, 0)
+        )
+
+    def test_admin_delete_queryset(self):
+        """
+        Проверка пересчета счетчиков при массовом удалении отзывов из админ-панели
+        """
+        for _ in range(2):
+            ProductReviews.objects.create(
+                product=self.product, buyer=self.buyer, review="Отзыв"
+            )
+
+        ProductReviewsAdmin(ProductReviews, admin.site).delete_queryset(
+            request=None, queryset=ProductReviews.objects.all()
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.reviews_count, self.product.active_reviews_count), (0, 0)
+        )
+
+
+class TestKeysetPagination(TestCase):
+    """
+    Проверка постраничного вывода товаров по ключу
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Планшеты", image="test.jpg")
+
+        # Одинаковые цены, чтобы проверить дополнительную сортировку по id
+        for index in range(7):
+            Product.objects.create(
+                name=f"Планшет {index}",
+                definition="Описание",
+                characteristics={},
+                category=category,
+                price=1000 * (index // 2),
+            )
+
+    def test_walk_pages(self):
+        """
+        Проверка перехода по страницам вперед и назад без пропусков и повторов
+        """
+        filters = {"sort": "by_price_down"}
+        products = ProductSortService.output(
+            products=Product.objects.all(), filters=filters
+        )
+        expected = list(products.values_list("id", flat=True))
+
+        pages = []
+        cursor = ""
+
+        while True:
+            page = KeysetPaginationService.paginate(
+                products=products, filters=filters, cursor=cursor, per_page=3
+            )
+            pages.append([product.id for product in page])
+
+            if not page.has_next():
+                break
+
+            cursor = page.next_cursor
+
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(page.count, 7)
+
+        previous = KeysetPaginationService.paginate(
+            products=products,
+            filters=filters,
+            cursor=page.previous_cursor,
+            per_page=3,
+        )
+        self.assertEqual([product.id for product in previous], pages[-2])
+
+    def test_cursor_for_other_sort(self):
+        """
+        Проверка игнорирования токена, созданного для другой сортировки
+        """
+        products = Product.objects.all()
+        page = KeysetPaginationService.paginate(
+            products=products, filters={}, cursor="", per_page=3
+        )
+        other = KeysetPaginationService.paginate(
+            products=products,
+            filters={"sort": "by_price_up"},
+            cursor=page.next_cursor,
+            per_page=3,
+        )
+        self.assertFalse(other.has_previous())
+
+
+class TestProductSearch(TestCase):
+    """
+    Проверка поиска товаров
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Аудио", image="test.jpg")
+
+        for name in ("Наушники беспроводные", "Колонка", "Наушники проводные"):
+            Product.objects.create(
+                name=name,
+                definition="Описание",
+                characteristics={},
+                category=category,
+                price=1000,
+            )
+
+    def test_search(self):
+        """
+        Проверка поиска по фразе и сортировки результатов по умолчанию
+        """
+        request = RequestFactory().get("/search/", {"query": "наушники"})
+        products = ProductsListSearchService.search(request=request)
+
+        self.assertEqual(products.count(), 2)
+        self.assertIn(
+            ProductsListSearchService.sort_key(filters={}),
+            (("rank", True), ("id", False)),
+        )
+
+    def test_invalid_sort_key(self):
+        """
+        Проверка ключа постраничного вывода ранжированных результатов при неизвестной сортировке
+        (совпадает с порядком выборки по релевантности)
+        """
+        ProductsListSearchService._backend = PostgresSearchBackend()
+        self.addCleanup(setattr, ProductsListSearchService, "_backend", None)
+
+        self.assertEqual(
+            ProductsListSearchService.sort_key(filters={"sort": "unknown"}),
+            ("rank", True),
+        )
+        self.assertEqual(
+            ProductsListSearchService.sort_key(filters={"sort": "by_price_up"}),
+            ("price", False),
+        )
+
+
+class TestProductSearchIndex(TestCase):
+    """
+    Проверка инвертированного поискового индекса товаров
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Аудио", image="test.jpg")
+        tag = ProductTags.objects.create(name="Беспроводные")
+
+        cls.headphones = Product.objects.create(
+            name="Наушники Sony",
+            definition="Накладные наушники с шумоподавлением",
+            characteristics={},
+            category=category,
+            price=1000,
+        )
+        cls.headphones.tags.add(tag)
+        cls.speaker = Product.objects.create(
+            name="Колонка портативная",
+            definition="Портативная колонка",
+            characteristics={},
+            category=category,
+            price=2000,
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        settings = override_settings(
+            PRODUCT_SEARCH_INDEX_PATH=os.path.join(directory.name, "products.idx")
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_search(self):
+        """
+        Проверка поиска по словоформам, префиксу последнего слова и тегам
+        """
+        self.assertIsNone(ProductSearchIndex.search(query="наушники"))
+
+        ProductSearchIndex.build()
+
+        self.assertEqual(ProductSearchIndex.search("наушник"), {self.headphones.id})
+        self.assertEqual(
+            ProductSearchIndex.search("портативную кол"), {self.speaker.id}
+        )
+        self.assertEqual(
+            ProductSearchIndex.search("беспроводной"), {self.headphones.id}
+        )
+        self.assertEqual(ProductSearchIndex.search("sony колонка"), set())
+
+    def test_max_results(self):
+        """
+        Проверка ограничения кол-ва результатов поиска по индексу (выводятся новейшие товары)
+        """
+        speaker = Product.objects.create(
+            name="Колонка Sony",
+            definition="Описание",
+            characteristics={},
+            category=self.speaker.category,
+            price=3000,
+        )
+        ProductSearchIndex.build()
+
+        with self.settings(PRODUCT_SEARCH_MAX_RESULTS=1):
+            products = IndexSearchBackend().search(
+                products=Product.objects.all(), query="колонка"
+            )
+
+        self.assertEqual(list(products), [speaker])
+
+    def test_update(self):
+        """
+        Проверка обновления записей индекса после изменения товара
+        """
+        ProductSearchIndex.build()
+
+        Product.objects.filter(id=self.speaker.id).update(name="Саундбар")
+        ProductSearchIndex.update([self.speaker.id])
+
+        self.assertEqual(ProductSearchIndex.search("саундбар"), {self.speaker.id})
+        self.assertEqual(ProductSearchIndex.search("колонка"), {self.speaker.id})
+        self.assertEqual(ProductSearchIndex.search("наушники"), {self.headphones.id})
+
+    def test_save_schedules_merge(self):
+        """
+        Проверка записи изменений товара в журнал и объединения журнала с индексом фоновой задачей
+        """
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, "task_always_eager", False)
+
+        ProductSearchIndex.build()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.speaker.name = "Саундбар"
+            self.speaker.save()
+
+        self.assertEqual(ProductSearchIndex.search("саундбар"), {self.speaker.id})
+
+        # Журнал уже объединен - повторная задача не перезаписывает индекс
+        self.assertEqual(ProductSearchIndex.merge(), 0)
+
+
+class TestAutocomplete(TestCase):
+    """
+    Проверка подсказок для поисковой строки
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Наушники", image="test.jpg")
+
+        for name, purchases in (("Наушники Sony", 5), ("Наушники JBL", 50)):
+            product = Product.objects.create(
+                name=name,
+                definition="Описание",
+                characteristics={},
+                category=category,
+                price=1000,
+            )
+            Product.objects.filter(id=product.id).update(purchases=purchases)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_suggestions(self):
+        """
+        Проверка порядка подсказок и отсутствия запросов к БД после построения таблицы префиксов
+        (первая таблица строится фоновой задачей, запущенной запросом подсказок)
+        """
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, "task_always_eager", False)
+
+        response = self.client.get(reverse("shop:autocomplete"), {"query": "НАУШ"})
+        titles = [item["title"] for item in response.json()["suggestions"]]
+
+        self.assertEqual(titles, ["Наушники", "Наушники JBL", "Наушники Sony"])
+
+        with self.assertNumQueries(0):
+            suggestions = ProductAutocompleteService.suggest(query="son")
+
+        self.assertEqual([item["title"] for item in suggestions], ["Наушники Sony"])
+
+    def test_rebuild_in_background(self):
+        """
+        Проверка вывода подсказок по текущей таблице до перестроения таблицы фоновой задачей
+        """
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, "task_always_eager", False)
+
+        ProductAutocompleteService.rebuild()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.create(
+                name="Наушники Bose",
+                definition="Описание",
+                characteristics={},
+                category=CategoryProduct.objects.first(),
+                price=1000,
+            )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ProductAutocompleteService.suggest(query="bose"), [])
+
+        for callback in callbacks:
+            callback()
+
+        suggestions = ProductAutocompleteService.suggest(query="bose")
+        self.assertEqual([item["title"] for item in suggestions], ["Наушники Bose"])
+        self.assertFalse(ProductAutocompleteService.rebuild_pending())
+
+
+class TestProductImages(TestCase):
+    """
+    Проверка основного изображения товара и загрузки изображений для карточек
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CategoryProduct.objects.create(
+            title="Ноутбуки", image="test.jpg"
+        )
+
+    def create_product(self, name: str) -> Product:
+        product = Product.objects.create(
+            name=name,
+            definition="Описание",
+            characteristics={},
+            category=self.category,
+            price=1000,
+        )
+
+        for number in range(2):
+            ProductImages.objects.create(
+                title=f"{name} {number}", image=f"products/{name}.jpg", product=product
+            )
+
+        return product
+
+    def main_page_queries(self) -> int:
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("shop:main"))
+
+        self.assertEqual(response.status_code, 200)
+
+        return len(context.captured_queries)
+
+    def test_primary_image(self):
+        """
+        Проверка обновления основного изображения при добавлении и удалении изображений
+        """
+        product = self.create_product(name="Ноутбук")
+        first, second = ProductImages.objects.filter(product=product).order_by("id")
+
+        product.refresh_from_db()
+        self.assertEqual(product.primary_image, first)
+
+        first.delete()
+        product.refresh_from_db()
+        self.assertEqual(product.primary_image, second)
+
+        second.delete()
+        product.refresh_from_db()
+        self.assertIsNone(product.primary_image)
+
+    def test_main_page_queries(self):
+        """
+        Проверка, что кол-во запросов главной страницы не зависит от кол-ва карточек товаров
+        """
+        self.create_product(name="Ноутбук 1")
+        queries = self.main_page_queries()
+
+        for number in range(2, 6):
+            self.create_product(name=f"Ноутбук {number}")
+
+        self.assertEqual(self.main_page_queries(), queries)
+
+    def test_renditions(self):
+        """
+        Проверка создания уменьшенных копий изображения и вывода srcset
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        buffer = BytesIO()
+        Image.new("RGB", (1000, 500), (200, 50, 50)).save(buffer, format="PNG")
+        product = self.create_product(name="Ноутбук")
+
+        with override_settings(MEDIA_ROOT=directory.name):
+            image = ProductImages.objects.create(
+                title="Ноутбук",
+                image=SimpleUploadedFile("laptop.png", buffer.getvalue()),
+                product=product,
+            )
+            renditions = ImageRenditionService.generate(
+                label="app_shop.ProductImages",
+                pk=image.id,
+                field_name="image",
+                kinds=["card", "gallery"],
+            )
+
+            # Ширина копии не больше ширины оригинала
+            self.assertEqual(
+                [width for width, _ in renditions["gallery"]["webp"]], [600, 1000]
+            )
+
+            for width, name in renditions["card"]["jpeg"]:
+                with Image.open(os.path.join(directory.name, name)) as rendition:
+                    self.assertEqual(rendition.size, (width, width // 2))
+
+            image.refresh_from_db()
+            html = Template(
+                '{% load images %}{% responsive_image image.image.url image.image_renditions "card" %}'
+            ).render(Context({"image": image}))
+
+        self.assertEqual(image.image_renditions, renditions)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn(".card-400.", html)
+
+    def test_ingest_images(self):
+        """
+        Проверка массовой загрузки изображений из архива: сопоставление с товарами, дедупликация, ошибки
+        """
+        first = self.create_product(name="Ноутбук Alpha")
+        second = self.create_product(name="Ноутбук Beta")
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        buffer = BytesIO()
+        Image.new("RGB", (3000, 1500), (10, 120, 200)).save(buffer, format="JPEG")
+        archive_path = os.path.join(directory.name, "images.zip")
+
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr(f"{first.id}/front.jpg", buffer.getvalue())
+            archive.writestr("noutbuk-beta/front.jpg", buffer.getvalue())
+            archive.writestr(f"{second.id}_broken.jpg", b"not an image")
+            archive.writestr("unknown/front.jpg", buffer.getvalue())
+
+        with override_settings(MEDIA_ROOT=os.path.join(directory.name, "media")):
+            for _ in range(2):  # Повторная загрузка не создает дублей
+                call_command(
+                    "ingest_images", archive_path, workers=1, stdout=StringIO()
+                )
+
+            images = ProductImages.objects.filter(title="front")
+            self.assertEqual(images.count(), 2)
+            self.assertEqual(len({image.image.name for image in images}), 1)
+
+            with Image.open(images[0].image.path) as image:
+                self.assertEqual(image.size, (2000, 1000))
+
+            # Общий файл удаляется только вместе с последней записью, которая его использует
+            path = images[0].image.path
+
+            for image, exists in zip(list(images), (True, False)):
+                with self.captureOnCommitCallbacks(execute=True):
+                    image.delete()
+
+                self.assertEqual(os.path.exists(path), exists)
+
+        second.refresh_from_db()
+        self.assertEqual(second.primary_image.title, "Ноутбук Beta 0")
+
+
+class TestCatalogImportExport(TestCase):
+    """
+    Проверка потоковой выгрузки и загрузки каталога товаров
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CategoryProduct.objects.create(
+            title="Планшеты", image="test.jpg"
+        )
+        cls.tag = ProductTags.objects.create(name="Хиты")
+        cls.product = Product.objects.create(
+            name="Планшет 1",
+            definition="Описание",
+            characteristics={"Экран": "10 дюймов"},
+            category=cls.category,
+            price=15000,
+            count=500,
+        )
+        cls.product.tags.add(cls.tag)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_export_and_import(self):
+        """
+        Проверка повторной загрузки выгруженного каталога (обновление существующих товаров)
+        """
+        path = os.path.join(self.directory, "catalog.jsonl.gz")
+        self.assertEqual(CatalogExportService.dump(path=path), 1)
+
+        Product.objects.filter(id=self.product.id).update(price=1, count=5)
+        stats = CatalogImportService.load(path=path, batch_size=10)
+
+        self.assertEqual(stats["updated"], 1)
+        self.assertEqual(stats["created"], 0)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, 15000)
+        self.assertFalse(self.product.limited_edition)
+        self.assertEqual(self.product.characteristics, {"Экран": "10 дюймов"})
+        self.assertEqual(list(self.product.tags.all()), [self.tag])
+
+    def test_repeated_import(self):
+        """
+        Проверка повторной загрузки файла с новыми товарами: товары создаются с id из файла, без дубликатов
+        """
+        path = os.path.join(self.directory, "catalog.jsonl")
+        product_id = self.product.id + 100
+
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(
+                json.dumps(
+                    {
+                        "id": product_id,
+                        "name": "Планшет 5",
+                        "category": self.category.slug,
+                        "price": 1000,
+                    }
+                )
+                + "\n"
+            )
+
+        self.assertEqual(CatalogImportService.load(path=path)["created"], 1)
+        self.assertEqual(CatalogImportService.load(path=path)["updated"], 1)
+
+        self.assertEqual(Product.objects.filter(name="Планшет 5").count(), 1)
+        self.assertTrue(Product.objects.filter(id=product_id).exists())
+
+        # Новые товары получают id после загруженных
+        product = Product.objects.create(
+            name="Планшет 6",
+            definition="Описание",
+            characteristics={},
+            category=self.category,
+            price=1000,
+        )
+        self.assertGreater(product.id, product_id)
+
+    def test_import_csv(self):
+        """
+        Проверка загрузки CSV в кодировке windows-1251: новые товары и теги, некорректные записи
+        """
+        path = os.path.join(self.directory, "catalog.csv")
+
+        with open(path, "w", encoding="windows-1251", newline="") as file:
+            file.write(
+                "name,category,tags,price,count,characteristics\n"
+                f'Планшет 2,{self.category.slug},Хиты|Новинки,20000,50,"{{""Цвет"": ""черный""}}"\n'
+                f"Планшет 3,{self.category.slug},,-5,10,\n"
+                "Планшет 4,unknown,,100,10,\n"
+                f"Планшет 5,{self.category.slug},,100,10,{{bad json\n"
+            )
+
+        stats = CatalogImportService.load(
+            path=path, file_format="csv", encoding="windows-1251", batch_size=2
+        )
+
+        self.assertEqual(stats["processed"], 4)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["invalid"], 3)
+
+        product = Product.objects.get(name="Планшет 2")
+        self.assertTrue(product.limited_edition)
+        self.assertEqual(product.characteristics, {"Цвет": "черный"})
+        self.assertEqual(
+            sorted(product.tags.values_list("name", flat=True)), ["Новинки", "Хиты"]
+        )
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from app.app_shop.models.cart_and_orders import Order
+from app.app_shop.services.order_events import OrderEventsApplication
+
+
+# Redis недоступен: отправляется только текущий статус заказа
+@override_settings(ORDER_EVENTS_REDIS_URL="redis://127.0.0.1:1/0")
+class TestOrderEvents(TransactionTestCase):
+    """
+    Проверка потока событий о статусе заказа
+    (без транзакции теста: поток событий закрывает устаревшие соединения с БД)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="password")
+        self.order = Order.objects.create(user=self.user, status=4)
+        self.url = reverse("shop:order_events", kwargs={"order_id": self.order.id})
+
+        OrderEventsApplication._client = None
+        self.addCleanup(setattr, OrderEventsApplication, "_client", None)
+
+    def events(self, body: bytes) -> list:
+        return [
+            json.loads(line[len("data: ") :])
+            for line in body.decode().splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def test_view(self):
+        """
+        Проверка текущего статуса заказа при запуске через WSGI (только для покупателя)
+        """
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["Content-Type"], "text/event-stream; charset=utf-8")
+        self.assertEqual(
+            self.events(response.content),
+            [
+                {
+                    "order_id": self.order.id,
+                    "status": 4,
+                    "status_display": "Оплачен",
+                    "final": True,
+                }
+            ],
+        )
+
+    def test_asgi(self):
+        """
+        Проверка потока событий ASGI-приложения: поток закрывается после итогового статуса,
+        остальные запросы передаются приложению Django
+        """
+        self.client.force_login(self.user)
+        cookie = f"sessionid={self.client.session.session_key}".encode()
+        messages, passed = [], []
+
+        async def django_application(scope, receive, send):
+            passed.append(scope["path"])
+
+        async def receive():
+            # Клиент не отключается
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        application = OrderEventsApplication(django_application)
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": self.url,
+            "headers": [(b"cookie", cookie)],
+        }
+
+        async_to_sync(application)(scope, receive, send)
+        async_to_sync(application)(scope | {"path": "/"}, receive, send)
+
+        self.assertEqual(messages[0]["status"], 200)
+        self.assertFalse(messages[-1].get("more_body"))
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        self.assertTrue(self.events(body)[0]["final"])
+        self.assertEqual(passed, ["/"])
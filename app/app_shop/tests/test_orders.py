@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from app.app_shop.models.cart_and_orders import Order, PurchasedProduct
+from app.app_shop.models.products import CategoryProduct, Product
+from app.app_shop.services.orders import RegistrationOrderService
+
+
+class TestOrderTotals(TestCase):
+    """
+    Проверка сохраненной стоимости заказа
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=1000,
+        )
+        cls.user = User.objects.create_user(username="buyer", password="password")
+
+    def create_order(self, delivery: int) -> Order:
+        order = Order.objects.create(user=self.user, delivery=delivery)
+        PurchasedProduct.objects.create(
+            order=order, product=self.product, count=2, price=1500
+        )
+        return order
+
+    def test_save_totals(self):
+        """
+        Проверка расчета стоимости заказа без запросов к товарам заказа при последующем чтении
+        """
+        order = self.create_order(delivery=2)
+        RegistrationOrderService.save_totals(order=order, items_total=1500)
+
+        order = Order.objects.get(id=order.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(order.order_cost, 1500)
+
+        self.assertEqual((order.delivery_total, order.grand_total), (700, 2200))
+
+    def test_fallback_and_backfill(self):
+        """
+        Проверка подсчета стоимости для заказов без сохраненной стоимости и их заполнения командой
+        """
+        order = self.create_order(delivery=1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(order.order_cost, 1500)
+
+        call_command("backfill_order_totals", stdout=StringIO())
+        order.refresh_from_db()
+
+        self.assertEqual(
+            (order.items_total, order.delivery_total, order.grand_total),
+            (1500, 200, 1700),
+        )
@@ -0,0 +1,293 @@
+import json
+import threading
+
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.megano.celery import app
+from app.app_shop.models.cart_and_orders import (
+    Order,
+    PaymentErrors,
+    PurchasedProduct,
+)
+from app.app_shop.models.products import CategoryProduct, Product
+from app.app_shop.services.payment_errors import PaymentErrorCatalog
+from app.app_shop.services.payment_gateways.simulator import PaymentSimulator, sign
+from app.app_shop.services.stock import StockReservationService
+from app.app_shop.tasks import confirm_payment, confirm_stale_payments, payment
+
+
+class TestPaymentTasks(TestCase):
+    """
+    Проверка оплаты заказа задачами без ожидания в процессе воркера
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=1000,
+            count=3,
+        )
+        cls.user = User.objects.create_user(username="buyer", password="password")
+        PaymentErrors.objects.create(title="Ошибка", description="Описание")
+
+    def setUp(self):
+        # Задачи выполняются сразу, без брокера (в т.ч. отложенные)
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, "task_always_eager", False)
+
+        self.order = Order.objects.create(user=self.user)
+        StockReservationService.reserve(order=self.order, items={self.product.id: 2})
+
+    def status(self) -> int:
+        return Order.objects.values_list("status", flat=True).get(id=self.order.id)
+
+    def test_success(self):
+        """
+        Проверка успешной оплаты и повторной обработки того же события
+        """
+        self.assertTrue(payment.delay(order_id=self.order.id, cart_number=12).get())
+        self.assertEqual(self.status(), 4)
+
+        # Повторный запуск не меняет оплаченный заказ
+        self.assertFalse(payment(order_id=self.order.id, cart_number=11))
+        self.assertTrue(confirm_payment(order_id=self.order.id))
+        self.assertEqual(self.status(), 4)
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.count, self.product.purchases), (1, 2))
+
+    def test_repeated_run_after_payment(self):
+        """
+        Проверка повторного запуска оплаты оплаченного заказа (повторная отправка формы, повторная
+        доставка задачи): товары не резервируются повторно
+        """
+        PurchasedProduct.objects.create(
+            order=self.order, product=self.product, count=2, price=1000
+        )
+        self.assertTrue(payment(order_id=self.order.id, cart_number=12))
+        Product.objects.filter(id=self.product.id).update(count=10)
+
+        self.assertFalse(payment(order_id=self.order.id, cart_number=12))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.count, 10)
+        self.assertFalse(self.order.reservations.filter(status=1).exists())
+        self.assertEqual(self.status(), 4)
+
+    def test_failure(self):
+        """
+        Проверка неуспешной оплаты: статус "Не оплачен" и сообщение об ошибке
+        """
+        payment.delay(order_id=self.order.id, cart_number=11)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 2)
+        self.assertIsNotNone(self.order.error_message)
+
+    def test_repeated_run(self):
+        """
+        Проверка повторного запуска оплаты после сбоя воркера: заказ уже в статусе "Подтверждение оплаты",
+        подтверждение ставится заново
+        """
+        Order.objects.filter(id=self.order.id).update(
+            status=3, payment_transaction=f"parity-{self.order.id}-ok"
+        )
+
+        self.assertTrue(payment(order_id=self.order.id, cart_number=12))
+        self.assertEqual(self.status(), 4)
+
+    def test_stale_payment(self):
+        """
+        Проверка подтверждения зависшей оплаты: платеж не создан, заказ переводится в статус "Не оплачен"
+        """
+        Order.objects.filter(id=self.order.id).update(
+            status=3, payment_updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        with self.settings(PAYMENT_STATUS_MAX_RETRIES=0):
+            self.assertEqual(confirm_stale_payments(), 1)
+
+        self.assertEqual(self.status(), 2)
+        # Недавно проверенный заказ повторно не ставится
+        Order.objects.filter(id=self.order.id).update(status=3)
+        self.assertEqual(confirm_stale_payments(), 0)
+
+
+class TestSimulatorGateway(TestCase):
+    """
+    Проверка оплаты через HTTP-имитатор платежного сервиса и уведомлений о платежах
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.product = Product.objects.create(
+            name="Ноутбук",
+            definition="Описание",
+            characteristics={},
+            category=category,
+            price=1000,
+            count=3,
+        )
+        cls.user = User.objects.create_user(username="buyer", password="password")
+        PaymentErrors.objects.create(title="Ошибка", description="Описание")
+
+    def setUp(self):
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, "task_always_eager", False)
+
+        self.simulator = PaymentSimulator(
+            latency_median=0, decline_rate=0, processing_time=0, secret="secret"
+        )
+        server = self.simulator.server(host="127.0.0.1", port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        gateway = {
+            "BACKEND": "app.app_shop.services.payment_gateways.simulator.SimulatorGateway",
+            "OPTIONS": {
+                "url": f"http://127.0.0.1:{server.server_port}",
+                "secret": "secret",
+            },
+        }
+        settings = override_settings(
+            PAYMENT_GATEWAY=gateway,
+            PAYMENT_CONFIRMATION_DELAY=0,
+            PAYMENT_STATUS_MAX_RETRIES=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.order = Order.objects.create(user=self.user, grand_total=2000)
+        StockReservationService.reserve(order=self.order, items={self.product.id: 2})
+
+    def test_payment(self):
+        """
+        Проверка авторизации и списания платежа
+        """
+        self.assertTrue(payment(order_id=self.order.id, cart_number=11))
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 4)
+        transaction = self.simulator.transactions[self.order.payment_transaction]
+        self.assertEqual(transaction["amount"], 2000)
+        self.assertTrue(transaction["captured"])
+
+    def test_pending(self):
+        """
+        Проверка платежа, не обработанного за settings.PAYMENT_STATUS_MAX_RETRIES запросов статуса
+        """
+        self.simulator.processing_time = 60
+
+        self.assertTrue(payment(order_id=self.order.id, cart_number=12))
+        self.assertEqual(
+            Order.objects.values_list("status", flat=True).get(id=self.order.id), 2
+        )
+
+    def test_void(self):
+        """
+        Проверка отмены авторизованного, но не списанного платежа после settings.PAYMENT_STATUS_MAX_RETRIES
+        запросов статуса: блокировка средств снимается, заказ не оплачен
+        """
+        # Платежный сервис не списывает авторизованные платежи
+        self.simulator.capture = self.simulator.state
+
+        self.assertTrue(payment(order_id=self.order.id, cart_number=12))
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 2)
+        transaction = self.simulator.transactions[self.order.payment_transaction]
+        self.assertTrue(transaction["voided"])
+        self.assertEqual(self.simulator.state(transaction)["status"], "voided")
+
+    def test_gateway_unavailable(self):
+        """
+        Проверка недоступности платежного сервиса: заказ не оплачен
+        """
+        self.simulator.error_rate = 1
+
+        self.assertFalse(payment(order_id=self.order.id, cart_number=12))
+        self.assertEqual(
+            Order.objects.values_list("status", flat=True).get(id=self.order.id), 2
+        )
+
+    def test_webhook(self):
+        """
+        Проверка подписи уведомления о платеже
+        """
+        Order.objects.filter(id=self.order.id).update(
+            status=3, payment_transaction="unknown"
+        )
+        body = json.dumps({"id": "unknown", "status": "authorized"}).encode()
+        url = reverse("shop:payment_webhook")
+
+        response = self.client.post(
+            url, body, content_type="application/json", HTTP_X_SIGNATURE="wrong"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        # Статус платежа запрашивается у платежного сервиса (платежа нет - заказ не оплачен)
+        response = self.client.post(
+            url,
+            body,
+            content_type="application/json",
+            HTTP_X_SIGNATURE=sign(body, "secret"),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Order.objects.values_list("status", flat=True).get(id=self.order.id), 2
+        )
+
+
+class TestPaymentErrorCatalog(TestCase):
+    """
+    Проверка выбора сообщений об ошибках оплаты из справочника в памяти процесса
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.generic = PaymentErrors.objects.create(title="Ошибка", description="")
+        cls.declined = PaymentErrors.objects.create(
+            title="Платеж отклонен", description="", code="card_declined"
+        )
+
+    def setUp(self):
+        # Изменения справочника в других тестах отменены откатом транзакции, а не через save()
+        PaymentErrorCatalog.invalidate()
+
+    def test_pick(self):
+        """
+        Проверка выбора сообщения по коду ошибки без запросов к БД
+        """
+        PaymentErrorCatalog.pick()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                PaymentErrorCatalog.pick("card_declined").id, self.declined.id
+            )
+            self.assertEqual(PaymentErrorCatalog.pick("unknown").id, self.generic.id)
+            self.assertEqual(PaymentErrorCatalog.pick().id, self.generic.id)
+
+    def test_invalidate(self):
+        """
+        Проверка обновления справочника после изменения сообщений
+        """
+        PaymentErrorCatalog.pick()
+        self.generic.code = "timeout"
+        self.generic.save()
+
+        self.assertEqual(PaymentErrorCatalog.pick("timeout").title, "Ошибка")
+
+        self.declined.delete()
+        self.generic.delete()
+        self.assertIsNone(PaymentErrorCatalog.pick("card_declined"))
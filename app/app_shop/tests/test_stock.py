@@ -0,0 +1,99 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from app.app_shop.models.cart_and_orders import Order, StockReservation
+from app.app_shop.models.products import CategoryProduct, Product
+from app.app_shop.services.stock import OutOfStockError, StockReservationService
+
+
+class TestStockReservation(TestCase):
+    """
+    Проверка резервирования товаров под заказ
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryProduct.objects.create(title="Ноутбуки", image="test.jpg")
+        cls.products = [
+            Product.objects.create(
+                name=f"Ноутбук {number}",
+                definition="Описание",
+                characteristics={},
+                category=category,
+                price=1000,
+                count=5,
+            )
+            for number in range(2)
+        ]
+        cls.user = User.objects.create_user(username="buyer", password="password")
+
+    def counts(self):
+        return list(
+            Product.objects.filter(id__in=[product.id for product in self.products])
+            .order_by("id")
+            .values_list("count", "purchases")
+        )
+
+    def reserve(self, first: int, second: int) -> Order:
+        order = Order.objects.create(user=self.user)
+        StockReservationService.reserve(
+            order=order,
+            items={self.products[0].id: first, self.products[1].id: second},
+        )
+        return order
+
+    def test_reserve_and_complete(self):
+        """
+        Проверка списания товаров со склада и увеличения кол-ва покупок при оплате
+        """
+        order = self.reserve(first=2, second=5)
+        self.assertEqual(self.counts(), [(3, 0), (0, 0)])
+
+        StockReservationService.complete(order_id=order.id)
+        StockReservationService.complete(order_id=order.id)
+        self.assertEqual(self.counts(), [(3, 2), (0, 5)])
+
+    def test_out_of_stock(self):
+        """
+        Проверка, что при нехватке одного из товаров ничего не списывается
+        """
+        with self.assertRaises(OutOfStockError):
+            self.reserve(first=1, second=6)
+
+        self.assertEqual(self.counts(), [(5, 0), (5, 0)])
+        self.assertFalse(StockReservation.objects.exists())
+
+    @override_settings(STOCK_RESERVATION_TIMEOUT=0)
+    def test_release_expired(self):
+        """
+        Проверка возврата товаров на склад по истечении срока резерва
+        """
+        order = self.reserve(first=2, second=1)
+
+        self.assertEqual(StockReservationService.release_expired(), 1)
+        self.assertEqual(self.counts(), [(5, 0), (5, 0)])
+        self.assertEqual(StockReservationService.release(order_id=order.id), 0)
+
+        # Повторный резерв перед оплатой
+        self.assertTrue(StockReservationService.ensure(order))
+
+    @override_settings(STOCK_RESERVATION_TIMEOUT=0)
+    def test_release_rechecks_order(self):
+        """
+        Проверка, что резерв заказа, перешедшего к оплате после выборки просроченных резервов, не возвращается,
+        а перед оплатой просроченный резерв продлевается
+        """
+        order = self.reserve(first=2, second=1)
+        Order.objects.filter(id=order.id).update(status=3)
+
+        self.assertEqual(StockReservationService.release(order_id=order.id), 0)
+        self.assertEqual(self.counts(), [(3, 0), (4, 0)])
+
+        Order.objects.filter(id=order.id).update(status=2)
+
+        with override_settings(STOCK_RESERVATION_TIMEOUT=600):
+            self.assertTrue(StockReservationService.ensure(order))
+
+        self.assertEqual(StockReservationService.release_expired(), 0)
+        self.assertEqual(self.counts(), [(3, 0), (4, 0)])
+        self.assertEqual(StockReservation.objects.filter(status=1).count(), 2)
@@ -21,14 +21,17 @@ from .views.request import (
     delete_product,
     load_comments,
     add_product,
+    autocomplete,
 )
 
 from .views.cart_and_order import (
     ShoppingCartView,
     OrderRegistrationView,
     OrderInformationView,
+    OrderEventsView,
     HistoryOrderView,
     PaymentView,
+    PaymentWebhookView,
     ProgressPaymentView,
 )
 
@@ -84,6 +87,8 @@ urlpatterns = [
                 path("<int:pk>", ProductDetailView.as_view(), name="product_detail"),
                 # Загрузка доп.комментария (Ajax-запрос)
                 path("load_comments/", load_comments, name="load_comments"),
+                # Подсказки для поисковой строки (Ajax-запрос)
+                path("autocomplete/", autocomplete, name="autocomplete"),
                 path(
                     "add_product/",
                     include(
@@ -159,6 +164,18 @@ urlpatterns = [
                     cache_page(60 * config.caching_time)(ProgressPaymentView.as_view()),
                     name="progress_payment",
                 ),
+                # Поток событий о статусе заказа (Server-Sent Events)
+                path(
+                    "events/<int:order_id>/",
+                    OrderEventsView.as_view(),
+                    name="order_events",
+                ),
+                # Уведомления платежного сервиса
+                path(
+                    "webhook/",
+                    PaymentWebhookView.as_view(),
+                    name="payment_webhook",
+                ),
             ]
         ),
     ),
@@ -1,7 +1,9 @@
 import logging
 
 from typing import Dict
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 from django.template.response import TemplateResponse
 from django.urls import reverse
 from django.views.generic import View, TemplateView, ListView, DetailView
@@ -13,7 +15,10 @@ from app.app_shop.forms import MakingOrderForm
 from app.app_shop.services.orders import RegistrationOrderService
 from app.app_shop.services.shop_cart.logic import CartProductsListService
 from app.app_shop.services.shop_cart.authenticated import ProductsCartUserService
+from app.app_shop.services.order_events import OrderStatusChannel
 from app.app_shop.services.orders_payment import PaymentService
+from app.app_shop.services.payment_gateways import WebhookError
+from app.app_shop.services.stock import OutOfStockError
 
 
 logger = logging.getLogger(__name__)
@@ -78,7 +83,16 @@ class OrderRegistrationView(TemplateView):
             logger.debug(f"Данные формы валидны: {form.cleaned_data}")
 
             # Регистрация заказа
-            order = RegistrationOrderService.create_order(request=request, form=form)
+            try:
+                order = RegistrationOrderService.create_order(
+                    request=request, form=form
+                )
+
+            except OutOfStockError as exc:
+                logger.warning(f"Заказ не оформлен: {exc}")
+                return HttpResponse(
+                    f"{exc}. Измените кол-во товаров в корзине и повторите заказ."
+                )
 
             if order:
                 logger.info("Заказ успешно оформлен")
@@ -129,10 +143,54 @@ class PaymentView(TemplateView):
         return redirect(reverse("shop:progress_payment", kwargs={"order_id": order_id}))
 
 
+@method_decorator(csrf_exempt, name="dispatch")
+class PaymentWebhookView(View):
+    """
+    Представление для приема уведомлений платежного сервиса о результате авторизации платежа.
+    Уведомление проверяется адаптером платежного сервиса (подпись), статус платежа затем
+    запрашивается задачей подтверждения оплаты, поэтому повторные уведомления ничего не меняют.
+    """
+
+    def post(self, request):
+        try:
+            order_id = PaymentService.webhook(
+                body=request.body, headers=request.headers
+            )
+
+        except WebhookError as exc:
+            logger.warning(f"Уведомление платежного сервиса отклонено: {exc}")
+            return HttpResponseBadRequest()
+
+        return HttpResponse(status=200 if order_id else 202)
+
+
+class OrderEventsView(View):
+    """
+    Представление для потока событий о статусе заказа при запуске через WSGI: отправляется текущий статус,
+    после чего браузер переподключается через 2 сек. При запуске через ASGI (megano/asgi.py) запросы
+    по этому адресу обрабатывает OrderEventsApplication - соединение удерживается до итогового статуса.
+    """
+
+    def get(self, request, **kwargs):
+        order_id = kwargs["order_id"]
+        status = OrderStatusChannel.status(order_id=order_id, user_id=request.user.id)
+
+        if status is None:
+            raise Http404
+
+        response = HttpResponse(
+            b"retry: 2000\n" + OrderStatusChannel.event(order_id, status),
+            content_type="text/event-stream; charset=utf-8",
+        )
+        response["Cache-Control"] = "no-cache"
+
+        return response
+
+
 class ProgressPaymentView(View):
     """
-    Представление для вывода заглушки, имитирующей ожидание от сервиса оплаты.
-    Автоматический редирект на страницу заказа через 4 сек при помощи JS-скрипта.
+    Представление для вывода страницы ожидания оплаты.
+    Страница подписывается на поток событий о статусе заказа и переходит к заказу после итогового статуса.
     """
 
     def get(self, request, **kwargs):
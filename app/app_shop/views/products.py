@@ -1,19 +1,25 @@
 import logging
 
+from django.conf import settings
 from django.db.models import QuerySet
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse
 from django.views.generic import ListView, DetailView
 from django.shortcuts import render
 from django.views.generic.edit import FormMixin
-from django.core.cache import cache
 
-from app.config.admin import config
+from app.config.utils.configuration import get_config
 from app.app_shop.models.products import Product
 from app.app_shop.forms import CommentProductForm
+from app.app_shop.services.caching import CachedQueryService
 from app.app_shop.services.products.output_products import ProductsListService
 from app.app_shop.services.products.detail_page import ProductCommentsService
+from app.app_shop.services.products.images import ProductImageService
 from app.app_shop.services.products.products_list.filter import ProductFilterService
+from app.app_shop.services.products.products_list.facets import ProductFacetService
+from app.app_shop.services.products.products_list.pagination import (
+    KeysetPaginationService,
+)
 from app.app_shop.services.products.products_list.sorting import ProductSortService
 from app.app_shop.services.shop_cart.logic import CartProductsListService
 from app.app_shop.services.products.search import ProductsListSearchService
@@ -36,6 +42,31 @@ class BaseListView(ListView):
     template_name = "../templates/app_shop/catalog.html"
     context_object_name = "products"
     paginate_by = 8
+    # Постраничный вывод по ключу (без OFFSET и COUNT) вместо постраничного вывода по номеру страницы
+    keyset_pagination = settings.CATALOG_KEYSET_PAGINATION
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Постраничный вывод товаров по ключу (если включен), иначе - стандартный вывод по номеру страницы
+        """
+        if not self.keyset_pagination:
+            return super().paginate_queryset(queryset, page_size)
+
+        page = KeysetPaginationService.paginate(
+            products=queryset,
+            filters=self.filter_parameters,
+            cursor=self.request.GET.get("cursor", ""),
+            per_page=page_size,
+            key=self.get_sort_key(),
+        )
+
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_sort_key(self):
+        """
+        Поле и направление сортировки товаров (используется при постраничном выводе по ключу)
+        """
+        return ProductSortService.sort_key(filters=self.filter_parameters)
 
     def get_context_data(self, **kwargs):
         """
@@ -47,6 +78,10 @@ class BaseListView(ListView):
             filter_parameters=self.filter_parameters,
             request=self.request,
         )
+        context["facets"] = self.facets
+
+        # Изображения для всех карточек страницы одним запросом (если не загружены вместе с товарами)
+        ProductImageService.attach(context["products"])
 
         return context
 
@@ -77,6 +112,11 @@ class ProductsListView(BaseListView):
             products=products, filters=self.filter_parameters
         )
 
+        # Фасеты по отфильтрованной выборке (до сортировки и пагинации)
+        self.facets = ProductFacetService.output(
+            products=products, filters=self.filter_parameters
+        )
+
         # Сортировка по переданным параметрам
         products = ProductSortService.output(
             products=products, filters=self.filter_parameters
@@ -90,6 +130,12 @@ class ProductsLisSearchView(BaseListView):
     Представление для вывода найденных товаров по фразе в поисковой строке
     """
 
+    def get_sort_key(self):
+        """
+        Поле и направление сортировки результатов поиска (по умолчанию - по релевантности)
+        """
+        return ProductsListSearchService.sort_key(filters=self.filter_parameters)
+
     def get_queryset(self) -> QuerySet:
         """
         Вывод товаров, найденных по поисковой фразе
@@ -110,6 +156,11 @@ class ProductsLisSearchView(BaseListView):
             products=products, filters=self.filter_parameters
         )
 
+        # Фасеты по отфильтрованной выборке (до сортировки и пагинации)
+        self.facets = ProductFacetService.output(
+            products=products, filters=self.filter_parameters
+        )
+
         # Сортировка по переданным параметрам
         products = ProductSortService.output(
             products=products, filters=self.filter_parameters
@@ -132,13 +183,17 @@ class ProductDetailView(DetailView, FormMixin):
         Вывод детальной страницы товара с комментариями
         """
         id = self.kwargs["pk"]  # id товара из URL
+        config = get_config()
 
         # Возвращаем объект из кэша / кэшируем объект
         # (кэш товара автоматически очищается в model.save() при редактировании товара)
-        self.object = cache.get_or_set(
-            f"product_{id}",
-            Product.objects.prefetch_related("images").get(id=id),
-            60 * config.caching_time,
+        self.object = CachedQueryService.get_or_load(
+            key=f"product_{id}",
+            loader=lambda: Product.objects.select_related("primary_image")
+            .prefetch_related("images")
+            .get(id=id),
+            timeout=60 * config.caching_time,
+            many=False,
         )
 
         context = self.get_context_data(object=self.object)
@@ -152,7 +207,7 @@ class ProductDetailView(DetailView, FormMixin):
 
         context["cart_products"] = cart_products
         context["comments"] = comments[:1]
-        context["total_comments"] = comments.count()
+        context["total_comments"] = len(comments)
 
         # Добавление записи в истории просмотра авторизованного пользователя
         if request.user.is_authenticated:
@@ -196,7 +251,7 @@ class ProductDetailView(DetailView, FormMixin):
                 context={
                     "object": product,
                     "comments": comments,
-                    "total_comments": comments.count(),
+                    "total_comments": len(comments),
                     "form": form,
                 },
             )
@@ -4,6 +4,7 @@ from django.http import HttpResponseRedirect, JsonResponse
 from django.urls import reverse
 from django.shortcuts import redirect
 
+from app.app_shop.services.products.autocomplete import ProductAutocompleteService
 from app.app_shop.services.products.detail_page import ProductCommentsService
 from app.app_shop.services.shop_cart.logic import CartProductsService
 
@@ -21,6 +22,16 @@ def load_comments(request):
     return JsonResponse(data=data)
 
 
+def autocomplete(request):
+    """
+    Обработка Ajax-запроса на подсказки для поисковой строки (по мере ввода текста)
+    """
+    suggestions = ProductAutocompleteService.suggest(query=request.GET.get("query", ""))
+    data = {"suggestions": suggestions}
+
+    return JsonResponse(data=data)
+
+
 def add_product(request):
     """
     Обработка Ajax-запроса на добавление товара в корзину
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:19
+
+from django.db import migrations
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app_user", "0008_alter_profile_phone_number"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="avatar_renditions",
+            field=jsonfield.fields.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
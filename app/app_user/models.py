@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from jsonfield import JSONField
 
+from app.app_shop.services.renditions import ImageRenditionService
 from app.app_user.utils.models.saving_files import save_avatar
 from app.app_user.utils.models.output import output_name
 
@@ -27,6 +29,9 @@ class Profile(models.Model):
     avatar = models.ImageField(
         upload_to=save_avatar, blank=True, null=True, verbose_name="Аватар"
     )
+    # Уменьшенные копии аватара (создаются фоновой задачей, services.renditions)
+    avatar_renditions = JSONField(default=dict, blank=True, editable=False)
+    RENDITIONS = {"avatar": ("avatar",)}  # Поле изображения - назначения копий
     deleted = models.BooleanField(
         choices=STATUS_CHOICES, default=False, verbose_name="Статус"
     )  # Мягкое удаление
@@ -36,6 +41,13 @@ class Profile(models.Model):
         verbose_name = "Профиль"
         verbose_name_plural = "Учетные записи"
 
+    def save(self, *args, **kwargs):
+        """
+        Сохранение профайла с созданием уменьшенных копий нового аватара
+        """
+        super(Profile, self).save(*args, **kwargs)
+        ImageRenditionService.schedule(self)
+
     def __str__(self):
         return output_name(self)
 
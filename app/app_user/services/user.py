@@ -1,17 +1,15 @@
 import logging
 from typing import Tuple, Any
 
-from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.http import HttpRequest, BadHeaderError
 from django.db import IntegrityError, transaction
-from django.core.mail import send_mail, BadHeaderError
 
 from app.app_user.models import Profile
 from app.app_user.forms import RegisterUserForm, EmailForm, AuthUserForm
 from app.app_user.utils.save_new_user import save_username, cleaned_phone_data
 from app.app_user.utils.check_users import check_for_email
-from app.app_user.utils.password_recovery import password_generation
+from app.app_user.tasks import send_new_password
 from app.app_shop.services.shop_cart.logic import CartProductsService
 
 
@@ -135,7 +133,6 @@ class UserRegistrationService:
         @return: сообщение об успешной/неуспешной отправке инструкций на указанный Email
         """
         _MESSAGE = "Новый пароль выслан на указанный Email"
-        _ERROR_MESSAGE = "При отправке Email произошла ошибка! Попробуйте позже..."
         _ERROR_MESSAGE_NOT_USER = "Пользователь с таким Email не найден!"
 
         logger.debug("Восстановление пароля пользователя")
@@ -144,26 +141,11 @@ class UserRegistrationService:
         user = check_for_email(email)
 
         if user:
-            new_password = password_generation()
-            user.set_password(new_password)
-            user.save()
-            logger.info(
-                f"Пароль для пользователя username: {user.username} id: {user.id} успешно изменен"
-            )
-
-            try:
-                send_mail(
-                    f"{email} от Megano",
-                    f"Новый пароль - {new_password}",
-                    settings.DEFAULT_FROM_EMAIL,
-                    [email],
-                )
-
-                logger.info("Сообщение в новым паролем успешно отправлено пользователю")
-                return _MESSAGE, ""
+            # Смена пароля и отправка письма в фоне (очередь notifications)
+            send_new_password.delay(user_id=user.id)
+            logger.info(f"Отправка нового пароля пользователю id: {user.id} запущена")
 
-            except BadHeaderError:
-                return "", _ERROR_MESSAGE
+            return _MESSAGE, ""
 
         else:
             logger.warning(f"Пользователь с Email: {email} не найден")
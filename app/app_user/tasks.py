@@ -0,0 +1,70 @@
+import logging
+import secrets
+
+from smtplib import SMTPException
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.mail import BadHeaderError, send_mail
+from django.db import DatabaseError
+
+from app.app_user.utils.password_recovery import password_from_token
+
+
+logger = logging.getLogger(__name__)
+
+# Время хранения токена нового пароля до смены пароля (сек), больше времени всех повторов задачи
+_PENDING_PASSWORD_TIMEOUT = 60 * 60
+
+
+@shared_task(
+    autoretry_for=(SMTPException, OSError, DatabaseError),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5},
+    soft_time_limit=30,
+    time_limit=60,
+)
+def send_new_password(user_id: int) -> bool:
+    """
+    Восстановление пароля: отправка нового пароля на Email и смена пароля пользователя после отправки
+    (пароль создается в задаче и не передается через брокер сообщений). До смены пароля в кэше хранится
+    только случайный токен, из которого пароль получается с SECRET_KEY (password_from_token), поэтому повторы
+    задачи отправляют тот же пароль, а при ошибках отправки старый пароль действует.
+
+    @param user_id: id пользователя
+    @return: True - письмо отправлено, иначе False
+    """
+    user = User.objects.filter(id=user_id).first()
+
+    if user is None:
+        logger.error(f"Пользователь id: {user_id} не найден")
+        return False
+
+    key = f"new_password_token_{user_id}"
+    cache.add(key, secrets.token_hex(16), timeout=_PENDING_PASSWORD_TIMEOUT)
+    new_password = password_from_token(cache.get(key) or secrets.token_hex(16))
+
+    try:
+        send_mail(
+            f"{user.email} от Megano",
+            f"Новый пароль - {new_password}",
+            settings.DEFAULT_FROM_EMAIL,
+            [user.email],
+        )
+
+    except BadHeaderError:
+        logger.error(f"Некорректный Email пользователя id: {user_id}")
+        cache.delete(key)
+        return False
+
+    logger.info("Сообщение в новым паролем успешно отправлено пользователю")
+
+    user.set_password(new_password)
+    user.save(update_fields=["password"])
+    cache.delete(key)
+    logger.info(
+        f"Пароль для пользователя username: {user.username} id: {user.id} успешно изменен"
+    )
+
+    return True
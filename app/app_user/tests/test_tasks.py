@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from app.app_user.tasks import send_new_password
+from app.app_user.utils.password_recovery import password_from_token
+
+
+class TestPasswordRecovery(TestCase):
+    """
+    Проверка восстановления пароля в фоновой задаче
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_send_new_password(self):
+        """
+        Проверка смены пароля и отправки письма с новым паролем
+        """
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="password"
+        )
+
+        self.assertTrue(send_new_password(user_id=user.id))
+
+        user.refresh_from_db()
+        self.assertFalse(user.check_password("password"))
+        self.assertEqual(mail.outbox[0].to, ["buyer@example.com"])
+        new_password = mail.outbox[0].body.split(" - ")[-1]
+        self.assertTrue(user.check_password(new_password))
+
+    def test_send_failure(self):
+        """
+        Проверка ошибки отправки письма: пароль не меняется, повтор отправляет тот же новый пароль
+        """
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="password"
+        )
+
+        # SMTP-сервер недоступен
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=1,
+        ):
+            with self.assertRaises(OSError):
+                send_new_password.run(user_id=user.id)
+
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("password"))
+        # В кэше хранится только токен, пароль получается из него с секретным ключом
+        token = cache.get(f"new_password_token_{user.id}")
+        failed_password = password_from_token(token)
+        self.assertNotEqual(token, failed_password)
+
+        self.assertTrue(send_new_password.run(user_id=user.id))
+
+        user.refresh_from_db()
+        self.assertEqual(mail.outbox[0].body.split(" - ")[-1], failed_password)
+        self.assertTrue(user.check_password(failed_password))
@@ -2,6 +2,8 @@ import string
 import secrets
 import logging
 
+from django.utils.crypto import salted_hmac
+
 
 logger = logging.getLogger(__name__)
 
@@ -18,3 +20,24 @@ def password_generation() -> str:
     logger.info(f"Сгенерирован новый случайный пароль")
 
     return new_password
+
+
+def password_from_token(token: str) -> str:
+    """
+    Функция для получения 8-ми значного пароля из одноразового токена (HMAC с SECRET_KEY): один токен
+    всегда дает один пароль, а по токену без секретного ключа пароль получить нельзя
+
+    @param token: случайный одноразовый токен
+    @return: строка - пароль
+    """
+    alphabet = string.ascii_letters + string.digits
+    number = int.from_bytes(
+        salted_hmac("app_user.password_recovery", token).digest(), "big"
+    )
+    new_password = ""
+
+    for i in range(8):
+        number, index = divmod(number, len(alphabet))
+        new_password += alphabet[index]
+
+    return new_password
@@ -2,9 +2,6 @@ from django.contrib import admin
 from solo.admin import SingletonModelAdmin
 
 from app.config.models import SiteConfiguration
-from app.config.utils.configuration import get_config
-
-config = get_config()
 
 
 @admin.register(SiteConfiguration)
@@ -3,7 +3,6 @@ import logging
 from django.core.validators import MaxValueValidator
 from django.db import models
 from solo.models import SingletonModel
-from functools import lru_cache
 
 from app.config.utils.saving_fales import saving_logo
 from app.app_shop.models.products import CategoryProduct
@@ -58,19 +57,29 @@ class SiteConfiguration(SingletonModel):
         return "Конфигурация сайта"
 
     @classmethod
-    @lru_cache(maxsize=1)  # Кэширование модели при первом запросе
     def get_solo(cls):
         """
-        Создание объекта
+        Получение объекта настроек (используется тегом get_solo в шаблонах) через общий слой доступа к настройкам
         """
-        try:
-            return super().get_solo()
-        except:
-            return cls()
+        # Импорт внутри метода, т.к. модуль настроек сам импортирует модель
+        from app.config.utils.configuration import get_config
+
+        return get_config()
 
     def save(self, *args, **kwargs):
+        """
+        Сохранение настроек и смена версии настроек для перезагрузки во всех процессах
+        """
+        from app.config.utils.configuration import bump_config_version
+
         super().save(*args, **kwargs)
-        self.get_solo.cache_clear()  # Очистка кэша при внесении изменений
+        bump_config_version()
+
+    def delete(self, *args, **kwargs):
+        from app.config.utils.configuration import bump_config_version
+
+        super().delete(*args, **kwargs)
+        bump_config_version()
 
     class Meta:
         verbose_name = "Конфигурация сайта"
@@ -1,16 +1,98 @@
+import logging
+import time
+
+from contextvars import ContextVar
+from django.core.cache import cache
+from django.db import DatabaseError
+
 from app.config.models import SiteConfiguration
 
 
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "site_config_version"  # Ключ версии настроек в общем кэше
+
+# Настройки, загруженные в текущем процессе: (версия, объект настроек)
+_process_config = (None, None)
+
+# Настройки текущего запроса (словарь создается SiteConfigurationMiddleware на время запроса)
+_request_config = ContextVar("site_config", default=None)
+
+
 def get_config() -> SiteConfiguration:
     """
-    Функция для получения основных настроек сайта из модели SiteConfiguration
+    Функция для получения основных настроек сайта из модели SiteConfiguration.
+    В рамках одного запроса настройки загружаются один раз; между запросами объект хранится в памяти процесса
+    и перезагружается из БД, только если изменилась версия настроек в общем кэше (после сохранения настроек).
     """
-    try:
-        # Получаем один имеющийся элемент из БД
-        config = SiteConfiguration.objects.get()
+    global _process_config
+
+    memo = _request_config.get()
 
-    except:
-        # Создаем элемент, если он не существует
-        config = SiteConfiguration.get_solo()
+    if memo is not None and "config" in memo:
+        return memo["config"]
+
+    version = config_version()
+    cached_version, config = _process_config
+
+    if config is None or cached_version != version:
+        logger.debug(f"Загрузка настроек сайта из БД, версия - {version}")
+
+        try:
+            # Получаем единственный элемент из БД / создаем, если он не существует
+            config, _ = SiteConfiguration.objects.get_or_create(
+                pk=SiteConfiguration.singleton_instance_id
+            )
+
+        except DatabaseError:
+            # Таблица еще не создана (например, при первом запуске до применения миграций)
+            logger.warning(
+                "Настройки сайта недоступны, используются значения по умолчанию"
+            )
+            return SiteConfiguration()
+
+        _process_config = (version, config)
+
+    if memo is not None:
+        memo["config"] = config
 
     return config
+
+
+def config_version() -> str:
+    """
+    Функция возвращает текущую версию настроек сайта из общего кэша (создает ее, если ее нет)
+    """
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        cache.add(VERSION_KEY, str(time.time_ns()), None)
+        version = cache.get(VERSION_KEY)
+
+    return version
+
+
+def bump_config_version() -> None:
+    """
+    Функция для смены версии настроек сайта: все процессы перезагрузят настройки при следующем обращении
+    """
+    cache.set(VERSION_KEY, str(time.time_ns()), None)
+    logger.info("Версия настроек сайта обновлена")
+
+
+class SiteConfigurationMiddleware:
+    """
+    Middleware для хранения настроек сайта на время обработки запроса (один запрос к кэшу / БД за запрос)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request_config.set({})
+
+        try:
+            return self.get_response(request)
+
+        finally:
+            _request_config.reset(token)
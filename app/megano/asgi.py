@@ -11,6 +11,12 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "megano.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.megano.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после инициализации Django (модуль использует модели)
+from app.app_shop.services.order_events import OrderEventsApplication  # noqa: E402
+
+# Поток событий о статусе заказа обрабатывается без Django-представления, остальные запросы - Django
+application = OrderEventsApplication(django_application)
@@ -0,0 +1,410 @@
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from typing import Dict, Iterable
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.redis import RedisCache
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRUCache:
+    """
+    Кэш первого уровня (L1) в памяти процесса: ограниченный по кол-ву записей (вытеснение давно не
+    использовавшихся записей) и по времени жизни записи. Значения хранятся сериализованными,
+    чтобы изменение полученного объекта не меняло закэшированное значение.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            record = self._data.get(key)
+
+            if record is None:
+                return default
+
+            value, expire_at = record
+
+            if expire_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+
+        return pickle.loads(value)
+
+    def set(self, key: str, value, timeout: float) -> None:
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кэш: L1 в памяти процесса перед общим кэшем Redis (L2).
+    Изменения (set, delete, incr, clear) рассылаются всем процессам через канал Redis pub/sub
+    (кроме изменений групп ключей без L1), и каждый процесс удаляет измененные ключи из своего L1. Пока процесс не подписан на канал
+    (нет связи с Redis), L1 не используется, чтобы не отдавать устаревшие данные.
+
+    Параметры (OPTIONS):
+        L1_MAX_ENTRIES - максимальное кол-во записей в L1 процесса;
+        L1_TIMEOUT - время жизни записи в L1 (сек);
+        CHANNEL - канал Redis для рассылки изменений;
+        IGNORE_EXCEPTIONS - при недоступности Redis чтение возвращает промах, запись пропускается;
+        NAMESPACES - параметры групп ключей (группа - начало ключа до "_"):
+            {"product": {"L1": True, "L1_TIMEOUT": 30, "TIMEOUT": 3600}, ...}.
+    Остальные параметры OPTIONS передаются клиенту Redis.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+
+        options = dict(params.get("OPTIONS", {}))
+        self._l1_max_entries = int(options.pop("L1_MAX_ENTRIES", 1000))
+        self._l1_timeout = float(options.pop("L1_TIMEOUT", 5))
+        self._channel = options.pop("CHANNEL", "cache:invalidate")
+        self._ignore_exceptions = options.pop("IGNORE_EXCEPTIONS", True)
+
+        # Сначала более длинные названия групп ("selected_categories" раньше "selected")
+        namespaces = options.pop("NAMESPACES", {})
+        self._namespaces = sorted(
+            namespaces.items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+        self._l2 = RedisCache(server, {**params, "OPTIONS": options})
+        self._l1 = LocalLRUCache(max_entries=self._l1_max_entries)
+
+        self._pid = None
+        self._origin = None
+        self._subscribed = False
+        self._generation = 0  # Счетчик полученных сообщений об изменениях
+        self._lock = threading.Lock()
+
+    # --- Параметры групп ключей ---
+
+    def namespace(self, key: str) -> Dict:
+        """
+        Метод возвращает параметры группы, к которой относится ключ (пустой словарь, если группа не задана)
+        """
+        for name, options in self._namespaces:
+            if key == name or key.startswith(f"{name}_"):
+                return options
+
+        return {}
+
+    def uses_l1(self, key: str) -> bool:
+        """
+        Метод проверяет, может ли ключ храниться в L1 (иначе об изменении не нужно рассылать сообщение)
+        """
+        return self.namespace(key).get("L1", True)
+
+    def l1_timeout(self, key: str, timeout=DEFAULT_TIMEOUT) -> float:
+        """
+        Метод возвращает время жизни записи в L1 (0 - ключ не хранится в L1)
+        """
+        options = self.namespace(key)
+
+        if not self.uses_l1(key) or not self.listening():
+            return 0
+
+        l1_timeout = options.get("L1_TIMEOUT", self._l1_timeout)
+
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            l1_timeout = min(l1_timeout, timeout)
+
+        return max(0, l1_timeout)
+
+    def l2_timeout(self, key: str, timeout=DEFAULT_TIMEOUT):
+        """
+        Метод возвращает время жизни записи в Redis (с учетом параметров группы)
+        """
+        if timeout is DEFAULT_TIMEOUT:
+            return self.namespace(key).get("TIMEOUT", DEFAULT_TIMEOUT)
+
+        return timeout
+
+    # --- Операции кэша ---
+
+    def get(self, key, default=None, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+        value = self._l1.get(full_key, self._missing_key)
+
+        if value is not self._missing_key:
+            return value
+
+        # Значение не сохраняется в L1, если во время чтения пришло сообщение об изменениях
+        generation = self._generation
+        value = self.call(
+            self._l2.get,
+            key,
+            self._missing_key,
+            version=version,
+            default=self._missing_key,
+        )
+
+        if value is self._missing_key:
+            return default
+
+        l1_timeout = self.l1_timeout(key)
+
+        if l1_timeout and generation == self._generation:
+            self._l1.set(full_key, value, l1_timeout)
+
+        return value
+
+    def get_many(self, keys, version=None):
+        result = {}
+        missing = []
+
+        for key in keys:
+            full_key = self.make_and_validate_key(key, version=version)
+            value = self._l1.get(full_key, self._missing_key)
+
+            if value is self._missing_key:
+                missing.append(key)
+            else:
+                result[key] = value
+
+        if missing:
+            generation = self._generation
+            found = self.call(self._l2.get_many, missing, version=version, default={})
+
+            for key, value in found.items():
+                l1_timeout = self.l1_timeout(key)
+
+                if l1_timeout and generation == self._generation:
+                    full_key = self.make_and_validate_key(key, version=version)
+                    self._l1.set(full_key, value, l1_timeout)
+
+            result.update(found)
+
+        return result
+
+    def has_key(self, key, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+
+        if self._l1.get(full_key, self._missing_key) is not self._missing_key:
+            return True
+
+        return self.call(self._l2.has_key, key, version=version, default=False)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.call(
+            self._l2.set, key, value, self.l2_timeout(key, timeout), version=version
+        )
+        self.changed([self.make_and_validate_key(key, version=version)], [key])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.call(
+            self._l2.add,
+            key,
+            value,
+            self.l2_timeout(key, timeout),
+            version=version,
+            default=False,
+        )
+
+        if added:
+            self.changed([self.make_and_validate_key(key, version=version)], [key])
+
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        # Ключи группируются по времени жизни в Redis: одна запись (MSET в транзакции) на группу
+        groups = {}
+
+        for key, value in data.items():
+            groups.setdefault(self.l2_timeout(key, timeout), {})[key] = value
+
+        failed = []
+
+        for l2_timeout, group in groups.items():
+            failed += self.call(
+                self._l2.set_many,
+                group,
+                l2_timeout,
+                version=version,
+                default=list(group),
+            )
+
+        self.changed(
+            [self.make_and_validate_key(key, version=version) for key in data], data
+        )
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.call(
+            self._l2.touch,
+            key,
+            self.l2_timeout(key, timeout),
+            version=version,
+            default=False,
+        )
+
+    def delete(self, key, version=None):
+        deleted = self.call(self._l2.delete, key, version=version, default=False)
+        self.changed([self.make_and_validate_key(key, version=version)], [key])
+
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.call(self._l2.delete_many, keys, version=version)
+        self.changed(
+            [self.make_and_validate_key(key, version=version) for key in keys], keys
+        )
+
+    def incr(self, key, delta=1, version=None):
+        # Ошибка отсутствия ключа (ValueError) не подавляется, как и в других бэкендах
+        value = self.call(self._l2.incr, key, delta, version=version)
+        self.changed([self.make_and_validate_key(key, version=version)], [key])
+
+        return value
+
+    def clear(self):
+        self.call(self._l2.clear)
+        self._l1.clear()
+        self.publish({"clear": True})
+
+    # --- Redis и рассылка изменений ---
+
+    def call(self, method, *args, default=None, **kwargs):
+        """
+        Метод для вызова операции кэша Redis с подавлением ошибок соединения (IGNORE_EXCEPTIONS)
+        """
+        try:
+            return method(*args, **kwargs)
+
+        except RedisError as exc:
+            if not self._ignore_exceptions:
+                raise
+
+            logger.error(f"Кэш Redis недоступен: {exc}")
+            return default
+
+    def changed(self, keys, names) -> None:
+        """
+        Метод удаляет измененные ключи из L1 текущего процесса и рассылает их остальным процессам
+        (если хотя бы одна группа ключей использует L1)
+
+        @param keys: полные ключи (с префиксом и версией)
+        @param names: ключи без префикса (для выбора группы)
+        """
+        self._l1.delete_many(keys)
+
+        if any(self.uses_l1(name) for name in names):
+            self.publish({"keys": keys})
+
+    def publish(self, message: Dict) -> None:
+        """
+        Метод рассылает сообщение об изменении всем процессам. Рассылка не зависит от подписки текущего
+        процесса: процессы, подписанные на канал, должны сбросить L1, даже если этот процесс еще не подписан.
+        """
+        self.listening()  # Инициализация процесса (идентификатор источника сообщений)
+
+        message["origin"] = self._origin
+        # Клиент redis-py из бэкенда Django (общий пул соединений)
+        client = self._l2._cache.get_client(write=True)
+        self.call(client.publish, self._channel, json.dumps(message))
+
+    def listening(self) -> bool:
+        """
+        Метод проверяет подписку процесса на канал изменений (при первом вызове в процессе запускает подписку)
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Новый процесс (в т.ч. после fork): L1 родителя не используется
+                    self._pid = os.getpid()
+                    self._origin = uuid.uuid4().hex
+                    self._subscribed = False
+                    self._l1.clear()
+
+                    threading.Thread(
+                        target=self.listen,
+                        name="cache-invalidation",
+                        daemon=True,
+                    ).start()
+
+        return self._subscribed
+
+    def listen(self) -> None:
+        """
+        Подписка на канал изменений: удаление из L1 ключей, измененных другими процессами.
+        При потере связи L1 очищается и отключается до повторной подписки.
+        """
+        delay = 1
+        pid = os.getpid()
+
+        while pid == self._pid:
+            try:
+                pubsub = self._l2._cache.get_client().pubsub(
+                    ignore_subscribe_messages=True
+                )
+                pubsub.subscribe(self._channel)
+                self._l1.clear()
+                self._subscribed = True
+                delay = 1
+                logger.info(f"Подписка на изменения кэша: {self._channel}")
+
+                for message in pubsub.listen():
+                    self.receive(message)
+
+            except RedisError as exc:
+                logger.warning(f"Нет подписки на изменения кэша: {exc}")
+
+            self._subscribed = False
+            self._l1.clear()
+
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def receive(self, message: Dict) -> None:
+        if message.get("type") != "message":
+            return
+
+        try:
+            data = json.loads(message["data"])
+
+        except (TypeError, ValueError):
+            logger.warning("Некорректное сообщение об изменении кэша")
+            return
+
+        if data.get("origin") == self._origin:
+            return
+
+        self._generation += 1
+
+        if data.get("clear"):
+            self._l1.clear()
+        else:
+            self._l1.delete_many(data.get("keys", []))
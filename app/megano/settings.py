@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # Полнотекстовый поиск и триграммы
     "mptt",  # Вложенные категории
     "app.app_user.apps.AppUserConfig",
     "app.app_shop.apps.AppShopConfig",
@@ -61,12 +62,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Настройки сайта загружаются один раз за запрос
+    "app.config.utils.configuration.SiteConfigurationMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     # 'django.middleware.cache.UpdateCacheMiddleware',
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Запись измененной корзины гостя в cookie ответа
+    "app.app_shop.services.shop_cart.guest_storage.GuestCartMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -84,17 +89,35 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "app.app_shop.context_processors.cart_summary",  # Итоги корзины
             ],
         },
     },
 ]
 
-CASHES = {
+CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+        # Двухуровневый кэш: L1 в памяти процесса + общий Redis (L2) с рассылкой изменений всем процессам
+        "BACKEND": "app.megano.cache.TieredCache",
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",  # БД 0 используется Celery
         "TIMEOUT": 60 * 60 * 24,  # Кэширование на сутки
-        "OPTIONS": {"MAX_ENTRIES": 500},
+        "KEY_PREFIX": "megano",
+        "OPTIONS": {
+            "L1_MAX_ENTRIES": 500,
+            "L1_TIMEOUT": 5,  # Сек
+            "CHANNEL": "megano:cache:invalidate",
+            "IGNORE_EXCEPTIONS": True,  # При недоступности Redis сайт работает без кэша
+            # Параметры групп ключей (начало ключа до "_")
+            "NAMESPACES": {
+                "product": {"L1_TIMEOUT": 30},
+                "comments": {"L1_TIMEOUT": 10},
+                "categories": {"L1_TIMEOUT": 60},
+                "selected_categories": {"L1_TIMEOUT": 60},
+                # Корзина и заказ меняются пользователем и должны сразу читаться актуальными
+                "cart": {"L1": False},
+                "order": {"L1": False},
+            },
+        },
     }
 }
 
@@ -210,8 +233,119 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
 SESSION_COOKIE_AGE = 7 * 24 * 60 * 60  # Время жизни сессии (7 дней)
 
+# Корзина гостя хранится в подписанной cookie (без сессии и записи в БД), время жизни - как у сессии
+GUEST_CART_COOKIE_NAME = "cart"
+# Максимальное кол-во позиций в корзине гостя (размер cookie)
+GUEST_CART_MAX_POSITIONS = 50
+
+# Постраничный вывод каталога и результатов поиска по ключу (cursor) вместо номера страницы:
+# без COUNT(*) и OFFSET, глубокие страницы не требуют сканирования пропущенных записей
+CATALOG_KEYSET_PAGINATION = False
+
+# Модуль поиска товаров: "postgres" - полнотекстовый поиск PostgreSQL с поиском по триграммам при опечатках,
+# "index" - поиск по инвертированному индексу в файле (без полнотекстового поиска СУБД),
+# "simple" - поиск по вхождению фразы в название (используется автоматически для других СУБД)
+PRODUCT_SEARCH_BACKEND = "postgres"
+
+# Файл инвертированного поискового индекса (создается командой build_search_index)
+PRODUCT_SEARCH_INDEX_PATH = os.path.join(
+    BASE_DIR, "app", "search_index", "products.idx"
+)
+
+# Задержка (сек) объединения журнала изменений с поисковым индексом: изменения товаров за это время
+# записываются в индекс одной перезаписью файла
+PRODUCT_SEARCH_INDEX_DELAY = 30
+
+# Макс. кол-во результатов поиска по индексу (id передаются в запрос к БД списком)
+PRODUCT_SEARCH_MAX_RESULTS = 500
+
+# Уменьшенные копии изображений (создаются фоновой задачей после загрузки изображения):
+# назначение - ширины копий (px), первая ширина - размер вывода на странице, остальные - для экранов высокой плотности
+IMAGE_RENDITIONS = {
+    "card": (200, 400),
+    "cart": (100, 200),
+    "gallery": (600, 1200),
+    "avatar": (64, 128),
+}
+# Форматы копий: первый - основной, последний - для браузеров без поддержки остальных форматов
+IMAGE_RENDITION_FORMATS = ("webp", "jpeg")
+IMAGE_RENDITION_QUALITY = 80
+
+# Хранилище корзин авторизованных пользователей: "database" - таблица products_cart,
+# "redis" - хэши Redis (id товара - кол-во) с отложенной записью в таблицу задачей flush_carts и при оформлении заказа
+CART_BACKEND = "database"
+CART_REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/2"  # БД 0 - Celery, 1 - кэш
+CART_FLUSH_INTERVAL = 30  # Период записи корзин из Redis в БД (сек)
+
+# Срок резерва товаров неоплаченного заказа (сек), после него товары возвращаются на склад
+STOCK_RESERVATION_TIMEOUT = 15 * 60
+
+# Платежный сервис: "BACKEND" - адаптер, "OPTIONS" - параметры адаптера.
+# ParityGateway - локальная имитация без сетевых запросов (оплата картой с четным номером, кроме оканчивающихся на 0),
+# SimulatorGateway - HTTP-имитатор для нагрузочного тестирования (команда payment_simulator), например:
+# {"BACKEND": "app.app_shop.services.payment_gateways.simulator.SimulatorGateway",
+#  "OPTIONS": {"url": "http://localhost:8100", "secret": "...", "timeout": 5}}
+PAYMENT_GATEWAY = {
+    "BACKEND": "app.app_shop.services.payment_gateways.local.ParityGateway",
+    "OPTIONS": {},
+}
+
+# Интервал запроса статуса платежа в платежном сервисе (сек) и макс. кол-во запросов, пока платеж обрабатывается
+PAYMENT_CONFIRMATION_DELAY = 10
+PAYMENT_STATUS_MAX_RETRIES = 30
+
+# Время без действий по оплате (сек), после которого заказ в статусе "Подтверждение оплаты" проверяется заново
+PAYMENT_STALE_TIMEOUT = 15 * 60
+
+# Уведомления о смене статуса заказа (каналы Redis pub/sub) для страницы ожидания оплаты (Server-Sent Events)
+ORDER_EVENTS_REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
+# Макс. время соединения потока событий (сек), затем браузер переподключается
+ORDER_EVENTS_TIMEOUT = 120
+
 # Celery settings
 # Т.к. мы используем Redis как в качестве брокера сообщений, так и в качестве серверной части базы данных,
 # оба URL-адреса указывают на один и тот же адрес.
 CELERY_BROKER_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
 CELERY_RESULT_BACKEND = f"redis://{REDIS_HOST}:{REDIS_PORT}"
+
+# Очереди задач (у каждой очереди свой воркер и профиль запуска, см. docker/celery.sh):
+# payments - оплата заказов и резервы товаров, notifications - письма пользователям,
+# media - обработка изображений, indexing - перестроение поисковых данных, default - прочие задачи
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "app.app_shop.tasks.payment": {"queue": "payments"},
+    "app.app_shop.tasks.confirm_payment": {"queue": "payments"},
+    "app.app_shop.tasks.release_reservation": {"queue": "payments"},
+    "app.app_shop.tasks.release_expired_reservations": {"queue": "payments"},
+    "app.app_shop.tasks.confirm_stale_payments": {"queue": "payments"},
+    "app.app_user.tasks.*": {"queue": "notifications"},
+    "app.app_shop.tasks.image_renditions": {"queue": "media"},
+    "app.app_shop.tasks.*_index": {"queue": "indexing"},
+}
+# Ограничение времени выполнения задач по умолчанию (сек): мягкое - исключение в задаче, жесткое - завершение процесса
+CELERY_TASK_SOFT_TIME_LIMIT = 5 * 60
+CELERY_TASK_TIME_LIMIT = 6 * 60
+
+# Периодические задачи (запуск: celery beat)
+CELERY_BEAT_SCHEDULE = {
+    "flush-carts": {
+        "task": "app.app_shop.tasks.flush_carts",
+        "schedule": CART_FLUSH_INTERVAL,
+    },
+    "release-expired-reservations": {
+        "task": "app.app_shop.tasks.release_expired_reservations",
+        "schedule": 60,
+    },
+    "confirm-stale-payments": {
+        "task": "app.app_shop.tasks.confirm_stale_payments",
+        "schedule": 60,
+    },
+    "update-search-index": {
+        "task": "app.app_shop.tasks.update_search_index",
+        "schedule": 300,
+    },
+    "rebuild-autocomplete-index": {
+        "task": "app.app_shop.tasks.rebuild_autocomplete_index",
+        "schedule": 300,
+    },
+}
@@ -3,5 +3,5 @@
 # Сбор статических файлов для последующей обработки сервером nginx
 python3 -m app.manage collectstatic --noinput
 
-# Запуск сервера
-gunicorn app.megano.wsgi:application --workers 4 --bind=0.0.0.0:8000
+# Запуск сервера (ASGI: поток событий о статусе заказа удерживает соединение без занятого процесса)
+gunicorn app.megano.asgi:application --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000
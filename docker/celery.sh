@@ -1,11 +1,39 @@
 #!/bin/bash
 
+# Профили воркеров по очередям задач (маршруты задач - CELERY_TASK_ROUTES в settings.py).
+# Параллельность можно изменить переменными окружения CELERY_<ОЧЕРЕДЬ>_CONCURRENCY.
+worker="celery --app=app.megano.celery:app worker -l INFO"
+
 # Если передан аргумент "celery"
 if [[ "${1}" == "celery" ]]; then
-  # Запуску celery с выводом логов уровня INFO
-  celery --app=app.megano.celery:app worker -l INFO
+  # Один воркер для всех очередей (или очередей из CELERY_QUEUES) - для разработки и небольших нагрузок
+  ${worker} -Q "${CELERY_QUEUES:-default,payments,notifications,media,indexing}" \
+    --concurrency="${CELERY_CONCURRENCY:-4}"
+# Оплата заказов: короткие задачи с ожиданием внешнего сервиса, по одной задаче на процесс
+# (задачи подтверждаются после выполнения - без предвыборки другие воркеры забирают задачи сразу)
+elif [[ "${1}" == "payments" ]]; then
+  ${worker} -Q payments -n payments@%h --concurrency="${CELERY_PAYMENTS_CONCURRENCY:-8}" \
+    --prefetch-multiplier=1
+# Письма пользователям: ожидание SMTP-сервера, потоки вместо процессов
+elif [[ "${1}" == "notifications" ]]; then
+  ${worker} -Q notifications -n notifications@%h --pool=threads \
+    --concurrency="${CELERY_NOTIFICATIONS_CONCURRENCY:-10}"
+# Обработка изображений: нагрузка на CPU и память, процессы перезапускаются для освобождения памяти
+elif [[ "${1}" == "media" ]]; then
+  ${worker} -Q media -n media@%h --concurrency="${CELERY_MEDIA_CONCURRENCY:-2}" \
+    --prefetch-multiplier=1 --max-tasks-per-child=100
+# Перестроение поисковых данных: по одной задаче (файл индекса записывается под блокировкой)
+elif [[ "${1}" == "indexing" ]]; then
+  ${worker} -Q indexing -n indexing@%h --concurrency=1 --prefetch-multiplier=1
+# Прочие задачи (запись корзин из Redis в БД и т.п.)
+elif [[ "${1}" == "default" ]]; then
+  ${worker} -Q default -n default@%h --concurrency="${CELERY_DEFAULT_CONCURRENCY:-2}"
+# Если передан аргумент "beat"
+elif [[ "${1}" == "beat" ]]; then
+  # Запуск планировщика периодических задач (расписание - CELERY_BEAT_SCHEDULE в settings.py)
+  celery --app=app.megano.celery:app beat -l INFO
 # Если передан аргумент "flower"
 elif [[ "${1}" == "flower" ]]; then
   # Запускаем flower через celery
   celery --app=app.megano.celery:app flower -l INFO
-fi
\ No newline at end of file
+fi